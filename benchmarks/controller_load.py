@@ -0,0 +1,271 @@
+# benchmarks/controller_load.py
+
+# Green threads everywhere, exactly as under ryu-manager
+from ryu.lib import hub
+hub.patch(thread=True)
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+import traceback
+from collections import deque
+
+from webob import Request
+
+from benchmarks.generators import build_topology, load_topology
+from benchmarks.schedulability_bench import percentile, _git_commit
+from common.log import setup_logging
+from sdn_controller.ryu_mrt_app import MRTController, MRTControllerREST
+from simulation.stub_datapath import StubDatapath
+
+DEFAULT_OUT = os.path.join(os.path.dirname(__file__), "results", "controller_load")
+
+
+class _StubWSGI:
+    """Captures the REST registration instead of serving HTTP."""
+
+    def register(self, controller, data):
+        self.controller = controller
+        self.data = data
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+class LoadGenerator:
+    """
+    Runs MRTController in-process against stub datapaths and drives it
+    through MRTControllerREST with concurrent clients: each client
+    registers flows (plus some wildcard subscriptions) and, once
+    `active` flows are up, deregisters the oldest, so a long run is a
+    steady-state soak. Registrations still in flight count against
+    `active`: a client frees a slot before it registers.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+
+        wsgi = _StubWSGI()
+        self.ctrl = MRTController(wsgi=wsgi)
+        self.rest_data = wsgi.data
+
+        topo = build_topology(args.topology, args.size, args.seed)
+        load_topology(self.ctrl.of_db, topo)
+        self.topo = topo
+        self.edge = [str(s) for s in topo.edge]
+        self.ctrl.datapaths.update({
+            s.dpid: StubDatapath(s.dpid, self.ctrl.programmer.handle_barrier_reply, args.rtt,
+                                 record=False)
+            for s in topo.switches
+        })
+
+        self.latencies = []
+        self.accepted = 0
+        self.rejected = 0
+        self.active = deque()
+        self.inflight = 0   # registrations sent, not yet answered
+        self.next_id = 0
+        self.samples = []   # (elapsed s, rss MB, decisions, flows in OF-DB)
+        self.errors = []    # tracebacks of green threads that raised
+
+    # ---------------------------------------
+    # REST Layer
+    # ---------------------------------------
+    def call(self, endpoint, payload):
+        req = Request.blank(
+            f"/mrt/{endpoint}", method="POST", content_type="application/json",
+            body=json.dumps(payload).encode()
+        )
+        rest = MRTControllerREST(req, None, self.rest_data)
+        resp = getattr(rest, endpoint)(req)
+        return json.loads(resp.body)["status"] == "ACCEPT"
+
+    def _flow_payload(self, topic):
+        rng = self.rng
+        src = rng.choice(self.edge)
+        fanout = min(rng.randint(1, self.args.fanout), len(self.edge) - 1)
+        period = math.exp(rng.uniform(math.log(10.0), math.log(1000.0)))
+        return {
+            "topic": topic,
+            "src_ip": src,
+            "broker_ip": src,
+            "rt_attributes": {
+                "qi": 1, "pi": rng.randint(1, 8),
+                "ci": period * rng.uniform(0.0005, 0.005),
+                "ti": period, "di": period,
+                "bwi": self.args.flow_bw,
+                "dst_ips": rng.sample([s for s in self.edge if s != src], fanout),
+            },
+        }
+
+    # ---------------------------------------
+    # Clients
+    # ---------------------------------------
+    def client(self, deadline):
+        rng = self.rng
+        while time.monotonic() < deadline:
+            # Deregistering yields: re-check, another client may have
+            # taken the slot meanwhile
+            while self.inflight + len(self.active) >= self.args.active and self.active:
+                self.call("deregister_flow", {"topic": self.active.popleft()})
+            if self.inflight + len(self.active) >= self.args.active:
+                hub.sleep(0.001)   # every slot is held by a pending registration
+                continue
+
+            group = self.next_id % self.args.groups
+            topic = f"load/{group}/{self.next_id}"
+            self.next_id += 1
+
+            self.inflight += 1
+            started = time.monotonic()
+            try:
+                ok = self.call("register_flow", self._flow_payload(topic))
+            finally:
+                self.inflight -= 1
+            self.latencies.append(time.monotonic() - started)
+            if ok:
+                self.accepted += 1
+                self.active.append(topic)
+            else:
+                self.rejected += 1
+
+            # Bounded set of wildcard subscriptions (groups x edge switches)
+            if rng.random() < self.args.subscribe_ratio:
+                self.call("register_subscriber", {
+                    "topic": f"load/{rng.randrange(self.args.groups)}/#",
+                    "subscriber_ip": rng.choice(self.edge),
+                })
+
+    def monitor(self, started, deadline, out):
+        while time.monotonic() < deadline:
+            hub.sleep(self.args.sample_interval)
+            elapsed = time.monotonic() - started
+            decisions = self.accepted + self.rejected
+            sample = (round(elapsed, 2), round(rss_mb(), 2), decisions,
+                      len(self.ctrl.of_db.flows))
+            self.samples.append(sample)
+            print(f"{sample[0]:>8.1f}s {decisions / elapsed:>10.1f}/s "
+                  f"{sample[1]:>9.1f} MB {sample[3]:>7} flows", file=out)
+
+    def run(self, out):
+        started = time.monotonic()
+        deadline = started + self.args.duration
+        threads = [hub.spawn(self._guarded, self.client, deadline)
+                   for _ in range(self.args.concurrency)]
+        threads.append(hub.spawn(self._guarded, self.monitor, started, deadline, out))
+        hub.joinall(threads)
+        return time.monotonic() - started
+
+    def _guarded(self, target, *args):
+        """hub.spawn only logs what a green thread raises; keep it for the report."""
+        try:
+            target(*args)
+        except Exception:
+            self.errors.append(traceback.format_exc())
+
+    # ---------------------------------------
+    # Report
+    # ---------------------------------------
+    def report(self, elapsed):
+        decisions = self.accepted + self.rejected
+        rss = [s[1] for s in self.samples] or [rss_mb()]
+        # Growth after warm-up: second half of the run vs. the first
+        half = len(self.samples) // 2
+        growth = None
+        if half:
+            first, second = self.samples[:half], self.samples[half:]
+            dt = (second[-1][0] - first[0][0]) / 60.0
+            if dt > 0:
+                growth = round((second[-1][1] - first[0][1]) / dt, 3)
+
+        return {
+            "topology": self.topo.name,
+            "switches": len(self.topo.switches),
+            "concurrency": self.args.concurrency,
+            "active_target": self.args.active,
+            "duration_s": round(elapsed, 2),
+            "decisions": decisions,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "decisions_per_sec": round(decisions / elapsed, 2) if elapsed else None,
+            "p50_ms": round(percentile(self.latencies, 50) * 1000.0, 3) if self.latencies else None,
+            "p99_ms": round(percentile(self.latencies, 99) * 1000.0, 3) if self.latencies else None,
+            "admission_batches": self.ctrl.admission.batches,
+            "rss_start_mb": rss[0],
+            "rss_end_mb": rss[-1],
+            "rss_peak_mb": max(rss),
+            "rss_growth_mb_per_min": growth,
+            "samples": self.samples,
+        }
+
+
+def run_load():
+    parser = argparse.ArgumentParser(description="In-process controller load / soak test")
+    parser.add_argument("--topology", choices=["fat-tree", "ring", "mesh"], default="fat-tree")
+    parser.add_argument("--size", type=int, default=4, help="k for fat-tree, switches otherwise")
+    parser.add_argument("--concurrency", type=int, default=1000, help="concurrent REST clients")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds")
+    parser.add_argument("--active", type=int, default=500,
+                        help="flows kept registered; older ones are deregistered")
+    parser.add_argument("--fanout", type=int, default=3)
+    parser.add_argument("--groups", type=int, default=16, help="topic groups for wildcards")
+    parser.add_argument("--subscribe-ratio", type=float, default=0.1)
+    parser.add_argument("--flow-bw", default="0.1Mbps")
+    parser.add_argument("--rtt", type=float, default=0.001, help="stub switch RTT (s)")
+    parser.add_argument("--sample-interval", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default=DEFAULT_OUT, help="path prefix for .json")
+    parser.add_argument("--verbose", action="store_true", help="keep controller output")
+    args = parser.parse_args()
+
+    out = sys.stdout
+    print("=== Controller Load Generator (stub datapaths) ===", file=out)
+    gen = LoadGenerator(args)
+    print(f"{gen.topo.name}: {len(gen.topo.switches)} switches, "
+          f"{args.concurrency} clients, {args.duration:.0f}s", file=out)
+
+    if not args.verbose:
+        setup_logging(level="WARNING")
+    quiet = contextlib.nullcontext() if args.verbose else \
+        contextlib.redirect_stdout(open(os.devnull, "w"))
+    with quiet:
+        elapsed = gen.run(out)
+
+    # A run whose clients died measures nothing: no results file
+    if gen.errors:
+        print(gen.errors[0], file=sys.stderr)
+        sys.exit(f"{len(gen.errors)} green thread(s) failed; no results written")
+    if gen.accepted + gen.rejected == 0:
+        sys.exit("No admission decisions were made; no results written")
+
+    report = gen.report(elapsed)
+    print(f"decisions/s {report['decisions_per_sec']}  accepted {report['accepted']}  "
+          f"rejected {report['rejected']}  p50 {report['p50_ms']} ms  p99 {report['p99_ms']} ms  "
+          f"RSS {report['rss_start_mb']:.1f} -> {report['rss_end_mb']:.1f} MB "
+          f"({report['rss_growth_mb_per_min']} MB/min)", file=out)
+
+    meta = {
+        "benchmark": "controller_load",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "args": vars(args),
+    }
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out + ".json", "w") as f:
+        json.dump({"meta": meta, "results": [report]}, f, indent=2)
+    print(f"Results: {args.out}.json", file=out)
+
+
+if __name__ == "__main__":
+    run_load()
@@ -0,0 +1,209 @@
+# benchmarks/generators.py
+
+import math
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import networkx as nx
+
+from common.rt_attributes import RTAttributes, Link, Switch
+
+
+# ---------------------------------------
+# Topologies
+# ---------------------------------------
+@dataclass
+class Topology:
+    name: str
+    switches: List[Switch] = field(default_factory=list)
+    links: List[Link] = field(default_factory=list)
+    # Switches that host publishers / subscribers (edge layer)
+    edge: List[int] = field(default_factory=list)
+
+    def graph(self) -> nx.DiGraph:
+        G = nx.DiGraph()
+        for link in self.links:
+            G.add_edge(link.src, link.dst, link=link)
+        return G
+
+
+class _Builder:
+    """Hands out port numbers per switch and adds links in both directions."""
+
+    def __init__(self, name, bw_capacity):
+        self.topo = Topology(name)
+        self.bw_capacity = bw_capacity
+        self.next_port: Dict[int, int] = {}
+
+    def switch(self, dpid):
+        self.topo.switches.append(Switch(dpid, f"S{dpid}"))
+        self.next_port[dpid] = 1
+
+    def connect(self, a, b):
+        for src, dst in ((a, b), (b, a)):
+            port = self.next_port[src]
+            self.next_port[src] += 1
+            self.topo.links.append(
+                Link(str(src), str(dst), port, bw_capacity=self.bw_capacity)
+            )
+
+
+def ring(n, bw_capacity=1000.0) -> Topology:
+    b = _Builder(f"ring-{n}", bw_capacity)
+    for i in range(1, n + 1):
+        b.switch(i)
+    for i in range(1, n + 1):
+        b.connect(i, i % n + 1)
+    b.topo.edge = list(range(1, n + 1))
+    return b.topo
+
+
+def mesh(n, degree=4, seed=0, bw_capacity=1000.0) -> Topology:
+    """Random connected mesh: a ring plus random chords up to ~degree."""
+    rng = random.Random(seed)
+    b = _Builder(f"mesh-{n}", bw_capacity)
+    for i in range(1, n + 1):
+        b.switch(i)
+
+    edges = {tuple(sorted((i, i % n + 1))) for i in range(1, n + 1)}
+    target = min(n * degree // 2, n * (n - 1) // 2)
+    while len(edges) < target:
+        a, c = rng.sample(range(1, n + 1), 2)
+        edges.add(tuple(sorted((a, c))))
+    for a, c in sorted(edges):
+        b.connect(a, c)
+
+    b.topo.edge = list(range(1, n + 1))
+    return b.topo
+
+
+def fat_tree(k, bw_capacity=1000.0) -> Topology:
+    """k-ary fat-tree: (k/2)^2 core, k pods of k/2 aggregation + k/2 edge."""
+    if k % 2:
+        raise ValueError("fat-tree k must be even")
+    half = k // 2
+    b = _Builder(f"fat-tree-{k}", bw_capacity)
+
+    core = list(range(1, half * half + 1))
+    dpid = len(core)
+    for c in core:
+        b.switch(c)
+
+    for _ in range(k):
+        aggs = list(range(dpid + 1, dpid + half + 1))
+        edges = list(range(dpid + half + 1, dpid + k + 1))
+        dpid += k
+        for s in aggs + edges:
+            b.switch(s)
+        for i, agg in enumerate(aggs):
+            for e in edges:
+                b.connect(agg, e)
+            for c in core[i * half:(i + 1) * half]:
+                b.connect(agg, c)
+        b.topo.edge.extend(edges)
+
+    return b.topo
+
+
+TOPOLOGIES = {"ring": ring, "mesh": mesh, "fat-tree": fat_tree}
+
+
+def build_topology(kind, size, seed=0) -> Topology:
+    """size: switches for ring/mesh, k for fat-tree."""
+    if kind == "mesh":
+        return mesh(size, seed=seed)
+    return TOPOLOGIES[kind](size)
+
+
+def load_topology(of_db, topo: Topology):
+    """Replace OF-DB's topology with topo (one version bump)."""
+    of_db.apply_topology(
+        add_switches=topo.switches,
+        remove_switches=list(of_db.switches),
+        add_links=topo.links,
+    )
+
+
+# ---------------------------------------
+# Flow Sets
+# ---------------------------------------
+def uunifast(n, total_utilization, rng) -> List[float]:
+    """UUniFast (Bini & Buttazzo): n utilizations summing to total."""
+    utils = []
+    remaining = total_utilization
+    for i in range(1, n):
+        next_remaining = remaining * rng.random() ** (1.0 / (n - i))
+        utils.append(remaining - next_remaining)
+        remaining = next_remaining
+    utils.append(remaining)
+    return utils
+
+
+def _priorities(periods, mode, levels, rng):
+    if mode == "uniform":
+        return [rng.randint(1, levels) for _ in periods]
+    if mode == "rate-monotonic":
+        # Shorter period -> higher priority, folded into `levels` bands
+        order = sorted(range(len(periods)), key=lambda i: periods[i], reverse=True)
+        prio = [0] * len(periods)
+        for rank, i in enumerate(order):
+            prio[i] = 1 + rank * levels // len(periods)
+        return prio
+    if mode == "two-level":
+        return [levels if rng.random() < 0.2 else 1 for _ in periods]
+    raise ValueError(f"unknown priority mode {mode!r}")
+
+
+class _Routes:
+    """Source-rooted shortest-path trees, BFS once per source switch."""
+
+    def __init__(self, topo):
+        self.G = topo.graph()
+        self._paths = {}
+
+    def tree(self, src, dsts):
+        if src not in self._paths:
+            self._paths[src] = nx.single_source_shortest_path(self.G, src)
+        paths = self._paths[src]
+        links = []
+        for d in dsts:
+            path = paths[d]
+            links.extend(self.G[path[i]][path[i + 1]]["link"] for i in range(len(path) - 1))
+        return list(dict.fromkeys(links))
+
+
+def make_flowset(topo: Topology, n, total_utilization=0.5, priorities="rate-monotonic",
+                 levels=8, fanout=(1, 4), period_range=(10.0, 1000.0),
+                 deadline_factor=1.0, seed=0, routed=True) -> List[RTAttributes]:
+    """
+    n flows between edge switches. Periods are log-uniform in
+    period_range (ms), Ci = Ui * Ti with UUniFast utilizations, Di =
+    deadline_factor * Ti, and each flow has fanout subscribers. With
+    routed=True each flow gets its shortest-path tree as route_links.
+    """
+    rng = random.Random(seed)
+    lo, hi = (math.log(p) for p in period_range)
+    periods = [math.exp(rng.uniform(lo, hi)) for _ in range(n)]
+    utils = uunifast(n, total_utilization, rng)
+    prios = _priorities(periods, priorities, levels, rng)
+    routes = _Routes(topo) if routed else None
+
+    edge = [str(s) for s in topo.edge]
+    flows = []
+    for i in range(n):
+        src = rng.choice(edge)
+        count = min(rng.randint(*fanout), len(edge) - 1)
+        dsts = rng.sample([s for s in edge if s != src], count)
+
+        flow = RTAttributes(
+            ft_i=f"bench/{i}", qi=1, ci=utils[i] * periods[i], pi=prios[i],
+            ti=periods[i], di=deadline_factor * periods[i], bwi="1Mbps"
+        )
+        flow.src_ip = src
+        flow.dst_ips = dsts
+        if routes is not None:
+            flow.route_links = routes.tree(src, dsts)
+            flow.num_hops = len(flow.route_links)
+        flows.append(flow)
+    return flows
@@ -0,0 +1,203 @@
+# benchmarks/routing_bench.py
+
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import time
+
+import networkx as nx
+from networkx.algorithms.approximation import steiner_tree
+
+from benchmarks.generators import build_topology, load_topology
+from benchmarks.schedulability_bench import percentile, _git_commit
+from common.of_db import OFDB
+from sdn_controller.routing import RoutingEngine
+
+DEFAULT_OUT = os.path.join(os.path.dirname(__file__), "results", "routing")
+
+
+# ---------------------------------------
+# Routing Modes
+# ---------------------------------------
+def _rp_tree(routing, src, dsts):
+    """Paper mode: src → RP → subscribers (RoutingEngine)."""
+    return routing.compute_multicast_tree(src, dsts)
+
+
+def _spt_tree(routing, src, dsts):
+    """Source-rooted shortest-path tree (no RP), one Dijkstra."""
+    G = routing._build_graph()
+    _, paths = nx.single_source_dijkstra(G, src, weight="weight")
+    links = []
+    for d in dsts:
+        links.extend(routing._path_to_links(G, paths[d]))
+    return list(dict.fromkeys(links))
+
+
+def _steiner_tree(routing, src, dsts):
+    """Approximate minimum Steiner tree over {src} + dsts, oriented from src."""
+    G = routing._build_graph()
+    U = nx.Graph()
+    for u, v, data in G.edges(data=True):
+        if not U.has_edge(u, v) or data["weight"] < U[u][v]["weight"]:
+            U.add_edge(u, v, weight=data["weight"])
+    T = steiner_tree(U, [src] + list(dsts), weight="weight")
+    if src not in T:
+        return []
+    return [G[u][v]["link"] for u, v in nx.bfs_edges(T, src)]
+
+
+MODES = {"rp": _rp_tree, "spt": _spt_tree, "steiner": _steiner_tree}
+
+
+# ---------------------------------------
+# Measurement
+# ---------------------------------------
+def _timed(fn, budget, samples):
+    """Run fn() until samples runs or budget seconds (at least one)."""
+    latencies, result = [], None
+    deadline = time.perf_counter() + budget
+    for _ in range(samples):
+        started = time.perf_counter()
+        result = fn()
+        latencies.append(time.perf_counter() - started)
+        if time.perf_counter() > deadline:
+            break
+    return latencies, result
+
+
+def _record(op, mode, topo, subscribers, latencies, tree=None):
+    record = {
+        "op": op, "mode": mode, "topology": topo.name,
+        "switches": len(topo.switches), "links": len(topo.links),
+        "subscribers": subscribers, "samples": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000.0, 4),
+        "p99_ms": round(percentile(latencies, 99) * 1000.0, 4),
+    }
+    if tree is not None:
+        record["tree_links"] = len(tree)
+        record["tree_cost"] = round(sum(RoutingEngine.link_cost(l) for l in tree), 6)
+    return record
+
+
+def run_case(args, topo, subscribers):
+    of_db = OFDB()
+    load_topology(of_db, topo)
+    routing = RoutingEngine(of_db)
+    rng = random.Random(args.seed)
+
+    edge = [str(s) for s in topo.edge]
+    src = rng.choice(edge)
+    dsts = rng.sample([s for s in edge if s != src], min(subscribers, len(edge) - 1))
+    joiner = rng.choice([s for s in edge if s != src and s not in dsts] or [src])
+
+    records = []
+    latencies, _ = _timed(lambda: routing.select_rp(dsts), args.budget, args.samples)
+    records.append(_record("select_rp", "rp", topo, len(dsts), latencies))
+
+    for mode in args.modes:
+        build = MODES[mode]
+        latencies, tree = _timed(lambda: build(routing, src, dsts), args.budget, args.samples)
+        records.append(_record("tree", mode, topo, len(dsts), latencies, tree))
+
+        # Subscriber join: the controller recomputes the tree with one more
+        joined = dsts + [joiner]
+        latencies, tree = _timed(lambda: build(routing, src, joined), args.budget, args.samples)
+        records.append(_record("join", mode, topo, len(joined), latencies, tree))
+    return records
+
+
+# ---------------------------------------
+# Results
+# ---------------------------------------
+FIELDS = ["op", "mode", "topology", "switches", "links", "subscribers",
+          "samples", "p50_ms", "p99_ms", "tree_links", "tree_cost"]
+
+
+def write_results(records, meta, out):
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out + ".json", "w") as f:
+        json.dump({"meta": meta, "results": records}, f, indent=2)
+    with open(out + ".csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        for record in records:
+            writer.writerow({k: record.get(k, "") for k in FIELDS})
+
+
+def plot_results(records, out):
+    """Compute time and tree cost vs. topology size, one line per mode."""
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("matplotlib not installed, skipping plot")
+        return None
+
+    fig, (ax_time, ax_cost) = plt.subplots(1, 2, figsize=(11, 4))
+    for mode in sorted({r["mode"] for r in records if r["op"] == "tree"}):
+        rows = sorted((r for r in records if r["op"] == "tree" and r["mode"] == mode),
+                      key=lambda r: r["switches"])
+        sizes = [r["switches"] for r in rows]
+        ax_time.plot(sizes, [r["p50_ms"] for r in rows], marker="o", label=mode)
+        ax_cost.plot(sizes, [r["tree_cost"] for r in rows], marker="o", label=mode)
+
+    ax_time.set(xscale="log", yscale="log", xlabel="switches",
+                ylabel="tree computation p50 (ms)", title="Compute time")
+    ax_cost.set(xscale="log", xlabel="switches", ylabel="tree cost (Eq. 1)",
+                title="Tree cost")
+    for ax in (ax_time, ax_cost):
+        ax.grid(True)
+        ax.legend()
+
+    fig.tight_layout()
+    fig.savefig(out + ".png")
+    plt.close(fig)
+    return out + ".png"
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description="RP selection / multicast tree scaling")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000],
+                        help="switches for ring/mesh (k for fat-tree)")
+    parser.add_argument("--topology", choices=["fat-tree", "ring", "mesh"], default="mesh")
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[4, 16])
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--samples", type=int, default=50, help="max runs per case")
+    parser.add_argument("--budget", type=float, default=5.0, help="seconds per case")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default=DEFAULT_OUT, help="path prefix for .json / .csv / .png")
+    args = parser.parse_args()
+
+    print("=== Routing Benchmark ===")
+    print(f"{'op':>9} {'mode':>8} {'switches':>8} {'subs':>5} {'runs':>5} "
+          f"{'p50(ms)':>10} {'p99(ms)':>10} {'links':>6} {'cost':>9}")
+
+    records = []
+    for size in args.sizes:
+        topo = build_topology(args.topology, size, args.seed)
+        for subscribers in args.subscribers:
+            for r in run_case(args, topo, subscribers):
+                records.append(r)
+                print(f"{r['op']:>9} {r['mode']:>8} {r['switches']:>8} {r['subscribers']:>5} "
+                      f"{r['samples']:>5} {r['p50_ms']:>10.3f} {r['p99_ms']:>10.3f} "
+                      f"{r.get('tree_links', ''):>6} {r.get('tree_cost', ''):>9}")
+
+    meta = {
+        "benchmark": "routing",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "args": vars(args),
+    }
+    write_results(records, meta, args.out)
+    plot = plot_results(records, args.out)
+    print(f"Results: {args.out}.json / .csv" + (f" / {plot}" if plot else ""))
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,319 @@
+# benchmarks/schedulability_bench.py
+
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+
+from benchmarks.generators import build_topology, make_flowset
+from common.metrics import metrics
+from schedulability.analysis import (
+    HolisticApproach, TrajectoryApproach, AdmissionControl, ExactResponseTime
+)
+from schedulability.compiled import CompiledHolistic, CompiledTrajectory, SnapshotCompiler
+
+DEFAULT_OUT = os.path.join(os.path.dirname(__file__), "results", "schedulability")
+
+
+# ---------------------------------------
+# Analyses Under Test
+# ---------------------------------------
+def _holistic(flow, flows):
+    return HolisticApproach.calculate_wcrt(flow, flows)
+
+
+def _exact(flow, flows):
+    # Cold start, comparable to HA; warm starts are measured separately
+    return _rta_for(flows).calculate_wcrt(flow, warm=False)
+
+
+_rta_cache = [None, None]
+
+
+def _rta_for(flows):
+    """One ExactResponseTime per flow set, built on first use."""
+    if _rta_cache[0] is not flows:
+        _rta_cache[:] = [flows, ExactResponseTime(flows)]
+    return _rta_cache[1]
+
+
+def _trajectory(flow, flows):
+    return TrajectoryApproach.calculate_wcrt(flow, flows)
+
+
+def _admission(flow, flows):
+    # The subject arrives as a new flow against all the others
+    return AdmissionControl.check_admissibility(flow, [f for f in flows if f is not flow])
+
+
+_compiler = SnapshotCompiler()
+_snapshot_cache = [None, None]
+
+
+def _snapshot_for(flows):
+    """One compiled snapshot per flow set, built on first use."""
+    if _snapshot_cache[0] is not flows:
+        _snapshot_cache[:] = [flows, _compiler.compile(flows)]
+    return _snapshot_cache[1]
+
+
+def _holistic_compiled(flow, flows):
+    snapshot = _snapshot_for(flows)
+    return CompiledHolistic.calculate_wcrt(snapshot, snapshot.index[flow.ft_i])
+
+
+def _trajectory_compiled(flow, flows):
+    snapshot = _snapshot_for(flows)
+    return CompiledTrajectory.calculate_wcrt(snapshot, snapshot.index[flow.ft_i])
+
+
+def _admission_compiled(flow, flows):
+    # Recompiled per call (incrementally), as the routing engine does
+    return AdmissionControl.check_admissibility(
+        flow, [f for f in flows if f is not flow], _compiler)
+
+
+ITERATION_COUNTERS = {
+    "holistic": "ha_iterations", "holistic-compiled": "ha_iterations", "exact": "rta_iterations",
+}
+
+ANALYSES = {
+    "holistic": _holistic,
+    "holistic-compiled": _holistic_compiled,
+    "exact": _exact,
+    "trajectory": _trajectory,
+    "trajectory-compiled": _trajectory_compiled,
+    "admission": _admission,
+    "admission-compiled": _admission_compiled,
+}
+
+
+# ---------------------------------------
+# Measurement
+# ---------------------------------------
+def percentile(values, q):
+    """Nearest-rank percentile (q in 0..100)."""
+    ordered = sorted(values)
+    rank = max(int(round(q / 100.0 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def time_analysis(fn, flows, samples, budget, rng):
+    """
+    Latencies (s) of fn on randomly chosen subject flows: up to samples
+    runs, stopping early once budget seconds are spent (at least one).
+    """
+    latencies = []
+    deadline = time.perf_counter() + budget
+    for _ in range(samples):
+        subject = rng.choice(flows)
+        started = time.perf_counter()
+        fn(subject, flows)
+        latencies.append(time.perf_counter() - started)
+        if time.perf_counter() > deadline:
+            break
+    return latencies
+
+
+def warm_start_savings(flows, samples, rng):
+    """
+    Fixed-point iterations per WCRT saved by warm starts: converge a
+    sample of flows, admit one more flow, then recompute them warm and
+    cold.
+    """
+    arrival, rest = flows[-1], flows[:-1]
+    subjects = rng.sample(rest, min(samples, len(rest)))
+    rta = ExactResponseTime(rest)
+    for flow in subjects:
+        rta.calculate_wcrt(flow)
+    rta.add_flow(arrival)
+
+    iterations = []
+    for warm in (True, False):
+        before = rta.stats["iterations"]
+        for flow in subjects:
+            rta.calculate_wcrt(flow, warm=warm)
+        iterations.append(rta.stats["iterations"] - before)
+    return (iterations[1] - iterations[0]) / len(subjects)
+
+
+def peak_memory(fn, flows, rng):
+    """Peak bytes allocated by one run (traced separately from timing)."""
+    tracemalloc.start()
+    try:
+        fn(rng.choice(flows), flows)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_case(args, topo, n):
+    rng = random.Random(args.seed)
+
+    tracemalloc.start()
+    flows = make_flowset(
+        topo, n, total_utilization=args.utilization, priorities=args.priorities,
+        fanout=tuple(args.fanout), seed=args.seed
+    )
+    flowset_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    records = []
+    for name in args.analyses:
+        record = {
+            "analysis": name, "topology": topo.name, "flows": n,
+            "utilization": args.utilization, "priorities": args.priorities,
+            "flowset_mb": round(flowset_bytes / 2**20, 3),
+        }
+        if name.startswith("admission") and n > args.admission_max:
+            # One admission re-checks every flow: O(N^2) per run
+            record["skipped"] = f"N > --admission-max ({args.admission_max})"
+            records.append(record)
+            continue
+
+        counter = ITERATION_COUNTERS.get(name)
+        before = metrics.counters.get(counter, 0)
+        latencies = time_analysis(ANALYSES[name], flows, args.samples, args.budget, rng)
+        total = sum(latencies)
+        if counter:
+            record["iterations_per_op"] = round(
+                (metrics.counters.get(counter, 0) - before) / len(latencies), 2)
+        record.update({
+            "samples": len(latencies),
+            "ops_per_sec": round(len(latencies) / total, 3) if total > 0 else None,
+            "p50_ms": round(percentile(latencies, 50) * 1000.0, 4),
+            "p99_ms": round(percentile(latencies, 99) * 1000.0, 4),
+            "peak_mb": round(peak_memory(ANALYSES[name], flows, rng) / 2**20, 3),
+        })
+        if name in ("holistic-compiled", "trajectory-compiled"):
+            # Cold compile of the whole flow set (the timed runs reuse it)
+            started = time.perf_counter()
+            SnapshotCompiler().compile(flows)
+            record["compile_ms"] = round((time.perf_counter() - started) * 1000.0, 3)
+        records.append(record)
+
+    by_name = {r["analysis"]: r for r in records}
+    exact, holistic = by_name.get("exact"), by_name.get("holistic")
+    if exact and "samples" in exact:
+        if holistic and "iterations_per_op" in holistic:
+            exact["iterations_saved_per_op"] = round(
+                holistic["iterations_per_op"] - exact["iterations_per_op"], 2)
+        if n > 1:
+            exact["warm_iterations_saved_per_op"] = round(
+                warm_start_savings(flows, args.samples, rng), 2)
+    return records
+
+
+# ---------------------------------------
+# Results
+# ---------------------------------------
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(records, meta, out):
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out + ".json", "w") as f:
+        json.dump({"meta": meta, "results": records}, f, indent=2)
+
+    fields = ["analysis", "topology", "flows", "utilization", "priorities", "samples",
+              "ops_per_sec", "p50_ms", "p99_ms", "flowset_mb", "peak_mb",
+              "iterations_per_op", "iterations_saved_per_op", "warm_iterations_saved_per_op",
+              "compile_ms", "skipped"]
+    with open(out + ".csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for record in records:
+            writer.writerow({k: record.get(k, "") for k in fields})
+
+
+def compare(records, baseline_path, tolerance):
+    """Cases whose p50 got slower than baseline by more than tolerance."""
+    with open(baseline_path) as f:
+        baseline = {
+            (r["analysis"], r["topology"], r["flows"]): r
+            for r in json.load(f)["results"] if "p50_ms" in r
+        }
+
+    regressions = []
+    for r in records:
+        old = baseline.get((r["analysis"], r["topology"], r["flows"]))
+        if old is None or "p50_ms" not in r or not old["p50_ms"]:
+            continue
+        ratio = r["p50_ms"] / old["p50_ms"]
+        if ratio > 1.0 + tolerance:
+            regressions.append((r, ratio))
+    return regressions
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description="HA / TA / admission scaling")
+    parser.add_argument("--flows", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument("--topology", choices=["fat-tree", "ring", "mesh"], default="fat-tree")
+    parser.add_argument("--size", type=int, default=4, help="k for fat-tree, switches otherwise")
+    parser.add_argument("--analyses", nargs="+", choices=list(ANALYSES), default=list(ANALYSES))
+    parser.add_argument("--utilization", type=float, default=0.5, help="total UUniFast utilization")
+    parser.add_argument("--priorities", choices=["rate-monotonic", "uniform", "two-level"],
+                        default="rate-monotonic")
+    parser.add_argument("--fanout", type=int, nargs=2, default=[1, 4], metavar=("MIN", "MAX"))
+    parser.add_argument("--samples", type=int, default=200, help="max runs per case")
+    parser.add_argument("--budget", type=float, default=5.0, help="seconds per case")
+    parser.add_argument("--admission-max", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default=DEFAULT_OUT, help="path prefix for .json / .csv")
+    parser.add_argument("--baseline", help="earlier .json to compare p50 against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    topo = build_topology(args.topology, args.size, args.seed)
+    print(f"=== Schedulability Benchmark ({topo.name}: "
+          f"{len(topo.switches)} switches, {len(topo.links)} links) ===")
+    print(f"{'analysis':>19} {'N':>7} {'runs':>5} {'ops/s':>10} "
+          f"{'p50(ms)':>10} {'p99(ms)':>10} {'peak(MB)':>9}")
+
+    records = []
+    for n in args.flows:
+        for r in run_case(args, topo, n):
+            records.append(r)
+            if "skipped" in r:
+                print(f"{r['analysis']:>19} {n:>7}  skipped ({r['skipped']})")
+                continue
+            print(f"{r['analysis']:>19} {n:>7} {r['samples']:>5} {r['ops_per_sec']:>10.2f} "
+                  f"{r['p50_ms']:>10.3f} {r['p99_ms']:>10.3f} {r['peak_mb']:>9.3f}")
+            if "iterations_saved_per_op" in r:
+                print(f"{'':>19} {'':>7} iterations saved/op vs HA "
+                      f"{r['iterations_saved_per_op']}, by warm start "
+                      f"{r.get('warm_iterations_saved_per_op', '-')}")
+
+    meta = {
+        "benchmark": "schedulability",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "args": vars(args),
+    }
+    write_results(records, meta, args.out)
+    print(f"Results: {args.out}.json / .csv")
+
+    if args.baseline:
+        regressions = compare(records, args.baseline, args.tolerance)
+        for r, ratio in regressions:
+            print(f"REGRESSION {r['analysis']} N={r['flows']}: p50 x{ratio:.2f}")
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,80 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+ROOT = "mrt"
+FORMAT = "[%(name)s] %(message)s"
+
+_listener = None
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueue the record untouched: message formatting (record.args
+    merge included) happens on the writer thread, not in the caller.
+    Callers must pass immutable args (strings, numbers).
+    """
+
+    def prepare(self, record):
+        if record.exc_info:
+            # Tracebacks cannot cross the queue lazily
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def get_logger(subsystem: str) -> logging.Logger:
+    """Logger for one subsystem ("of_db", "msdp", "ort_nm", ...)."""
+    return logging.getLogger(f"{ROOT}.{subsystem}")
+
+
+def parse_levels(spec: str) -> dict:
+    """"of_db=WARNING,msdp=DEBUG" -> {"of_db": "WARNING", "msdp": "DEBUG"}."""
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(level="INFO", levels=None, stream=None):
+    """
+    Route every "mrt.*" logger through one queue to a background writer.
+
+    level is the default; levels maps subsystem -> level and is merged
+    over $MRT_LOG_LEVELS. Calling it again only updates the levels.
+    """
+    global _listener
+
+    root = logging.getLogger(ROOT)
+    root.setLevel(level)
+    merged = parse_levels(os.environ.get("MRT_LOG_LEVELS", ""))
+    merged.update(levels or {})
+    for subsystem, sub_level in merged.items():
+        get_logger(subsystem).setLevel(sub_level)
+
+    if _listener is not None:
+        return
+
+    # queue.Queue (not SimpleQueue): eventlet patches it to a green queue
+    records = queue.Queue(-1)
+    writer = logging.StreamHandler(stream or sys.stderr)
+    writer.setFormatter(logging.Formatter(FORMAT))
+
+    root.addHandler(_DeferredQueueHandler(records))
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(records, writer)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
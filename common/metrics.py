@@ -0,0 +1,242 @@
+import bisect
+import collections
+import functools
+import sys
+import threading
+import time
+from typing import Callable, Dict, List
+
+
+def _os_threading():
+    """
+    The unpatched threading module. Under ryu-manager threading is
+    green; the profiler needs a real OS thread to sample whatever
+    greenlet is running, and the metrics lock must hold across OS threads. Resolved on use, so importing metrics (and the
+    analyses that import it) does not pull in eventlet.
+    """
+    if "eventlet" not in sys.modules:
+        return threading
+    try:
+        from eventlet.patcher import original
+        return original("threading")
+    except Exception:
+        return threading
+
+
+class _Span:
+    __slots__ = ("metrics", "name", "started")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Metrics:
+    """
+    Low-overhead tracing for the controller hot paths.
+
+    - span(name) / @timed(name): latency histograms per section
+    - count(name, n): monotonically increasing counters
+    - gauge(name, fn): values read when rendered
+    render() emits Prometheus text format (served on /mrt/metrics).
+
+    Modes: "off" (spans and counters are no-ops), "spans" (default) and
+    "profile" (spans plus a sampling profiler of the running stacks).
+    """
+
+    BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+               0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+    MODES = ("off", "spans", "profile")
+
+    def __init__(self):
+        self.enabled = True
+        self.mode = "spans"
+        self.profiler = SamplingProfiler()
+        # An OS lock: analyses running in eventlet's native thread pool
+        # record spans too, and a green lock contended across threads
+        # deadlocks. Nothing yields while holding it.
+        self._lock = _os_threading().Lock()
+        self.counters: Dict[str, float] = {}
+        # name -> [count, sum, per-bucket counts]
+        self.spans: Dict[str, list] = {}
+        self.gauges: Dict[str, Callable[[], float]] = {}
+
+    # ---------------------------------------
+    # Recording
+    # ---------------------------------------
+    def span(self, name):
+        return _Span(self, name) if self.enabled else _NULL_SPAN
+
+    def timed(self, name):
+        """Decorator form of span()."""
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - started)
+            return wrapper
+        return decorate
+
+    def observe(self, name, seconds):
+        idx = bisect.bisect_left(self.BUCKETS, seconds)
+        with self._lock:
+            span = self.spans.get(name)
+            if span is None:
+                span = self.spans[name] = [0, 0.0, [0] * len(self.BUCKETS)]
+            span[0] += 1
+            span[1] += seconds
+            if idx < len(self.BUCKETS):
+                span[2][idx] += 1
+
+    def count(self, name, value=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name, fn: Callable[[], float]):
+        self.gauges[name] = fn
+
+    # ---------------------------------------
+    # Control
+    # ---------------------------------------
+    def set_mode(self, mode):
+        if mode not in self.MODES:
+            raise ValueError(f"unknown metrics mode {mode!r}")
+        self.mode = mode
+        self.enabled = mode != "off"
+        if mode == "profile":
+            self.profiler.start()
+        else:
+            self.profiler.stop()
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.spans.clear()
+        self.profiler.reset()
+
+    # ---------------------------------------
+    # Prometheus Text Format
+    # ---------------------------------------
+    def render(self) -> str:
+        with self._lock:
+            counters = dict(self.counters)
+            spans = {k: (v[0], v[1], list(v[2])) for k, v in self.spans.items()}
+
+        lines = []
+        if spans:
+            lines.append("# HELP mrt_span_seconds Time spent in instrumented controller sections")
+            lines.append("# TYPE mrt_span_seconds histogram")
+        for name in sorted(spans):
+            count, total, buckets = spans[name]
+            cumulative = 0
+            for le, n in zip(self.BUCKETS, buckets):
+                cumulative += n
+                lines.append(f'mrt_span_seconds_bucket{{span="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'mrt_span_seconds_bucket{{span="{name}",le="+Inf"}} {count}')
+            lines.append(f'mrt_span_seconds_sum{{span="{name}"}} {total:.9f}')
+            lines.append(f'mrt_span_seconds_count{{span="{name}"}} {count}')
+
+        for name in sorted(counters):
+            lines.append(f"# TYPE mrt_{name}_total counter")
+            lines.append(f"mrt_{name}_total {counters[name]}")
+
+        for name in sorted(self.gauges):
+            try:
+                value = self.gauges[name]()
+            except Exception:
+                continue
+            lines.append(f"# TYPE mrt_{name} gauge")
+            lines.append(f"mrt_{name} {value}")
+
+        lines.append("# TYPE mrt_profiler_samples_total counter")
+        lines.append(f"mrt_profiler_samples_total {self.profiler.samples}")
+        return "\n".join(lines) + "\n"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler: an OS thread records every thread's stack
+    each interval. collapsed() returns "frame;frame;frame count" lines
+    (flamegraph.pl / speedscope input).
+    """
+
+    def __init__(self, interval=0.005, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: Dict[str, int] = collections.Counter()
+        self.samples = 0
+        self._stop = None
+        self._thread = None
+        self._threading = threading
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._threading = _os_threading()
+        self._stop = self._threading.Event()
+        self._thread = self._threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def reset(self):
+        self.stacks.clear()
+        self.samples = 0
+
+    def _run(self):
+        me = self._threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                self.stacks[self._collapse(frame)] += 1
+            self.samples += 1
+
+    def _collapse(self, frame) -> str:
+        names: List[str] = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def collapsed(self, top=None) -> str:
+        items = self.stacks.most_common(top)
+        return "\n".join(f"{stack} {n}" for stack, n in items) + "\n"
+
+
+# Global Instance
+metrics = Metrics()
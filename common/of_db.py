@@ -1,70 +1,305 @@
 import threading
-from typing import Dict, List, Optional
+import zlib
+from typing import Dict, List, Optional, Set
 from common.rt_attributes import RTAttributes, Link, Switch
+from common.topics import SubscriptionTrie, TopicTree
+from common.metrics import metrics
+from common.log import get_logger
+
+log = get_logger("of_db")
+
+
+def _bandwidth(flow: RTAttributes) -> float:
+    """A flow's BWi in Mbps (0 if it cannot be parsed)."""
+    try:
+        return flow.bandwidth_mbps
+    except ValueError:
+        return 0.0
+
 
 class OFDB:
     """
-    Singleton In-Memory Database representing the OpenFlow Database (OF-DB).
+    In-Memory Database representing the OpenFlow Database (OF-DB).
     Stores:
     - Flows (SRT Tables)
     - Topology (Switches, Links)
     - Multicast Groups
+    - Subscriptions (MQTT filters, '+' / '#')
+
+    Each instance is an independent store with its own lock; there is
+    no global one, every component is handed the store it works on.
     """
-    _instance = None
-    _lock = threading.Lock()
-
-    def __new__(cls):
-        with cls._lock:
-            if cls._instance is None:
-                cls._instance = super(OFDB, cls).__new__(cls)
-                cls._instance.flows: Dict[str, RTAttributes] = {} # Key: Topic
-                cls._instance.switches: Dict[int, Switch] = {} # Key: DPID
-                cls._instance.links: Dict[str, Link] = {} # Key: "src_dpid:port->dst_dpid"
-                cls._instance.multicast_groups: Dict[str, int] = {} # Key: Topic, Value: GroupID
-        return cls._instance
-
-    def add_flow(self, topic: str, flow_specs: RTAttributes):
-        """Register or update a flow in the database."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.flows: Dict[str, RTAttributes] = {} # Key: Topic
+        self.switches: Dict[int, Switch] = {} # Key: DPID
+        self.links: Dict[str, Link] = {} # Key: "src_dpid:port->dst_dpid"
+        self.port_links: Dict[tuple, Link] = {} # Key: (src_dpid, port)
+        self.multicast_groups: Dict[str, int] = {} # Key: Topic, Value: GroupID
+        self._group_topics: Dict[int, str] = {} # Key: GroupID, Value: Topic
+        self.link_flows: Dict[str, Set[str]] = {} # Key: Link key, Value: Topics routed over it
+        self.subscriptions = SubscriptionTrie() # Filter -> subscriber IPs
+        self.topic_index = TopicTree() # Flow topics, for filter lookups
+        # Bumped on every change that affects routing (topology, link load)
+        self.version = 0
+
+    @metrics.timed("db_add_flow")
+    def add_flow(self, topic: str, flow_specs: RTAttributes) -> bool:
+        """
+        Register or update a flow in the database, reserving its BWi on
+        every link of its route in the same step. Returns False (and
+        changes nothing) if a link lacks the residual capacity.
+        """
         with self._lock:
+            old = self.flows.get(topic)
+            old_links = old.route_links if old is not None else []
+            bw = _bandwidth(flow_specs)
+
+            # Capacity a re-registration already holds counts as free
+            held = set(old_links)
+            for link in flow_specs.route_links:
+                free = link.residual_bw + (_bandwidth(old) if link in held else 0.0)
+                if free < bw:
+                    return False
+
+            if old is None:
+                self.topic_index.add(topic, topic)
+            else:
+                self._reserve(old_links, -_bandwidth(old))
+                self._index_route(topic, old_links, [])
             self.flows[topic] = flow_specs
-            print(f"[OF-DB] Updated Flow for Topic: {topic} -> {flow_specs}")
+            self._reserve(flow_specs.route_links, bw)
+            self._index_route(topic, [], flow_specs.route_links)
+
+        # Logged after the lock is released; formatted on the log writer
+        log.debug("Updated flow %s (P=%s, D=%sms, %d links)",
+                  topic, flow_specs.pi, flow_specs.di, len(flow_specs.route_links))
+        return True
+
+    @metrics.timed("db_remove_flow")
+    def remove_flow(self, topic: str, release_group=True) -> Optional[RTAttributes]:
+        """
+        Drop a flow with its link index entries and group ID. Without
+        release_group the ID stays held (the switches may still have the
+        group) until release_multicast_group_id.
+        """
+        with self._lock:
+            flow = self.flows.pop(topic, None)
+            if flow is not None:
+                self.topic_index.remove(topic, topic)
+                self._reserve(flow.route_links, -_bandwidth(flow))
+                self._index_route(topic, flow.route_links, [])
+            if release_group:
+                self._release_group_id(topic)
+            return flow
+
+    @metrics.timed("db_set_route")
+    def set_route(self, flow: RTAttributes, links: List[Link], checked=False) -> bool:
+        """
+        Replace a flow's route and keep the link -> flows index and, for
+        a registered flow, the link reservations in step. With checked,
+        returns False (and changes nothing) if a link the flow does not
+        already hold lacks the residual capacity.
+        """
+        with self._lock:
+            if self.flows.get(flow.ft_i) is flow:
+                bw = _bandwidth(flow)
+                if checked:
+                    held = set(flow.route_links)
+                    if any(link.residual_bw < bw for link in links if link not in held):
+                        return False
+                self._reserve(flow.route_links, -bw)
+                self._reserve(links, bw)
+            self._index_route(flow.ft_i, flow.route_links, links)
+            flow.route_links = links
+        return True
+
+    def has_capacity(self, links: List[Link], bw_mbps: float) -> bool:
+        """Residual-capacity check: O(1) per link, no analysis."""
+        return all(link.residual_bw >= bw_mbps for link in links)
+
+    @staticmethod
+    def _reserve(links: List[Link], bw_mbps: float):
+        for link in dict.fromkeys(links):
+            link.bw_reserved = max(link.bw_reserved + bw_mbps, 0.0)
+
+    def flows_on_link(self, key: str) -> List[RTAttributes]:
+        with self._lock:
+            return [self.flows[t] for t in self.link_flows.get(key, ()) if t in self.flows]
+
+    def _index_route(self, topic: str, old: List[Link], new: List[Link]):
+        for link in old:
+            topics = self.link_flows.get(link.key)
+            if topics is not None:
+                topics.discard(topic)
+                if not topics:
+                    del self.link_flows[link.key]
+        for link in new:
+            self.link_flows.setdefault(link.key, set()).add(topic)
 
     def get_flow(self, topic: str) -> Optional[RTAttributes]:
         with self._lock:
             return self.flows.get(topic)
 
+    def set_measured_jitter(self, topic: str, jitter: float) -> Optional[RTAttributes]:
+        """Apply subscriber-measured jitter (ms) to a flow; None if unknown."""
+        with self._lock:
+            flow = self.flows.get(topic)
+            if flow is not None:
+                flow.measured_jitter = jitter
+            return flow
+
     def get_all_flows(self) -> Dict[str, RTAttributes]:
         with self._lock:
             return self.flows.copy()
 
-    def add_subscriber(self, topic: str, sub_ip: str):
+    def add_subscriber(self, topic_filter: str, sub_ip: str) -> List[RTAttributes]:
+        """
+        Record a subscription (wildcards allowed) and attach the subscriber
+        to every existing flow it matches. Flows registered later pick it
+        up via subscribers_for(). Returns the flows that gained sub_ip.
+        """
         with self._lock:
-            if topic in self.flows:
-                if sub_ip not in self.flows[topic].dst_ips:
-                    self.flows[topic].dst_ips.append(sub_ip)
-                print(f"[OF-DB] Added Subscriber {sub_ip} to Topic {topic}")
-            else:
-                print(f"[OF-DB] Warn: Topic {topic} not found. Subscriber {sub_ip} pending.")
+            self.subscriptions.add(topic_filter, sub_ip)
+            changed = []
+            for topic in self.topic_index.match(topic_filter):
+                flow = self.flows[topic]
+                if sub_ip not in flow.dst_ips:
+                    flow.dst_ips.append(sub_ip)
+                    changed.append(flow)
+
+        log.debug("Added subscriber %s to %s (%d flows)", sub_ip, topic_filter, len(changed))
+        return changed
+
+    def remove_subscriber(self, topic_filter: str, sub_ip: str) -> List[RTAttributes]:
+        """
+        Drop a subscription and detach the subscriber from the flows it
+        matched, unless another of its filters still matches them.
+        Returns the flows that lost sub_ip.
+        """
+        with self._lock:
+            self.subscriptions.remove(topic_filter, sub_ip)
+            changed = []
+            for topic in self.topic_index.match(topic_filter):
+                flow = self.flows[topic]
+                if sub_ip in flow.dst_ips and sub_ip not in self.subscriptions.match(topic):
+                    flow.dst_ips.remove(sub_ip)
+                    changed.append(flow)
+            return changed
+
+    def subscribers_for(self, topic: str) -> Set[str]:
+        """Subscribers whose filter matches a concrete topic."""
+        with self._lock:
+            return self.subscriptions.match(topic)
 
     # Topology Management
     def add_switch(self, dpid: int, switch_data: Switch):
         with self._lock:
             self.switches[dpid] = switch_data
+            self.version += 1
 
     def add_link(self, src: str, dst: str, port: int, link_data: Link):
-        key = f"{src}:{port}->{dst}"
         with self._lock:
-            self.links[key] = link_data
+            self._add_link(link_data)
+            self.version += 1
+
+    def remove_link(self, key: str) -> Optional[Link]:
+        with self._lock:
+            link = self._remove_link(key)
+            self.version += 1
+            return link
+
+    def remove_switch(self, dpid: int) -> List[Link]:
+        """Remove a switch and every link attached to it."""
+        with self._lock:
+            removed = self._remove_switch(dpid)
+            self.version += 1
+            return removed
+
+    def apply_topology(self, add_switches=(), remove_switches=(),
+                       add_links=(), remove_links=()) -> List[Link]:
+        """
+        Apply a batch of topology changes as one update (one version bump).
+        Links that already exist keep their object (and measured state).
+        Returns the links that were removed.
+        """
+        removed = []
+        with self._lock:
+            for key in remove_links:
+                link = self._remove_link(key)
+                if link is not None:
+                    removed.append(link)
+            for dpid in remove_switches:
+                removed.extend(self._remove_switch(dpid))
+            for switch in add_switches:
+                self.switches.setdefault(switch.dpid, switch)
+            for link in add_links:
+                if link.key not in self.links:
+                    self._add_link(link)
+            self.version += 1
+        return removed
+
+    def _add_link(self, link: Link):
+        self.links[link.key] = link
+        self.port_links[(link.src, link.port_out)] = link
+
+    def _remove_link(self, key: str) -> Optional[Link]:
+        link = self.links.pop(key, None)
+        if link is not None and self.port_links.get((link.src, link.port_out)) is link:
+            del self.port_links[(link.src, link.port_out)]
+        return link
+
+    def _remove_switch(self, dpid: int) -> List[Link]:
+        self.switches.pop(dpid, None)
+        node = str(dpid)
+        keys = [k for k, l in self.links.items() if node in (l.src, l.dst)]
+        return [self._remove_link(k) for k in keys]
+
+    def get_link_from_port(self, src: str, port: int) -> Optional[Link]:
+        with self._lock:
+            return self.port_links.get((src, port))
+
+    def update_link_load(self, link: Link, bw_used: float, utilization: float,
+                         drop_rate: float, queuing_delay: float):
+        """Apply measured load to a link (called by the statistics collector)."""
+        with self._lock:
+            link.bw_used = bw_used
+            link.utilization = utilization
+            link.drop_rate = drop_rate
+            link.queuing_delay = queuing_delay
+            self.version += 1
 
     # Multicast Management
+    # One ID per topic names its OpenFlow group, its meter and its
+    # 239.x.y.z address, so IDs stay within 24 bits (and below the
+    # programmer's fast-failover group range).
+    GROUP_ID_SPACE = 0xFFFFFF
+
     def get_multicast_group_id(self, topic: str) -> int:
+        """
+        The topic's group ID, allocated on first use: crc32(topic) in
+        1..GROUP_ID_SPACE (the same across restarts), probing past IDs
+        already held by another topic.
+        """
         with self._lock:
-            if topic not in self.multicast_groups:
-                # Simple generation of Group ID based on hash or counter
-                # For safety, ensure it fits in OpenFlow Group ID space
-                gid = abs(hash(topic)) % 0xFFFFFFF
+            gid = self.multicast_groups.get(topic)
+            if gid is None:
+                if len(self._group_topics) >= self.GROUP_ID_SPACE:
+                    raise RuntimeError("Multicast group IDs exhausted")
+                gid = zlib.crc32(topic.encode()) % self.GROUP_ID_SPACE + 1
+                while gid in self._group_topics:
+                    gid = gid % self.GROUP_ID_SPACE + 1
                 self.multicast_groups[topic] = gid
-            return self.multicast_groups[topic]
+                self._group_topics[gid] = topic
+            return gid
+
+    def release_multicast_group_id(self, topic: str):
+        with self._lock:
+            self._release_group_id(topic)
 
-# Global Instance
-of_db = OFDB()
+    def _release_group_id(self, topic: str):
+        """Caller holds the lock."""
+        gid = self.multicast_groups.pop(topic, None)
+        if gid is not None:
+            self._group_topics.pop(gid, None)
@@ -1,6 +1,23 @@
 
 from dataclasses import dataclass, field
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Union
+
+_BW_UNITS = {"bps": 1e-6, "kbps": 1e-3, "mbps": 1.0, "gbps": 1e3}
+
+
+def parse_bandwidth(value: Union[str, float, int]) -> float:
+    """
+    Parse a bandwidth such as "1Mbps", "500kbps" or 5.0 into Mbps.
+    Bare numbers are taken as Mbps.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    text = value.strip().lower().replace(" ", "")
+    for unit in sorted(_BW_UNITS, key=len, reverse=True):
+        if text.endswith(unit):
+            return float(text[:-len(unit)]) * _BW_UNITS[unit]
+    return float(text)
 
 @dataclass
 class RTAttributes:
@@ -29,12 +46,23 @@ class RTAttributes:
     broker_ips: List[str] = field(default_factory=list) # BAi
     route_links: List['Link'] = field(default_factory=list) # Li (List of Link objects)
     num_hops: int = 0 # ni
+    # Fast failover: protected link key -> pre-verified detour links
+    backup_routes: Dict[str, List['Link']] = field(default_factory=dict)
     
     # Multicast & Processing
     multicast_group_id: int = 0
     processing_delay: float = 0.0 # T_proc (Broker Processing Time)
     measured_jitter: float = 0.0
 
+    @property
+    def bandwidth_mbps(self) -> float:
+        return parse_bandwidth(self.bwi)
+
+    # Alias used by the Trajectory analysis
+    @property
+    def broker_processing_delay(self) -> float:
+        return self.processing_delay
+
     def __str__(self):
         return f"Flow {self.ft_i} [QoS={self.qi}, P={self.pi}, D={self.di}ms, BW={self.bwi}Mbps]"
 
@@ -54,7 +82,8 @@ class Link:
     dst: str # Switch DPID or Host IP
     port_out: int # Port on src connected to dst
     bw_capacity: float = 1000.0 # Mbps
-    bw_used: float = 0.0
+    bw_used: float = 0.0       # Measured (port statistics)
+    bw_reserved: float = 0.0   # Sum of admitted flows' BWi routed over the link
     
     # Delays (ms)
     prop_delay: float = 0.01   # Propagation Delay (Distance / Speed)
@@ -63,6 +92,44 @@ class Link:
     queuing_delay: float = 0.0 # Variable, calculated based on load
     jitter: float = 0.0        # Measured Jitter (J_SD)
 
+    # Load (updated from OpenFlow port statistics)
+    utilization: float = 0.0   # tx rate / bw_capacity, 0..1
+    drop_rate: float = 0.0     # tx_dropped / tx attempts, 0..1
+
+    @property
+    def key(self) -> str:
+        """OF-DB key: "src_dpid:port->dst_dpid"."""
+        return f"{self.src}:{self.port_out}->{self.dst}"
+
+    @property
+    def residual_bw(self) -> float:
+        """Capacity not yet reserved by admitted flows (Mbps)."""
+        return self.bw_capacity - self.bw_reserved
+
+    # Aliases used by the routing engine and the Trajectory analysis
+    @property
+    def propagation_delay(self) -> float:
+        return self.prop_delay
+
+    @propagation_delay.setter
+    def propagation_delay(self, value: float):
+        self.prop_delay = value
+
+    @property
+    def switching_delay(self) -> float:
+        return self.switch_delay
+
+    @property
+    def processing_delay(self) -> float:
+        return self.proc_delay
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __eq__(self, other):
+        if not isinstance(other, Link): return False
+        return self.key == other.key
+
     def get_transmission_delay(self, packet_size_bits: int) -> float:
         """
         Calculate Transmission Delay = Packet Size / Bandwidth.
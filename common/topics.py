@@ -0,0 +1,134 @@
+from typing import Dict, Hashable, Iterator, Set
+
+
+class _Node:
+    __slots__ = ("children", "values")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.values: Set[Hashable] = set()
+
+
+def _prune(path):
+    """Drop empty nodes bottom-up along the (parent, level, node) path."""
+    for parent, level, node in reversed(path):
+        if node.values or node.children:
+            break
+        del parent.children[level]
+
+
+class TopicTree:
+    """
+    Index of concrete MQTT topics (split on '/'), queried with
+    MQTT filters: '+' matches one level, '#' the rest (incl. the parent).
+    Cost follows the part of the tree the filter selects, not its size.
+    """
+
+    def __init__(self):
+        self.root = _Node()
+
+    def add(self, topic: str, value: Hashable):
+        node = self.root
+        for level in topic.split("/"):
+            node = node.children.setdefault(level, _Node())
+        node.values.add(value)
+
+    def remove(self, topic: str, value: Hashable):
+        node, path = self.root, []
+        for level in topic.split("/"):
+            child = node.children.get(level)
+            if child is None:
+                return
+            path.append((node, level, child))
+            node = child
+        node.values.discard(value)
+        _prune(path)
+
+    def match(self, pattern: str) -> Iterator[Hashable]:
+        levels = pattern.split("/")
+        stack = [(self.root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            if depth == len(levels):
+                yield from node.values
+                continue
+
+            level = levels[depth]
+            if level == "#":
+                yield from self._all(node)
+            elif level == "+":
+                stack.extend((child, depth + 1) for child in node.children.values())
+            else:
+                child = node.children.get(level)
+                if child is not None:
+                    stack.append((child, depth + 1))
+
+    @staticmethod
+    def _all(node):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            yield from node.values
+            stack.extend(node.children.values())
+
+
+class SubscriptionTrie:
+    """
+    Index of MQTT subscription filters ('+', '#') -> subscribers,
+    queried with a concrete topic. A lookup visits at most the exact,
+    '+' and '#' branch per level, so it costs O(topic depth) however
+    many filters are stored.
+    """
+
+    def __init__(self):
+        self.root = _Node()
+        self.count = 0
+
+    def add(self, topic_filter: str, subscriber: Hashable):
+        node = self.root
+        for level in topic_filter.split("/"):
+            node = node.children.setdefault(level, _Node())
+        if subscriber not in node.values:
+            node.values.add(subscriber)
+            self.count += 1
+
+    def remove(self, topic_filter: str, subscriber: Hashable):
+        node, path = self.root, []
+        for level in topic_filter.split("/"):
+            child = node.children.get(level)
+            if child is None:
+                return
+            path.append((node, level, child))
+            node = child
+        if subscriber in node.values:
+            node.values.discard(subscriber)
+            self.count -= 1
+        _prune(path)
+
+    def match(self, topic: str) -> Set[Hashable]:
+        levels = topic.split("/")
+        matched = set()
+        stack = [(self.root, 0)]
+        while stack:
+            node, depth = stack.pop()
+
+            # '#' also matches the parent level ("a/#" matches "a")
+            multi = node.children.get("#")
+            if multi is not None and not (depth == 0 and topic.startswith("$")):
+                matched |= multi.values
+
+            if depth == len(levels):
+                matched |= node.values
+                continue
+
+            child = node.children.get(levels[depth])
+            if child is not None:
+                stack.append((child, depth + 1))
+            # Wildcards never match '$' topics at the first level
+            single = node.children.get("+")
+            if single is not None and not (depth == 0 and topic.startswith("$")):
+                stack.append((single, depth + 1))
+        return matched
+
+    def __len__(self):
+        return self.count
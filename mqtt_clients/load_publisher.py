@@ -0,0 +1,316 @@
+import argparse
+import csv
+import math
+import queue
+import random
+import struct
+import sys
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
+
+# Payload header: sequence number, release time and send time (ns since
+# the epoch), so a subscriber can measure latency without the properties
+HEADER = struct.Struct("!QQQ")
+
+
+def encode_payload(seq, release_ns, sent_ns, size):
+    header = HEADER.pack(seq, release_ns, sent_ns)
+    return header + b"\0" * max(0, size - len(header))
+
+
+def decode_payload(payload):
+    """(seq, release_ns, sent_ns), or None for a foreign payload."""
+    if len(payload) < HEADER.size:
+        return None
+    return HEADER.unpack_from(payload)
+
+
+# ---------------------------
+# Timer Wheel
+# ---------------------------
+class TimerWheel:
+    """
+    Hashed timing wheel: schedule() is O(1) and each tick only scans its
+    own slot, so thousands of periodic topics cost one timer, not one
+    thread or heap entry each. Entries beyond one turn of the wheel stay
+    in their slot until their tick comes round.
+    """
+
+    def __init__(self, tick=0.001, slots=4096):
+        self.tick = tick
+        self.slots = slots
+        self.wheel = [[] for _ in range(slots)]
+        self.current = 0   # next tick to expire
+        self.pending = 0
+
+    def schedule(self, due_tick, item):
+        due_tick = max(due_tick, self.current)
+        self.wheel[due_tick % self.slots].append((due_tick, item))
+        self.pending += 1
+
+    def expire(self, until_tick):
+        """Items due at or before until_tick, in tick order."""
+        due = []
+        while self.current <= until_tick:
+            idx = self.current % self.slots
+            slot = self.wheel[idx]
+            if slot:
+                keep = []
+                for entry in slot:
+                    (due if entry[0] <= self.current else keep).append(entry[1])
+                self.wheel[idx] = keep
+            self.current += 1
+        self.pending -= len(due)
+        return due
+
+
+# ---------------------------
+# Workload
+# ---------------------------
+class Topic:
+    __slots__ = ("name", "fits", "period", "phase", "client", "seq", "static_props")
+
+    def __init__(self, name, fits, phase):
+        self.name = name
+        self.fits = fits                  # FiTS user properties (strings)
+        self.period = float(fits["ti"]) / 1000.0
+        self.phase = phase
+        self.client = None
+        self.seq = 0
+        self.static_props = list(fits.items())
+
+    def release(self, k):
+        """Offset of release k from the start (s); absolute, no drift."""
+        return self.phase + k * self.period
+
+
+def make_topics(args, rng):
+    """
+    `topics` periodic topics, periods log-uniform in the range (ms),
+    rate-monotonic priorities in `levels` bands, random phases.
+    """
+    lo, hi = (math.log(p) for p in args.periods)
+    periods = [math.exp(rng.uniform(lo, hi)) for _ in range(args.topics)]
+    order = sorted(range(args.topics), key=lambda i: periods[i], reverse=True)
+    prios = [0] * args.topics
+    for rank, i in enumerate(order):
+        prios[i] = 1 + rank * args.levels // args.topics
+
+    topics = []
+    for i, ti in enumerate(periods):
+        fits = {
+            "qi": str(args.qos), "pi": str(prios[i]), "ci": f"{args.trans_time:g}",
+            "ti": f"{ti:.3f}", "di": f"{ti * args.deadline_factor:.3f}", "bwi": args.min_bw,
+        }
+        topics.append(Topic(f"{args.prefix}/{i}", fits, rng.uniform(0.0, ti / 1000.0)))
+    return topics
+
+
+# ---------------------------
+# Send Log
+# ---------------------------
+class SendLog:
+    """Per-message send records, written to CSV by a background thread."""
+
+    FIELDS = ("topic", "seq", "release_ns", "sent_ns", "late_us")
+
+    def __init__(self, path):
+        self.records = queue.Queue()
+        self._file = open(path, "w", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.FIELDS)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def add(self, batch):
+        self.records.put(batch)
+
+    def _run(self):
+        while True:
+            batch = self.records.get()
+            if batch is None:
+                break
+            self._writer.writerows(batch)
+
+    def close(self):
+        self.records.put(None)
+        self._thread.join()
+        self._file.close()
+
+
+# ---------------------------
+# Load Publisher
+# ---------------------------
+class LoadPublisher:
+    """
+    Drives many periodic RT topics from one scheduler thread.
+
+    Releases come from a TimerWheel at absolute times (start + phase +
+    k * Ti), so late wake-ups are caught up rather than accumulated.
+    Each PUBLISH carries the topic's FiTS as MQTT v5 User Properties
+    (read by ORT-NM, paper Eq.5) plus seq / sent_ns; topics are spread
+    over a few connections whose network loops pipeline the publishes
+    (QoS 1 with a large in-flight window).
+    """
+
+    def __init__(self, args, topics, send_log=None):
+        self.args = args
+        self.topics = topics
+        self.send_log = send_log
+        self.clients = []
+        self.wheel = TimerWheel(tick=args.tick / 1000.0)
+        self.sent = 0
+        self.lateness = []   # release -> send (s), current report interval
+        self.running = True
+
+    # ---------------------------
+    # Connections
+    # ---------------------------
+    def connect(self):
+        for i in range(self.args.connections):
+            client = mqtt.Client(client_id=f"{self.args.client_id}-{i}", protocol=mqtt.MQTTv5)
+            client.max_inflight_messages_set(self.args.inflight)
+            client.max_queued_messages_set(0)
+            client.connect(self.args.host, self.args.port, 60)
+            client.loop_start()
+            self.clients.append(client)
+        for i, topic in enumerate(self.topics):
+            topic.client = self.clients[i % len(self.clients)]
+
+    def disconnect(self):
+        for client in self.clients:
+            client.disconnect()
+            client.loop_stop()
+
+    # ---------------------------
+    # Scheduler
+    # ---------------------------
+    def run(self, duration):
+        wheel = self.wheel
+        tick = wheel.tick
+        start = time.monotonic()
+        # Wall clock for the timestamps subscribers compare against
+        start_ns = time.time_ns()
+        for topic in self.topics:
+            wheel.schedule(int(topic.release(0) / tick), topic)
+
+        next_report = start + self.args.report
+        end_tick = int(duration / tick)
+        while self.running and wheel.current <= end_tick:
+            now = time.monotonic()
+            due = wheel.expire(min(int((now - start) / tick), end_tick))
+            if due:
+                self._publish(due, start, start_ns)
+            if now >= next_report:
+                self._report(now - start)
+                next_report += self.args.report
+            # Sleep to the next tick boundary (absolute, no drift)
+            time.sleep(max(0.0, start + wheel.current * tick - time.monotonic()))
+
+    def _publish(self, due, start, start_ns):
+        qos = self.args.qos
+        size = self.args.size
+        records = [] if self.send_log is not None else None
+        for topic in due:
+            release = topic.release(topic.seq)
+            release_ns = start_ns + int(release * 1e9)
+            sent_ns = time.time_ns()
+
+            properties = Properties(PacketTypes.PUBLISH)
+            properties.UserProperty = topic.static_props + [
+                ("seq", str(topic.seq)), ("sent_ns", str(sent_ns))
+            ]
+            topic.client.publish(topic.name, encode_payload(topic.seq, release_ns, sent_ns, size),
+                                 qos=qos, properties=properties)
+
+            late = max(0.0, time.monotonic() - start - release)
+            self.lateness.append(late)
+            if records is not None:
+                records.append((topic.name, topic.seq, release_ns, sent_ns, int(late * 1e6)))
+
+            topic.seq += 1
+            self.wheel.schedule(int(topic.release(topic.seq) / self.wheel.tick), topic)
+        self.sent += len(due)
+        if records:
+            self.send_log.add(records)
+
+    def _report(self, elapsed):
+        late = sorted(self.lateness)
+        self.lateness = []
+        if not late:
+            return
+
+        def p(q):
+            return late[min(len(late) - 1, int(q * len(late)))] * 1000.0
+
+        print(f"[LoadPub] t={elapsed:6.1f}s sent={self.sent:>9} "
+              f"rate={len(late) / self.args.report:>9.1f}/s "
+              f"late p50={p(0.5):.3f}ms p99={p(0.99):.3f}ms max={late[-1] * 1000.0:.3f}ms")
+
+
+# ---------------------------
+# Admission (ORT-NM, paper Fig.10)
+# ---------------------------
+def register(args, topics):
+    """Admit every topic up front; rejected topics are not published."""
+    from ort_nm.ort_nm import ORTNM
+
+    ort_nm = ORTNM(broker_ip=args.host)
+    admitted = [t for t in topics if ort_nm.handle_publish(t.name, t.fits, "PUBLISHER")]
+    print(f"[LoadPub] {len(admitted)}/{len(topics)} topics admitted")
+    return admitted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RT-Aware MQTT load publisher (many periodic topics)")
+    parser.add_argument("--host", required=True, help="MQTT Broker IP")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--topics", type=int, default=1000)
+    parser.add_argument("--prefix", default="load")
+    parser.add_argument("--periods", type=float, nargs=2, default=[10.0, 1000.0],
+                        metavar=("MIN", "MAX"), help="period range (ms), log-uniform")
+    parser.add_argument("--levels", type=int, default=8, help="rate-monotonic priority bands")
+    parser.add_argument("--trans_time", type=float, default=0.1, help="Ci (ms)")
+    parser.add_argument("--deadline-factor", type=float, default=1.0, help="Di = factor * Ti")
+    parser.add_argument("--min_bw", default="1Mbps")
+    parser.add_argument("--qos", type=int, default=1)
+    parser.add_argument("--size", type=int, default=64, help="payload bytes (>= 24)")
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--inflight", type=int, default=1000, help="QoS 1/2 in-flight window per connection")
+    parser.add_argument("--tick", type=float, default=1.0, help="timer wheel tick (ms)")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds")
+    parser.add_argument("--report", type=float, default=5.0, help="report interval (s)")
+    parser.add_argument("--log", help="CSV of per-message send timestamps")
+    parser.add_argument("--client-id", default="loadpub")
+    parser.add_argument("--skip-register", action="store_true",
+                        help="leave admission to the ORT-NM sniffer")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    topics = make_topics(args, random.Random(args.seed))
+    if not args.skip_register:
+        topics = register(args, topics)
+        if not topics:
+            print("[LoadPub] No topic admitted")
+            sys.exit(1)
+
+    send_log = SendLog(args.log) if args.log else None
+    publisher = LoadPublisher(args, topics, send_log)
+    publisher.connect()
+    try:
+        publisher.run(args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        publisher.disconnect()
+        if send_log is not None:
+            send_log.close()
+    print(f"[LoadPub] {publisher.sent} messages on {len(topics)} topics")
+
+
+if __name__ == "__main__":
+    main()
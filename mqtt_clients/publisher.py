@@ -2,8 +2,15 @@ import argparse
 import sys
 import time
 import paho.mqtt.client as mqtt
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
 from ort_nm.ort_nm import ORTNM
 
+try:
+    from mqtt_clients.load_publisher import encode_payload
+except ImportError:
+    from load_publisher import encode_payload
+
 # ---------------------------
 # Argument Parsing
 # ---------------------------
@@ -16,6 +23,7 @@ parser.add_argument("--trans_time", type=float, required=True)
 parser.add_argument("--period", type=float, required=True)
 parser.add_argument("--deadline", type=float, required=True)
 parser.add_argument("--min_bw", required=True)
+parser.add_argument("--size", type=int, default=64, help="payload bytes (>= 24)")
 
 args = parser.parse_args()
 
@@ -24,18 +32,19 @@ args = parser.parse_args()
 # ---------------------------
 ort_nm = ORTNM(broker_ip=args.host)
 
-rt_attributes = {
-    "qi": args.qos,
-    "pi": args.priority,
-    "ci": args.trans_time,
-    "ti": args.period,
-    "di": args.deadline,
-    "bwi": args.min_bw
+# FiTS as MQTT v5 User Properties (string pairs, paper Eq.5)
+user_props = {
+    "qi": str(args.qos),
+    "pi": str(args.priority),
+    "ci": str(args.trans_time),
+    "ti": str(args.period),
+    "di": str(args.deadline),
+    "bwi": str(args.min_bw)
 }
 
 admitted = ort_nm.handle_publish(
     topic=args.topic,
-    rt_attributes=rt_attributes,
+    user_props=user_props,
     src_ip="PUBLISHER"
 )
 
@@ -53,9 +62,23 @@ client = mqtt.Client(protocol=mqtt.MQTTv5)
 client.connect(args.host, 1883, 60)
 client.loop_start()
 
+# Absolute release times: k * period from the start, so sleep jitter
+# does not accumulate into drift
+period = args.period / 1000.0
+started = time.monotonic()
+# Wall clock for the timestamps subscribers compare against
+started_ns = time.time_ns()
 seq = 0
 while True:
-    payload = f"DATA {seq}"
-    client.publish(args.topic, payload, qos=args.qos)
+    # seq / send time in the payload header and as User Properties, so
+    # subscriber_agent.py can measure latency
+    release_ns = started_ns + int(seq * period * 1e9)
+    sent_ns = time.time_ns()
+    properties = Properties(PacketTypes.PUBLISH)
+    properties.UserProperty = list(user_props.items()) + [
+        ("seq", str(seq)), ("sent_ns", str(sent_ns))
+    ]
+    client.publish(args.topic, encode_payload(seq, release_ns, sent_ns, args.size),
+                   qos=args.qos, properties=properties)
     seq += 1
-    time.sleep(args.period / 1000.0)
+    time.sleep(max(0.0, started + seq * period - time.monotonic()))
@@ -0,0 +1,255 @@
+import argparse
+import csv
+import math
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+import requests
+
+try:
+    from mqtt_clients.load_publisher import decode_payload
+except ImportError:
+    from load_publisher import decode_payload
+
+CONTROLLER_URL = "http://localhost:8080/mrt"
+
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# ---------------------------
+# Per-Topic Statistics
+# ---------------------------
+class LatencyHistogram:
+    """Log-spaced buckets (~2.5% wide) from 1 us: run-long percentiles in O(1) memory."""
+
+    BASE = 0.001    # ms
+    GROWTH = 1.025
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+
+    def add(self, latency_ms):
+        idx = 0 if latency_ms <= self.BASE else int(math.log(latency_ms / self.BASE, self.GROWTH)) + 1
+        self.buckets[idx] = self.buckets.get(idx, 0) + 1
+        self.count += 1
+
+    def percentile(self, q):
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for idx in sorted(self.buckets):
+            seen += self.buckets[idx]
+            if seen >= target:
+                return self.BASE * self.GROWTH ** idx
+        return None
+
+
+class TopicStats:
+    """Receptions of one topic: the current report window and run totals."""
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+        self.last_seq = None
+        self.window = []          # latencies (ms) since the last report
+        self.window_misses = 0
+        self.window_lost = 0
+        self.received = 0
+        self.misses = 0
+        self.lost = 0
+        self.duplicates = 0
+        self.max = 0.0
+        self.histogram = LatencyHistogram()
+
+    def add(self, seq, latency_ms):
+        if self.last_seq is not None:
+            if seq <= self.last_seq:
+                # QoS 1 redelivery
+                self.duplicates += 1
+                return
+            gap = seq - self.last_seq - 1
+            self.window_lost += gap
+            self.lost += gap
+        self.last_seq = seq
+
+        missed = latency_ms > self.deadline
+        self.window.append(latency_ms)
+        self.window_misses += missed
+        self.received += 1
+        self.misses += missed
+        self.max = max(self.max, latency_ms)
+        self.histogram.add(latency_ms)
+
+    def report(self, topic):
+        """Compact aggregate of the window (then reset), None if empty."""
+        if not self.window:
+            return None
+        ordered = sorted(self.window)
+        report = {
+            "topic": topic, "n": len(ordered), "misses": self.window_misses,
+            "lost": self.window_lost, "min": round(ordered[0], 3),
+            "p50": round(_percentile(ordered, 0.5), 3), "p99": round(_percentile(ordered, 0.99), 3),
+            "max": round(ordered[-1], 3), "jitter": round(ordered[-1] - ordered[0], 3),
+        }
+        self.window = []
+        self.window_misses = 0
+        self.window_lost = 0
+        return report
+
+
+# ---------------------------
+# Subscriber Agent
+# ---------------------------
+class SubscriberAgent:
+    """
+    Measures end-to-end latency of RT flows at the subscriber.
+
+    Each reception is timestamped against the publisher's send time
+    (payload header, or the "sent_ns" User Property), checked against
+    the flow's Di (the "di" User Property, or a default), and counted
+    per topic. Every interval the window aggregates go to the
+    controller in one POST (/mrt/latency_feedback), which keeps the
+    flows' measured_jitter and drift flags.
+
+    Latencies compare wall clocks of two hosts: publisher and
+    subscriber need synchronized clocks (PTP / NTP), or --clock-offset.
+    """
+
+    def __init__(self, host, port=1883, subscriber_ip="", deadline=1000.0,
+                 clock_offset=0.0, controller_url=CONTROLLER_URL):
+        self.host = host
+        self.port = port
+        self.subscriber_ip = subscriber_ip
+        self.deadline = deadline
+        self.clock_offset = clock_offset     # ms, subtracted from every latency
+        self.controller_url = controller_url
+        self.topics = {}
+        self.foreign = 0                     # messages without a send timestamp
+        self._lock = threading.Lock()
+        self.client = mqtt.Client(protocol=mqtt.MQTTv5)
+        self.client.on_message = self._on_message
+
+    def start(self, filters, qos=1):
+        self.client.connect(self.host, self.port, 60)
+        self.client.subscribe([(f, qos) for f in filters])
+        self.client.loop_start()
+
+    def stop(self):
+        self.client.disconnect()
+        self.client.loop_stop()
+
+    # ---------------------------
+    # Reception
+    # ---------------------------
+    def _on_message(self, client, userdata, msg):
+        recv_ns = time.time_ns()
+        props = dict(getattr(msg.properties, "UserProperty", None) or ())
+        header = decode_payload(msg.payload)
+        if "sent_ns" in props:
+            seq, sent_ns = int(props.get("seq", 0)), int(props["sent_ns"])
+        elif header is not None:
+            seq, _, sent_ns = header
+        else:
+            self.foreign += 1
+            return
+
+        latency_ms = (recv_ns - sent_ns) / 1e6 - self.clock_offset
+        with self._lock:
+            stats = self.topics.get(msg.topic)
+            if stats is None:
+                deadline = float(props.get("di", self.deadline))
+                stats = self.topics[msg.topic] = TopicStats(deadline)
+            stats.add(seq, latency_ms)
+
+    # ---------------------------
+    # Feedback to Controller
+    # ---------------------------
+    def collect(self):
+        with self._lock:
+            reports = [s.report(t) for t, s in self.topics.items()]
+        return [r for r in reports if r is not None]
+
+    def send_feedback(self, interval):
+        reports = self.collect()
+        if not reports:
+            return 0
+        payload = {"subscriber_ip": self.subscriber_ip, "interval": interval, "reports": reports}
+        try:
+            requests.post(f"{self.controller_url}/latency_feedback", json=payload, timeout=1)
+        except requests.RequestException:
+            pass  # Next interval carries fresh aggregates
+        return len(reports)
+
+    def run(self, interval=2.0, duration=None):
+        started = time.monotonic()
+        k = 1
+        while duration is None or time.monotonic() - started < duration:
+            time.sleep(max(0.0, started + k * interval - time.monotonic()))
+            topics = self.send_feedback(interval)
+            print(f"[SubAgent] {topics} topics reported, "
+                  f"{sum(s.misses for s in self.topics.values())} deadline misses so far")
+            k += 1
+
+    # ---------------------------
+    # Run Summary
+    # ---------------------------
+    def summary(self):
+        rows = []
+        with self._lock:
+            for topic, s in sorted(self.topics.items()):
+                p50, p99 = s.histogram.percentile(0.5), s.histogram.percentile(0.99)
+                rows.append({
+                    "topic": topic, "received": s.received, "lost": s.lost,
+                    "duplicates": s.duplicates, "misses": s.misses,
+                    "miss_ratio": round(s.misses / s.received, 6) if s.received else 0.0,
+                    "p50_ms": round(p50, 3) if p50 is not None else None,
+                    "p99_ms": round(p99, 3) if p99 is not None else None,
+                    "max_ms": round(s.max, 3), "deadline_ms": s.deadline,
+                })
+        return rows
+
+    def write_summary(self, path):
+        rows = self.summary()
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ["topic"])
+            writer.writeheader()
+            writer.writerows(rows)
+        return rows
+
+
+# ---------------------------
+# Entry Point
+# ---------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RT subscriber agent: latency and deadline misses")
+    parser.add_argument("--host", required=True, help="MQTT Broker IP")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--topics", nargs="+", default=["#"], help="topic filters")
+    parser.add_argument("--qos", type=int, default=1)
+    parser.add_argument("--subscriber-ip", default="", help="reported to the controller")
+    parser.add_argument("--deadline", type=float, default=1000.0,
+                        help="Di (ms) for publishes without a 'di' User Property")
+    parser.add_argument("--clock-offset", type=float, default=0.0,
+                        help="subscriber clock minus publisher clock (ms)")
+    parser.add_argument("--interval", type=float, default=2.0, help="feedback interval (s)")
+    parser.add_argument("--duration", type=float, help="seconds (default: until interrupted)")
+    parser.add_argument("--controller", default=CONTROLLER_URL)
+    parser.add_argument("--summary", help="per-topic CSV written on exit")
+    args = parser.parse_args()
+
+    agent = SubscriberAgent(args.host, args.port, args.subscriber_ip, args.deadline,
+                            args.clock_offset, args.controller)
+    agent.start(args.topics, args.qos)
+    try:
+        agent.run(args.interval, args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        agent.stop()
+        agent.send_feedback(args.interval)
+        if args.summary:
+            agent.write_summary(args.summary)
@@ -10,6 +10,7 @@ MQTT_PORT = 1883
 MQTT_CONNECT = 1
 MQTT_PUBLISH = 3
 MQTT_SUBSCRIBE = 8
+MQTT_UNSUBSCRIBE = 10
 
 
 def parse_remaining_length(payload, idx):
@@ -90,6 +91,15 @@ def mqtt_packet_handler(pkt, ort_nm):
         subscriber_ip = pkt[IP].src if pkt.haslayer("IP") else "UNKNOWN"
         ort_nm.handle_subscribe(topic, subscriber_ip)
 
+    # ---------------- UNSUBSCRIBE ----------------
+    elif pkt_type == MQTT_UNSUBSCRIBE:
+        idx += 2  # Packet Identifier
+        _, idx = parse_remaining_length(payload, idx)
+
+        topic, _ = parse_utf8(payload, idx)
+        subscriber_ip = pkt[IP].src if pkt.haslayer("IP") else "UNKNOWN"
+        ort_nm.handle_unsubscribe(topic, subscriber_ip)
+
     # ---------------- PUBLISH ----------------
     elif pkt_type == MQTT_PUBLISH:
         topic, idx = parse_utf8(payload, idx)
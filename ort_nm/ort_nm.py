@@ -1,6 +1,19 @@
 # ort_nm/ort_nm.py
 
+import os
+import sys
+import threading
+import time
+
 import requests
+
+try:
+    from common.log import get_logger, setup_logging
+except ImportError:
+    # Run as a script (ort_nm/ort_nm.py): the repo root is not on the path
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from common.log import get_logger, setup_logging
+
 try:
     from ort_nm.mqtt_sniffer import start_sniffer
 except ImportError:
@@ -8,6 +21,8 @@ except ImportError:
 
 CONTROLLER_URL = "http://localhost:8080/mrt"
 
+log = get_logger("ort_nm")
+
 
 class ORTNM:
     """
@@ -15,19 +30,25 @@ class ORTNM:
     Paper Sections IV & V, Fig. 10
     """
 
+    # A publisher is considered gone after missing this many periods
+    LIVENESS_PERIODS = 3
+    MIN_IDLE = 5.0  # seconds
+
     def __init__(self, broker_ip):
         self.broker_ip = broker_ip
         self.active_clients = set()
         self.admitted_flows = set()
+        self.last_seen = {}   # topic -> time.monotonic() of last PUBLISH
+        self.periods = {}     # topic -> Ti (seconds)
 
     # ---------------- CONNECT ----------------
     def handle_connect(self, client_id):
         self.active_clients.add(client_id)
-        print(f"[ORT-NM] CONNECT: {client_id}")
+        log.debug("CONNECT: %s", client_id)
 
     # ---------------- SUBSCRIBE ----------------
     def handle_subscribe(self, topic, subscriber_ip):
-        print(f"[ORT-NM] SUBSCRIBE: {topic} from {subscriber_ip}")
+        log.debug("SUBSCRIBE: %s from %s", topic, subscriber_ip)
 
         payload = {
             "topic": topic,
@@ -39,11 +60,25 @@ class ORTNM:
             json=payload
         )
 
+    # ---------------- UNSUBSCRIBE ----------------
+    def handle_unsubscribe(self, topic, subscriber_ip):
+        log.debug("UNSUBSCRIBE: %s from %s", topic, subscriber_ip)
+
+        requests.post(
+            f"{CONTROLLER_URL}/deregister_subscriber",
+            json={"topic": topic, "subscriber_ip": subscriber_ip}
+        )
+
     # ---------------- PUBLISH ----------------
     def handle_publish(self, topic, user_props, src_ip):
         """
         Implements Fig.10 Steps 3–7
         """
+        if topic in self.admitted_flows:
+            # Already admitted: the publish only proves liveness
+            self.last_seen[topic] = time.monotonic()
+            return True
+
         # Extract FiTS from User Properties (paper Eq.5)
         try:
             rt_attributes = {
@@ -55,7 +90,7 @@ class ORTNM:
                 "bwi": user_props["bwi"]
             }
         except KeyError:
-            print("[ORT-NM] Missing RT attributes, ignoring publish")
+            log.warning("Missing RT attributes on %s, ignoring publish", topic)
             return False
 
         payload = {
@@ -70,16 +105,46 @@ class ORTNM:
             json=payload
         )
 
-        if resp.status_code == 200:
+        if resp.status_code == 200 and resp.json().get("status") == "ACCEPT":
             self.admitted_flows.add(topic)
-            print(f"[ORT-NM] FLOW ADMITTED: {topic}")
+            self.last_seen[topic] = time.monotonic()
+            self.periods[topic] = rt_attributes["ti"] / 1000.0
+            log.info("FLOW ADMITTED: %s", topic)
             return True
         else:
-            print(f"[ORT-NM] FLOW REJECTED: {topic}")
+            log.info("FLOW REJECTED: %s", topic)
             return False
 
 
+    # ---------------- LIVENESS ----------------
+    def expire_idle(self, now=None):
+        """Deregister flows whose publisher went quiet."""
+        now = time.monotonic() if now is None else now
+        expired = [
+            topic for topic in list(self.admitted_flows)
+            if now - self.last_seen.get(topic, now) >
+            max(self.LIVENESS_PERIODS * self.periods.get(topic, 0.0), self.MIN_IDLE)
+        ]
+        for topic in expired:
+            log.info("FLOW EXPIRED: %s", topic)
+            requests.post(f"{CONTROLLER_URL}/deregister_flow", json={"topic": topic})
+            self.admitted_flows.discard(topic)
+            self.last_seen.pop(topic, None)
+            self.periods.pop(topic, None)
+        return expired
+
+    def start_liveness(self, interval=1.0):
+        def _loop():
+            while True:
+                time.sleep(interval)
+                self.expire_idle()
+
+        threading.Thread(target=_loop, daemon=True).start()
+
+
 # ---------------- ENTRY POINT ----------------
 if __name__ == "__main__":
+    setup_logging()
     ort_nm = ORTNM(broker_ip="10.0.0.2")
+    ort_nm.start_liveness()
     start_sniffer(ort_nm)
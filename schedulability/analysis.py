@@ -1,8 +1,12 @@
 # schedulability/analysis.py
 
+import bisect
 import math
 from typing import List, Dict
 
+from common.metrics import metrics
+from schedulability.compiled import CompiledTrajectory
+
 
 # -------------------------------------------------
 # Utility: Interfering Flow Identification
@@ -31,6 +35,7 @@ class SchedulabilityUtils:
 class HolisticApproach:
 
     @staticmethod
+    @metrics.timed("analysis_ha")
     def calculate_wcrt(flow, all_flows):
         """
         Implements Equation (9) of the paper.
@@ -63,6 +68,7 @@ class HolisticApproach:
         # -----------------------------
         prev_w = 0.0
         w = flow.ci + blocking + static_delay
+        iterations = examined = 0
 
         for _ in range(100):  # bounded convergence
             if abs(w - prev_w) < 1e-6:
@@ -70,11 +76,13 @@ class HolisticApproach:
 
             prev_w = w
             interference = 0.0
+            iterations += 1
 
             for link in flow.route_links:
                 interfering_flows = SchedulabilityUtils.get_interfering_flows(
                     flow, all_flows, link
                 )
+                examined += len(interfering_flows)
 
                 for f_j in interfering_flows:
                     interference += math.ceil(
@@ -93,6 +101,213 @@ class HolisticApproach:
             if w > flow.di:
                 break
 
+        metrics.count("ha_iterations", iterations)
+        metrics.count("ha_interferers_examined", examined)
+        return w
+
+
+# -------------------------------------------------
+# Exact Response-Time Analysis (Eq. 9, incremental)
+# -------------------------------------------------
+class _LinkLevels:
+    """Flows on one link sorted by priority (highest first) with prefix sums."""
+
+    __slots__ = ("neg_pi", "flows", "cum_c", "cum_u", "cum_jc")
+
+    def __init__(self, flows):
+        self.flows = sorted(flows, key=lambda f: -f.pi)
+        self.neg_pi = [-f.pi for f in self.flows]
+        self.cum_c, self.cum_u, self.cum_jc = [0.0], [0.0], [0.0]
+        for f in self.flows:
+            self.cum_c.append(self.cum_c[-1] + f.ci)
+            self.cum_u.append(self.cum_u[-1] + f.ci / f.ti)
+            self.cum_jc.append(self.cum_jc[-1] + f.measured_jitter * f.ci / f.ti)
+
+    def interferers(self, pi):
+        """Number of leading flows with priority >= pi."""
+        return bisect.bisect_right(self.neg_pi, -pi)
+
+
+class ExactResponseTime:
+    """
+    Same fixed point as HolisticApproach (Eq. 9), without the iteration
+    cap, for repeated queries over a flow set that changes one flow at a
+    time (admission, deregistration).
+
+    - blocking per priority level and per-link priority-sorted prefix
+      sums are kept between calls and rebuilt only where flows changed
+    - the iteration starts from the largest known lower bound: the
+      closed form (base + sum J*C/T) / (1 - U), base + sum C, and the
+      flow's previous WCRT while its interference and base have only grown
+    - it stops as soon as a lower bound passes the deadline
+
+    Unschedulable flows get some value > di, not necessarily HA's.
+    stats counts calls, iterations, warm starts and early stops.
+    """
+
+    def __init__(self, flows=()):
+        self.flows: Dict[str, object] = {}
+        self._by_link: Dict[str, Dict[str, object]] = {}
+        self._levels: Dict[str, _LinkLevels] = {}
+        self._blocking = None
+        # ft_i -> (WCRT, base it was computed with: C + B + static delay + J)
+        self._warm: Dict[str, tuple] = {}
+        self.stats = {"calls": 0, "iterations": 0, "warm_starts": 0, "early_stops": 0}
+        for flow in flows:
+            self.add_flow(flow)
+
+    # ---------------------------------------
+    # Flow Set
+    # ---------------------------------------
+    def add_flow(self, flow):
+        """Interference only grows: cached WCRTs stay valid lower bounds."""
+        if flow.ft_i in self.flows:
+            self.remove_flow(flow)
+        self.flows[flow.ft_i] = flow
+        for link in flow.route_links:
+            self._by_link.setdefault(link.key, {})[flow.ft_i] = flow
+            self._levels.pop(link.key, None)
+        self._blocking = None
+
+    def remove_flow(self, flow):
+        """Drops the cached WCRTs this flow may have been inflating."""
+        flow = self.flows.pop(flow.ft_i, None)
+        if flow is None:
+            return
+        self._warm.pop(flow.ft_i, None)
+        for link in flow.route_links:
+            sharing = self._by_link.get(link.key, {})
+            sharing.pop(flow.ft_i, None)
+            for other in sharing.values():
+                if other.pi <= flow.pi:
+                    self._warm.pop(other.ft_i, None)
+            if not sharing:
+                self._by_link.pop(link.key, None)
+            self._levels.pop(link.key, None)
+        # Shrunken blocking is caught by the base stored with _warm
+        self._blocking = None
+
+    def update_flow(self, flow, grown=False):
+        """
+        Attributes changed (jitter, route, ...). grown=True promises that
+        only Ci or jitter went up on the same route, so cached WCRTs
+        stay valid lower bounds.
+        """
+        warm = dict(self._warm) if grown else None
+        self.remove_flow(flow)
+        self.add_flow(flow)
+        if grown:
+            self._warm = warm
+
+    # ---------------------------------------
+    # Precomputed Terms
+    # ---------------------------------------
+    def blocking(self, pi):
+        """B_i: largest C among flows with lower priority than pi."""
+        if self._blocking is None:
+            levels = sorted(self.flows.values(), key=lambda f: f.pi)
+            pis, below = [], []
+            largest = 0.0
+            for f in levels:
+                pis.append(f.pi)
+                below.append(largest)
+                largest = max(largest, f.ci)
+            self._blocking = (pis, below, largest)
+        pis, below, largest = self._blocking
+        idx = bisect.bisect_left(pis, pi)
+        return below[idx] if idx < len(pis) else largest
+
+    def _link_levels(self, key):
+        levels = self._levels.get(key)
+        if levels is None:
+            levels = self._levels[key] = _LinkLevels(self._by_link.get(key, {}).values())
+        return levels
+
+    # ---------------------------------------
+    # Fixed Point
+    # ---------------------------------------
+    @metrics.timed("analysis_rta")
+    def calculate_wcrt(self, flow, warm=True):
+        own = self.flows.get(flow.ft_i)
+        registered = own is flow
+        blocking = self.blocking(flow.pi)
+        static_delay = sum(
+            l.prop_delay + l.switch_delay + l.proc_delay + l.queuing_delay
+            for l in flow.route_links
+        )
+        base = (flow.ci + blocking + static_delay +
+                flow.measured_jitter + flow.processing_delay)
+
+        # Prefix sums over the interferers (priority >= pi) of each link
+        total_c = total_u = total_jc = 0.0
+        prefixes = []
+        for link in flow.route_links:
+            levels = self._link_levels(link.key)
+            k = levels.interferers(flow.pi)
+            total_c += levels.cum_c[k]
+            total_u += levels.cum_u[k]
+            total_jc += levels.cum_jc[k]
+            prefixes.append((levels, k))
+        if own is not None and own.pi >= flow.pi:
+            # The subject's registered copy sits in its own prefixes
+            own_links = {l.key for l in own.route_links}
+            n = sum(1 for l in flow.route_links if l.key in own_links)
+            total_c -= n * own.ci
+            total_u -= n * own.ci / own.ti
+            total_jc -= n * own.measured_jitter * own.ci / own.ti
+
+        self.stats["calls"] += 1
+        # w >= base + U*w + sum J*C/T, so w >= (base + sum J*C/T) / (1 - U)
+        bound = (base + total_jc) / (1.0 - total_u) if total_u < 1.0 else math.inf
+        if bound > flow.di:
+            return self._stopped(bound)
+
+        w = max(bound, base + total_c if base > 0 else base)
+        previous = self._warm.get(flow.ft_i) if warm and registered else None
+        # Only a lower bound while the base has not dropped (blocking,
+        # link delays measured lower, less jitter)
+        if previous is not None and previous[1] <= base and previous[0] > w:
+            w = previous[0]
+            self.stats["warm_starts"] += 1
+            metrics.count("rta_warm_starts")
+
+        interferers = [
+            (f.measured_jitter, f.ti, f.ci)
+            for levels, k in prefixes
+            for f in levels.flows[:k]
+            if f.ft_i != flow.ft_i
+        ]
+
+        slack = flow.di - base
+        iterations = 0
+        while True:
+            iterations += 1
+            interference = 0.0
+            for jitter, period, ci in interferers:
+                interference += math.ceil((w + jitter) / period) * ci
+                if interference > slack:
+                    break
+            w_next = base + interference
+            if w_next > flow.di:
+                self._count_iterations(iterations)
+                return self._stopped(w_next)
+            if abs(w_next - w) < 1e-6:
+                w = w_next
+                break
+            w = w_next
+
+        self._count_iterations(iterations)
+        if registered:
+            self._warm[flow.ft_i] = (w, base)
+        return w
+
+    def _count_iterations(self, iterations):
+        self.stats["iterations"] += iterations
+        metrics.count("rta_iterations", iterations)
+
+    def _stopped(self, w):
+        self.stats["early_stops"] += 1
+        metrics.count("rta_early_stops")
         return w
 
 
@@ -107,6 +322,7 @@ class TrajectoryApproach:
         Computes WCRT for a single multicast branch
         """
         w = 0.0
+        examined = 0
 
         for link in branch_links:
             # Transmission + static delay
@@ -122,16 +338,21 @@ class TrajectoryApproach:
             interfering_flows = SchedulabilityUtils.get_interfering_flows(
                 flow, all_flows, link
             )
+            examined += len(interfering_flows)
 
             for f_j in interfering_flows:
                 w += math.ceil(w / f_j.ti) * f_j.ci
 
             if w > flow.di:
-                return w
+                break
+        else:
+            w += flow.broker_processing_delay + flow.measured_jitter
 
-        return w + flow.broker_processing_delay + flow.measured_jitter
+        metrics.count("ta_interferers_examined", examined)
+        return w
 
     @staticmethod
+    @metrics.timed("analysis_ta")
     def calculate_wcrt(flow, all_flows):
         """
         For multicast:
@@ -159,12 +380,19 @@ class TrajectoryApproach:
 class AdmissionControl:
 
     @staticmethod
-    def check_admissibility(new_flow, existing_flows):
+    @metrics.timed("admission_check")
+    def check_admissibility(new_flow, existing_flows, compiler=None):
         """
         Admission control using Trajectory Analysis (TA)
+
+        With a SnapshotCompiler the candidate set is compiled (only the
+        new flow is extracted when the others were compiled before) and
+        TA runs on the arrays; the verdict is the same.
         """
 
         candidate_set = existing_flows + [new_flow]
+        if compiler is not None:
+            return AdmissionControl._check_compiled(compiler.compile(candidate_set))
 
         # Check new flow
         wcrt_new = TrajectoryApproach.calculate_wcrt(
@@ -183,3 +411,14 @@ class AdmissionControl:
                 return False
 
         return True
+
+    @staticmethod
+    def _check_compiled(snapshot):
+        # The new flow is the last one; then every existing flow
+        new = len(snapshot) - 1
+        if CompiledTrajectory.calculate_wcrt(snapshot, new) > snapshot.di[new]:
+            return False
+        return all(
+            CompiledTrajectory.calculate_wcrt(snapshot, i) <= snapshot.di[i]
+            for i in range(new)
+        )
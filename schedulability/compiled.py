@@ -0,0 +1,345 @@
+# schedulability/compiled.py
+
+import math
+import threading
+from array import array
+from multiprocessing import shared_memory
+from typing import Dict, List
+
+from common.metrics import metrics
+
+# Every column is 8 bytes wide, so one shared buffer keeps them aligned
+FLOAT_COLUMNS = (
+    "ci", "ti", "di", "jitter", "proc", "pi",                # per flow
+    "prop", "switch", "lproc", "queue", "static",            # per link
+    "block_pi", "block_c",                                   # per flow, by priority
+)
+INT_COLUMNS = (
+    "key",                                                   # per flow
+    "route_ptr", "route",                                    # flow -> links (CSR)
+    "link_ptr", "link_flows",                                # link -> flows (CSR)
+    "branch_ptr", "branch_link_ptr", "branch_links",         # flow -> branches -> links
+)
+
+
+# -------------------------------------------------
+# Snapshot (structure of arrays)
+# -------------------------------------------------
+class CompiledSnapshot:
+    """
+    A flow set flattened into contiguous arrays for repeated analysis.
+
+    Flow i (position in the compiled list): ci, ti, di, jitter, proc,
+    pi and key (index of the first flow with its topic, so copies of
+    the subject are excluded like HA / TA do). Link l: its four delays
+    and their sum (static). Adjacency in CSR form:
+    route[route_ptr[i]:route_ptr[i+1]] are flow i's links in route
+    order, link_flows[link_ptr[l]:link_ptr[l+1]] the flows on link l in
+    flow order, and flow i's destination branches are
+    branch_ptr[i]..branch_ptr[i+1] into branch_link_ptr / branch_links.
+
+    Read-only once built; share() puts it in shared memory for worker
+    processes, which attach() without copying.
+    """
+
+    def __init__(self, columns, topics, link_keys, largest_c):
+        for name, column in columns.items():
+            setattr(self, name, column)
+        self.topics: List[str] = topics
+        self.link_keys: List[str] = link_keys
+        self.largest_c = largest_c
+        self.index: Dict[str, int] = {}
+        for i, topic in enumerate(topics):
+            self.index.setdefault(topic, i)
+        self._shm = None
+
+    def __len__(self):
+        return len(self.topics)
+
+    def blocking(self, pi):
+        """B_i: largest C among flows with lower priority than pi."""
+        lo, hi = 0, len(self.block_pi)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.block_pi[mid] < pi:
+                lo = mid + 1
+            else:
+                hi = mid
+        return self.block_c[lo] if lo < len(self.block_pi) else self.largest_c
+
+    # ---------------------------------------
+    # Sharing With Worker Processes
+    # ---------------------------------------
+    def share(self):
+        """
+        Copy the columns into one shared memory block. Returns the
+        layout to pass to workers (small, picklable); the block lives
+        until release().
+        """
+        names = FLOAT_COLUMNS + INT_COLUMNS
+        sizes = [len(getattr(self, n)) * 8 for n in names]
+        self._shm = shared_memory.SharedMemory(create=True, size=max(sum(sizes), 8))
+        columns, offset = {}, 0
+        for name, size in zip(names, sizes):
+            column = getattr(self, name)
+            self._shm.buf[offset:offset + size] = column.tobytes()
+            columns[name] = (getattr(column, "typecode", None) or column.format, offset, size)
+            offset += size
+        return {"shm": self._shm.name, "columns": columns, "topics": self.topics,
+                "link_keys": self.link_keys, "largest_c": self.largest_c}
+
+    @classmethod
+    def attach(cls, layout):
+        """Read-only view of a shared snapshot (in a worker process)."""
+        shm = shared_memory.SharedMemory(name=layout["shm"])
+        view = shm.buf.toreadonly()
+        columns = {
+            name: view[offset:offset + size].cast(typecode)
+            for name, (typecode, offset, size) in layout["columns"].items()
+        }
+        snapshot = cls(columns, layout["topics"], layout["link_keys"], layout["largest_c"])
+        snapshot._shm = shm
+        return snapshot
+
+    def release(self, unlink=True):
+        if self._shm is None:
+            return
+        for name in FLOAT_COLUMNS + INT_COLUMNS:
+            column = getattr(self, name)
+            if isinstance(column, memoryview):
+                column.release()
+        self._shm.close()
+        if unlink:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._shm = None
+
+
+# -------------------------------------------------
+# Compiler (incremental)
+# -------------------------------------------------
+class SnapshotCompiler:
+    """
+    Builds CompiledSnapshots from RTAttributes lists.
+
+    A flow's route and branch rows are kept while its route list,
+    source and destinations are unchanged, so a recompile after one
+    admission re-extracts one flow; the rest is array concatenation.
+    The link table holds only links some compiled flow crosses: when
+    flows leave or move, unused links are dropped and the cached rows
+    renumbered rather than re-extracted. Routes are compared by list
+    identity: OFDB.set_route and the routing engine replace
+    route_links, they never edit it in place. Flow attributes (Ci,
+    jitter, ...) and link delays are re-read on every compile.
+    """
+
+    def __init__(self):
+        self.link_index: Dict[str, int] = {}
+        self._links = []
+        self._rows = {}   # id(flow) -> (flow, route_links, signature, (route, branches))
+        self._lock = threading.Lock()
+        self.stats = {"compiles": 0, "flows": 0, "extracted": 0}
+
+    def _link(self, link):
+        idx = self.link_index.get(link.key)
+        if idx is None:
+            idx = self.link_index[link.key] = len(self._links)
+            self._links.append(link)
+        else:
+            self._links[idx] = link
+        return idx
+
+    def _extract(self, flow):
+        route = [self._link(l) for l in flow.route_links]
+        # Same branch rule as TrajectoryApproach.calculate_wcrt
+        branches = [
+            [route[p] for p, l in enumerate(flow.route_links)
+             if l.dst == dst or l.src == flow.src_ip]
+            for dst in flow.dst_ips
+        ]
+        return route, branches
+
+    def _prune(self, rows):
+        """Drop links no row uses and renumber the rest, keeping their order."""
+        live = sorted({l for route, _ in rows for l in route})
+        if len(live) == len(self._links):
+            return rows
+        renumber = {old: new for new, old in enumerate(live)}
+        self._links = [self._links[l] for l in live]
+        self.link_index = {link.key: i for i, link in enumerate(self._links)}
+        return [([renumber[l] for l in route],
+                 [[renumber[l] for l in branch] for branch in branches])
+                for route, branches in rows]
+
+    @metrics.timed("snapshot_compile")
+    def compile(self, flows) -> CompiledSnapshot:
+        with self._lock:
+            return self._compile(flows)
+
+    def _compile(self, flows):
+        keys, rows = [], []
+        for flow in flows:
+            # The route list itself is held, so `is` cannot match a new
+            # list that reuses a freed one's id()
+            route = flow.route_links
+            signature = (len(route), flow.src_ip, tuple(flow.dst_ips))
+            cached = self._rows.get(id(flow))
+            if cached is None or cached[1] is not route or cached[2] != signature:
+                row = self._extract(flow)
+                self.stats["extracted"] += 1
+            else:
+                row = cached[3]
+            keys.append((flow, route, signature))
+            rows.append(row)
+        rows = self._prune(rows)
+        self._rows = {id(key[0]): key + (row,) for key, row in zip(keys, rows)}
+        self.stats["compiles"] += 1
+        self.stats["flows"] += len(flows)
+
+        columns = {name: array("d") for name in FLOAT_COLUMNS}
+        columns.update({name: array("q") for name in INT_COLUMNS})
+        c = columns
+
+        topics = [f.ft_i for f in flows]
+        first = {}
+        for i, flow in enumerate(flows):
+            c["ci"].append(flow.ci)
+            c["ti"].append(flow.ti)
+            c["di"].append(flow.di)
+            c["jitter"].append(flow.measured_jitter)
+            c["proc"].append(flow.processing_delay)
+            c["pi"].append(flow.pi)
+            c["key"].append(first.setdefault(flow.ft_i, i))
+
+        for link in self._links:
+            c["prop"].append(link.propagation_delay)
+            c["switch"].append(link.switching_delay)
+            c["lproc"].append(link.processing_delay)
+            c["queue"].append(link.queuing_delay)
+            c["static"].append(link.prop_delay + link.switch_delay +
+                               link.proc_delay + link.queuing_delay)
+
+        # flow -> links, flow -> branches -> links
+        on_link = [[] for _ in self._links]
+        c["route_ptr"].append(0)
+        c["branch_ptr"].append(0)
+        c["branch_link_ptr"].append(0)
+        for i, (route, branches) in enumerate(rows):
+            c["route"].extend(route)
+            c["route_ptr"].append(len(c["route"]))
+            for l in dict.fromkeys(route):
+                on_link[l].append(i)
+            for branch in branches:
+                c["branch_links"].extend(branch)
+                c["branch_link_ptr"].append(len(c["branch_links"]))
+            c["branch_ptr"].append(len(c["branch_link_ptr"]) - 1)
+
+        # link -> flows, in flow order (the order HA / TA sum in)
+        c["link_ptr"].append(0)
+        for members in on_link:
+            c["link_flows"].extend(members)
+            c["link_ptr"].append(len(c["link_flows"]))
+
+        # Blocking: per priority, the largest C strictly below it
+        largest = 0.0
+        for pi, ci in sorted(zip(c["pi"], c["ci"])):
+            c["block_pi"].append(pi)
+            c["block_c"].append(largest)
+            largest = max(largest, ci)
+
+        return CompiledSnapshot(columns, topics, list(self.link_index), largest)
+
+
+# -------------------------------------------------
+# Kernels (same results as HolisticApproach / TrajectoryApproach)
+# -------------------------------------------------
+def _interferers(snap, i, l):
+    """Flows on link l with priority >= flow i's, the subject excluded."""
+    pi, key = snap.pi, snap.key
+    p, k = pi[i], key[i]
+    return [j for j in snap.link_flows[snap.link_ptr[l]:snap.link_ptr[l + 1]]
+            if pi[j] >= p and key[j] != k]
+
+
+class CompiledHolistic:
+
+    @staticmethod
+    @metrics.timed("analysis_ha_compiled")
+    def calculate_wcrt(snap, i):
+        """HolisticApproach.calculate_wcrt for flow i of the snapshot."""
+        route = snap.route[snap.route_ptr[i]:snap.route_ptr[i + 1]]
+        ci = snap.ci[i]
+        blocking = snap.blocking(snap.pi[i])
+
+        static_delay = 0.0
+        for l in route:
+            static_delay += snap.static[l]
+
+        # The interferer set does not change between iterations
+        jitter, ti, cj = snap.jitter, snap.ti, snap.ci
+        interferers = [(jitter[j], ti[j], cj[j])
+                       for l in route for j in _interferers(snap, i, l)]
+
+        tail = snap.jitter[i]
+        di = snap.di[i]
+        prev_w = 0.0
+        w = ci + blocking + static_delay
+        iterations = 0
+
+        for _ in range(100):  # bounded convergence
+            if abs(w - prev_w) < 1e-6:
+                break
+
+            prev_w = w
+            interference = 0.0
+            iterations += 1
+            for j_jitter, j_ti, j_ci in interferers:
+                interference += math.ceil((prev_w + j_jitter) / j_ti) * j_ci
+
+            w = ci + blocking + static_delay + interference + tail + snap.proc[i]
+            if w > di:
+                break
+
+        metrics.count("ha_iterations", iterations)
+        metrics.count("ha_interferers_examined", iterations * len(interferers))
+        return w
+
+
+class CompiledTrajectory:
+
+    @staticmethod
+    def calculate_branch_wcrt(snap, i, b):
+        ci, di = snap.ci[i], snap.di[i]
+        ti, cj = snap.ti, snap.ci
+        w = 0.0
+        examined = 0
+
+        for l in snap.branch_links[snap.branch_link_ptr[b]:snap.branch_link_ptr[b + 1]]:
+            # Transmission + static delay
+            w += ci + snap.prop[l] + snap.switch[l] + snap.lproc[l] + snap.queue[l]
+
+            # Interference at this hop
+            interferers = _interferers(snap, i, l)
+            examined += len(interferers)
+            for j in interferers:
+                w += math.ceil(w / ti[j]) * cj[j]
+
+            if w > di:
+                break
+        else:
+            w += snap.proc[i] + snap.jitter[i]
+
+        metrics.count("ta_interferers_examined", examined)
+        return w
+
+    @staticmethod
+    @metrics.timed("analysis_ta_compiled")
+    def calculate_wcrt(snap, i):
+        """TrajectoryApproach.calculate_wcrt for flow i: max over its branches."""
+        return max(
+            (CompiledTrajectory.calculate_branch_wcrt(snap, i, b)
+             for b in range(snap.branch_ptr[i], snap.branch_ptr[i + 1])),
+            default=0.0
+        )
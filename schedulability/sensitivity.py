@@ -0,0 +1,164 @@
+# schedulability/sensitivity.py
+
+import math
+from typing import Dict, List, Optional
+
+from common.metrics import metrics
+from common.rt_attributes import RTAttributes
+from schedulability.compiled import CompiledTrajectory, SnapshotCompiler
+
+
+def _finite(value):
+    """JSON-safe: unbounded WCRTs (utilization >= 1) become None."""
+    return round(value, 4) if math.isfinite(value) else None
+
+
+class SensitivityAnalysis:
+    """
+    Headroom of an admitted flow set, without trial admissions:
+
+    - per flow: slack (Di - WCRT) and critical scaling factor, the
+      largest factor on Ci (i.e. on Ci/Ti) that keeps every flow
+      schedulable
+    - per link: the smallest slack among the flows crossing it and the
+      largest extra utilization a top-priority flow on that link alone
+      could add before a deadline is missed
+
+    Every probe runs the compiled Trajectory Approach, the test
+    admission uses, so "fits" here means "would be admitted". The flow
+    set is compiled once, with a zero-cost probe flow per link; a
+    binary search step edits one Ci in the snapshot and re-runs TA only
+    for the flows that Ci can delay.
+    """
+
+    def __init__(self, flows, tolerance=0.01, max_scale=100.0):
+        self.tolerance = tolerance
+        self.max_scale = max_scale
+        self.flows = {f.ft_i: f for f in flows}
+        self.links: Dict[str, tuple] = {}   # key -> (link, flows crossing it)
+        for flow in flows:
+            for link in flow.route_links:
+                self.links.setdefault(link.key, (link, []))[1].append(flow)
+
+        # A probe at the top priority with the link's shortest period;
+        # with Ci = 0 it delays nobody until a search sizes it
+        top = max((f.pi for f in flows), default=1)
+        self._probes = {}
+        for key, (link, crossing) in self.links.items():
+            period = min(f.ti for f in crossing)
+            self._probes[key] = RTAttributes(ft_i=f"$probe/{key}", qi=0, ci=0.0, pi=top,
+                                             ti=period, di=period, route_links=[link])
+        self.snap = SnapshotCompiler().compile(list(flows) + list(self._probes.values()))
+
+    def _wcrt(self, flow) -> float:
+        return CompiledTrajectory.calculate_wcrt(self.snap, self.snap.index[flow.ft_i])
+
+    # ---------------------------------------
+    # Flows
+    # ---------------------------------------
+    @metrics.timed("sensitivity_flow")
+    def flow_sensitivity(self, topic) -> Optional[dict]:
+        flow = self.flows.get(topic)
+        if flow is None:
+            return None
+        wcrt = self._wcrt(flow)
+        return {
+            "topic": topic,
+            "wcrt": _finite(wcrt),
+            "deadline": flow.di,
+            "slack": _finite(flow.di - wcrt),
+            "critical_scaling": _finite(self.critical_scaling(flow)),
+        }
+
+    def critical_scaling(self, flow) -> float:
+        """Largest factor on Ci before some deadline is missed (capped at max_scale)."""
+        snap = self.snap
+        i = snap.index[flow.ft_i]
+        # The flow itself and the flows it interferes with (TA has no
+        # blocking term, so nothing else sees its Ci)
+        affected = [flow]
+        for link in flow.route_links:
+            affected += [f for f in self.links[link.key][1]
+                         if f.pi <= flow.pi and f.ft_i != flow.ft_i]
+        ci = snap.ci[i]
+
+        def feasible(scale):
+            snap.ci[i] = ci * scale
+            return self._schedulable(affected)
+
+        try:
+            return self._search(feasible, self.max_scale)
+        finally:
+            snap.ci[i] = ci
+
+    # ---------------------------------------
+    # Links
+    # ---------------------------------------
+    @metrics.timed("sensitivity_link")
+    def link_sensitivity(self, key) -> Optional[dict]:
+        entry = self.links.get(key)
+        if entry is None:
+            return None
+        link, flows = entry
+        slack = min(f.di - self._wcrt(f) for f in flows)
+        return {
+            "link": key,
+            "flows": len(flows),
+            "slack": _finite(slack),
+            "max_extra_utilization": _finite(self.max_extra_utilization(key)),
+            "residual_bw": round(link.residual_bw, 4),
+        }
+
+    def max_extra_utilization(self, key) -> float:
+        """
+        Largest C/T of a probe flow at the top priority, routed over this
+        link only, that keeps every flow on the link schedulable. Its
+        period is the shortest one on the link.
+        """
+        snap = self.snap
+        p = snap.index[self._probes[key].ft_i]
+        period = snap.ti[p]
+        flows = self.links[key][1]
+
+        def feasible(utilization):
+            snap.ci[p] = utilization * period
+            return self._schedulable(flows)
+
+        try:
+            return self._search(feasible, 1.0)
+        finally:
+            snap.ci[p] = 0.0
+
+    # ---------------------------------------
+    # Report
+    # ---------------------------------------
+    def report(self) -> dict:
+        return {
+            "flows": [self.flow_sensitivity(t) for t in sorted(self.flows)],
+            "links": [self.link_sensitivity(k) for k in sorted(self.links)],
+        }
+
+    # ---------------------------------------
+    # Search
+    # ---------------------------------------
+    def _schedulable(self, flows: List[RTAttributes]) -> bool:
+        return all(self._wcrt(f) <= f.di for f in flows)
+
+    def _search(self, feasible, upper) -> float:
+        """
+        Largest x in [0, upper] with feasible(x), feasible monotone
+        decreasing: double from 1 to bracket it, then bisect.
+        """
+        lo, hi = 0.0, min(1.0, upper)
+        while feasible(hi):
+            if hi >= upper:
+                return upper
+            lo, hi = hi, min(hi * 2.0, upper)
+
+        while hi - lo > self.tolerance * max(lo, self.tolerance):
+            mid = (lo + hi) / 2.0
+            if feasible(mid):
+                lo = mid
+            else:
+                hi = mid
+        return lo
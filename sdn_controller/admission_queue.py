@@ -0,0 +1,91 @@
+# sdn_controller/admission_queue.py
+
+import queue
+import threading
+import time
+
+from common.log import get_logger
+
+log = get_logger("admission")
+
+
+class AdmissionRequest:
+    """One queued registration; the REST thread waits on it."""
+
+    def __init__(self, kind, payload, started, event):
+        self.kind = kind          # "flow" | "subscriber"
+        self.payload = payload
+        self.started = started    # time.monotonic() the request arrived
+        self.result = None
+        self.event = event
+
+    def complete(self, result):
+        self.result = result
+        self.event.set()
+
+    def wait(self, timeout=None):
+        self.event.wait(timeout)
+        return self.result
+
+
+class AdmissionQueue:
+    """
+    Single-writer admission pipeline.
+
+    REST handlers only enqueue and wait; one worker drains the queue,
+    collects everything that arrives within batch_window (up to
+    max_batch) and hands the batch to process_batch(requests), which
+    completes every request. All OF-DB writes for admission therefore
+    happen on one thread, in arrival order, and a batch can share one
+    snapshot and one programming round trip.
+
+    queue_factory / event_factory must match the caller's threading
+    model (ryu.lib.hub.Queue / hub.Event inside ryu-manager).
+    """
+
+    def __init__(self, process_batch, batch_window=0.005, max_batch=64,
+                 queue_factory=queue.Queue, event_factory=threading.Event):
+        self.process_batch = process_batch
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.event_factory = event_factory
+        self.queue = queue_factory()
+
+        self.batches = 0
+        self.processed = 0
+
+    def submit(self, kind, payload, started=None) -> AdmissionRequest:
+        started = time.monotonic() if started is None else started
+        request = AdmissionRequest(kind, payload, started, self.event_factory())
+        self.queue.put(request)
+        return request
+
+    def next_batch(self):
+        """Block for one request, then gather until the window closes."""
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        """Worker loop (hub.spawn / threading.Thread target)."""
+        while True:
+            batch = self.next_batch()
+            try:
+                self.process_batch(batch)
+            except Exception:
+                log.exception("Admission batch failed")
+            finally:
+                # Never leave a REST thread waiting on a failed batch
+                for request in batch:
+                    if not request.event.is_set():
+                        request.complete(False)
+            self.batches += 1
+            self.processed += len(batch)
@@ -0,0 +1,134 @@
+# sdn_controller/discovery.py
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List
+
+from common.rt_attributes import Link, Switch
+
+
+@dataclass
+class TopologyChange:
+    """Net effect of one coalesced batch of topology events."""
+    added_switches: List[int] = field(default_factory=list)
+    removed_switches: List[int] = field(default_factory=list)
+    added_links: List[Link] = field(default_factory=list)
+    removed_links: List[Link] = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.added_switches or self.removed_switches or
+                    self.added_links or self.removed_links)
+
+
+class TopologyDiscovery:
+    """
+    Keeps OF-DB switches / links in step with switch, link, host and
+    port-status events.
+
+    Events are only recorded as they arrive; flush() applies their net
+    effect to OF-DB in one update and calls on_change once, so a burst
+    of events during fabric churn triggers a single re-route / analysis
+    pass. Events that cancel out (link flap) are dropped.
+    """
+
+    def __init__(self, of_db, on_change=None, quiet_period=0.2, max_delay=1.0):
+        self.of_db = of_db
+        self.on_change = on_change
+        self.quiet_period = quiet_period  # flush after this long without events
+        self.max_delay = max_delay        # ... or this long after the first one
+
+        self._lock = threading.Lock()
+        self._switches = {}  # dpid -> Switch (enter) / None (leave)
+        self._links = {}     # key -> Link (add) / None (delete)
+        self._first = None
+        self._last = None
+
+        # (dst_dpid, dst_port) -> link key, to find the reverse
+        # direction of a port that went down
+        self._ingress = {}
+
+    # ---------------------------------------
+    # Event Recording
+    # ---------------------------------------
+    def _record(self, table, key, value):
+        now = time.monotonic()
+        with self._lock:
+            table[key] = value
+            self._first = now if self._first is None else self._first
+            self._last = now
+
+    def switch_enter(self, dpid: int, name: str = ""):
+        self._record(self._switches, dpid, Switch(dpid, name or f"s{dpid}"))
+
+    def switch_leave(self, dpid: int):
+        self._record(self._switches, dpid, None)
+
+    def link_add(self, src_dpid: int, src_port: int, dst_dpid: int, dst_port: int):
+        link = Link(str(src_dpid), str(dst_dpid), src_port)
+        self._ingress[(dst_dpid, dst_port)] = link.key
+        self._record(self._links, link.key, link)
+
+    def link_delete(self, src_dpid: int, src_port: int, dst_dpid: int):
+        self._record(self._links, f"{src_dpid}:{src_port}->{dst_dpid}", None)
+
+    def host_add(self, dpid: int, port_no: int, ip: str):
+        """A host is a pair of links: switch -> host and host -> switch."""
+        self._record(self._links, f"{dpid}:{port_no}->{ip}",
+                     Link(str(dpid), ip, port_no))
+        self._record(self._links, f"{ip}:0->{dpid}",
+                     Link(ip, str(dpid), 0))
+
+    def port_down(self, dpid: int, port_no: int):
+        """Both directions of the link on a port that lost carrier."""
+        out = self.of_db.get_link_from_port(str(dpid), port_no)
+        if out is not None:
+            self._record(self._links, out.key, None)
+        key = self._ingress.get((dpid, port_no))
+        if key is not None:
+            self._record(self._links, key, None)
+
+    # ---------------------------------------
+    # Coalesced Apply
+    # ---------------------------------------
+    def due(self, now=None) -> bool:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._first is None:
+                return False
+            return (now - self._last >= self.quiet_period or
+                    now - self._first >= self.max_delay)
+
+    def flush(self) -> TopologyChange:
+        with self._lock:
+            switches, self._switches = self._switches, {}
+            links, self._links = self._links, {}
+            self._first = self._last = None
+
+        change = TopologyChange(
+            added_switches=[d for d, s in switches.items() if s is not None],
+            removed_switches=[d for d, s in switches.items() if s is None],
+            added_links=[l for l in links.values() if l is not None],
+        )
+
+        # Only new links count as added; re-discovered ones keep their state
+        change.added_links = [l for l in change.added_links
+                              if l.key not in self.of_db.links]
+        change.added_switches = [d for d in change.added_switches
+                                 if d not in self.of_db.switches]
+
+        change.removed_links = self.of_db.apply_topology(
+            add_switches=[switches[d] for d in change.added_switches],
+            remove_switches=change.removed_switches,
+            add_links=change.added_links,
+            remove_links=[k for k, l in links.items() if l is None],
+        )
+
+        if change and self.on_change is not None:
+            self.on_change(change)
+        return change
+
+    def maybe_flush(self, now=None):
+        if self.due(now):
+            return self.flush()
+        return None
@@ -0,0 +1,347 @@
+# sdn_controller/domains.py
+
+import math
+import threading
+from typing import Dict, List, Optional
+
+from common.log import get_logger
+from common.of_db import OFDB
+from common.rt_attributes import RTAttributes
+from schedulability.analysis import ExactResponseTime
+
+log = get_logger("domains")
+
+
+# ---------------------------------------
+# Partition
+# ---------------------------------------
+class DomainPartition:
+    """
+    Switch -> domain map. A link belongs to the domain of its source
+    switch, so every boundary link has exactly one owner.
+    """
+
+    def __init__(self, domain_of: Dict[str, str]):
+        self.domain_of = {str(k): v for k, v in domain_of.items()}
+
+    @classmethod
+    def contiguous(cls, switches, domains: int) -> "DomainPartition":
+        """Split sorted DPIDs into `domains` consecutive blocks (d0, d1, ...)."""
+        ordered = sorted(switches)
+        size = math.ceil(len(ordered) / domains)
+        return cls({s: f"d{i // size}" for i, s in enumerate(ordered)})
+
+    @property
+    def domains(self) -> List[str]:
+        return sorted(set(self.domain_of.values()))
+
+    def owner(self, link) -> str:
+        return self.domain_of[str(link.src)]
+
+    def is_boundary(self, link) -> bool:
+        return self.domain_of.get(str(link.dst), self.owner(link)) != self.owner(link)
+
+    def segments(self, links) -> Dict[str, list]:
+        """Route links grouped by owning domain, in route order."""
+        segments = {}
+        for link in links:
+            segments.setdefault(self.owner(link), []).append(link)
+        return segments
+
+
+# ---------------------------------------
+# Interference Summaries
+# ---------------------------------------
+# Per link: {"static": ms, "levels": [[pi, sum C, sum C/T, sum J*C/T, min slack, max D]]}
+# Per domain: "blocking": [[pi, max C, min slack]]
+#
+# Slack is taken at the deadline: D - (base + I(D)) >= 0 means D is a
+# pre-fixed point of Eq. (9), so the flow stays schedulable as long as
+# added interference at D fits in it.
+
+def _interference_at(w, flow, links, on_link):
+    total = 0.0
+    for link in links:
+        for g in on_link(link.key):
+            if g.ft_i != flow.ft_i and g.pi >= flow.pi:
+                total += math.ceil((w + g.measured_jitter) / g.ti) * g.ci
+    return total
+
+
+def _static_delay(links):
+    return sum(l.prop_delay + l.switch_delay + l.proc_delay + l.queuing_delay for l in links)
+
+
+def _below(levels, pi, column):
+    """Largest `column` value among levels with priority lower than pi."""
+    return max((lv[column] for lv in levels if lv[0] < pi), default=0.0)
+
+
+def segment_bound(flow, keys, summary) -> float:
+    """
+    Upper bound of flow's response over its links `keys` in one domain,
+    from that domain's summary: Eq. (9) with ceil(x) <= x + 1, solved
+    in closed form. inf if the links are unknown or saturated.
+    """
+    links = summary["links"]
+    if any(k not in links for k in keys):
+        return math.inf
+
+    blocking = _below(summary["blocking"], flow.pi, 1)
+    base = flow.ci + blocking
+    utilization = 0.0
+    for key in keys:
+        base += links[key]["static"]
+        for pi, c, u, jc, _, _ in links[key]["levels"]:
+            if pi >= flow.pi:
+                base += c + jc
+                utilization += u
+    if utilization >= 1.0:
+        return math.inf
+    return base / (1.0 - utilization)
+
+
+def segment_fits(flow, keys, summary) -> bool:
+    """
+    Would the domain's flows keep their deadlines with flow added on
+    `keys`? Interfered flows (priority <= pi) must absorb flow's
+    interference at their deadline once per shared link, higher ones a
+    blocking term of up to Ci.
+    """
+    links = summary["links"]
+    for key in keys:
+        for pi, _, _, _, slack, deadline in links[key]["levels"]:
+            if pi <= flow.pi:
+                added = len(keys) * math.ceil((deadline + flow.measured_jitter) / flow.ti) * flow.ci
+                if slack < added:
+                    return False
+    blocking = summary["blocking"]
+    return all(slack >= flow.ci - _below(blocking, pi, 1)
+               for pi, _, slack in blocking if pi > flow.pi)
+
+
+# ---------------------------------------
+# Per-Domain Admission
+# ---------------------------------------
+class DomainAdmission:
+    """
+    One controller's share of a partitioned fabric.
+
+    - admit_local(): flows whose route stays on our links, exact RTA
+      over our flows only
+    - publish(): our interference summary to the other domains (MSDP)
+    - admit_cross_domain(): at the ingress domain, compositional
+      end-to-end bound = sum of per-domain segment bounds from the
+      summaries; each domain then gets its segment with a share of the
+      deadline (budget), admits it like a local flow and acks. Any
+      refusal releases the segments already installed.
+
+    Summaries may be stale (they only pre-filter and size the budgets);
+    the per-domain reserve step is what keeps every domain schedulable.
+    """
+
+    def __init__(self, domain: str, partition: DomainPartition, msdp, of_db=None):
+        self.domain = domain
+        self.partition = partition
+        self.msdp = msdp
+        self.of_db = of_db if of_db is not None else OFDB()
+        self.rta = ExactResponseTime()
+        self._lock = threading.Lock()
+        self._pending: Dict[str, dict] = {}   # topic -> segments awaiting acks
+        self._acks = threading.Lock()
+        msdp.on_segment = self._on_segment
+
+    def owns(self, links) -> bool:
+        return all(self.partition.owner(l) == self.domain for l in links)
+
+    # ---------------------------------------
+    # Local Flows
+    # ---------------------------------------
+    def admit_local(self, flow: RTAttributes) -> bool:
+        if not self.owns(flow.route_links):
+            return False
+        with self._lock:
+            return self._admit(flow)
+
+    def _admit(self, flow):
+        self.rta.add_flow(flow)
+        if self._schedulable(flow) and self.of_db.add_flow(flow.ft_i, flow):
+            return True
+        self.rta.remove_flow(flow)
+        return False
+
+    def _schedulable(self, flow):
+        """flow, the flows it interferes with, and those whose blocking it raises."""
+        affected = {flow.ft_i: flow}
+        for link in flow.route_links:
+            for other in self.of_db.flows_on_link(link.key):
+                if other.pi <= flow.pi:
+                    affected[other.ft_i] = other
+        for other in self.of_db.get_all_flows().values():
+            if other.pi > flow.pi:
+                affected[other.ft_i] = other
+        return all(self.rta.calculate_wcrt(f) <= f.di for f in affected.values())
+
+    # ---------------------------------------
+    # Summaries
+    # ---------------------------------------
+    def summary(self) -> dict:
+        with self._lock:
+            flows = list(self.of_db.get_all_flows().values())
+            slack = {}
+            for f in flows:
+                base = (f.ci + self.rta.blocking(f.pi) + _static_delay(f.route_links) +
+                        f.measured_jitter + f.processing_delay)
+                slack[f.ft_i] = f.di - base - _interference_at(
+                    f.di, f, f.route_links, self.of_db.flows_on_link)
+
+            links = {}
+            for key, link in self.of_db.links.items():
+                if self.partition.owner(link) != self.domain:
+                    continue
+                levels = {}
+                for f in self.of_db.flows_on_link(key):
+                    lv = levels.setdefault(f.pi, [f.pi, 0.0, 0.0, 0.0, math.inf, 0.0])
+                    lv[1] += f.ci
+                    lv[2] += f.ci / f.ti
+                    lv[3] += f.measured_jitter * f.ci / f.ti
+                    lv[4] = min(lv[4], slack[f.ft_i])
+                    lv[5] = max(lv[5], f.di)
+                links[key] = {"static": _static_delay([link]),
+                              "levels": sorted(levels.values(), reverse=True)}
+
+            blocking = {}
+            for f in flows:
+                lv = blocking.setdefault(f.pi, [f.pi, 0.0, math.inf])
+                lv[1] = max(lv[1], f.ci)
+                lv[2] = min(lv[2], slack[f.ft_i])
+
+        return {"domain": self.domain, "links": links,
+                "blocking": sorted(blocking.values(), reverse=True)}
+
+    def publish(self):
+        self.msdp.send_summary(self.summary())
+
+    def _summary_of(self, domain):
+        return self.summary() if domain == self.domain else self.msdp.remote_summary(domain)
+
+    # ---------------------------------------
+    # Cross-Domain Flows (ingress side)
+    # ---------------------------------------
+    def admit_cross_domain(self, flow: RTAttributes, timeout=2.0) -> Optional[float]:
+        """
+        Admit a flow whose route leaves our domain. Returns its
+        end-to-end bound, or None if rejected: a summary is missing or
+        stale, the bound misses Di, a domain's flows would suffer, or a
+        domain refuses (or does not confirm) its segment.
+        """
+        segments = self.partition.segments(flow.route_links)
+        bounds = {}
+        for domain, links in segments.items():
+            summary = self._summary_of(domain)
+            keys = [l.key for l in links]
+            if summary is None or not segment_fits(flow, keys, summary):
+                return None
+            bounds[domain] = segment_bound(flow, keys, summary)
+
+        fixed = flow.measured_jitter + flow.processing_delay
+        end_to_end = sum(bounds.values()) + fixed
+        if end_to_end > flow.di:
+            return None
+
+        # Deadline budgets proportional to each segment's bound; every
+        # domain re-checks its segment against its live state. A segment
+        # is admitted with the flow's jitter and processing delay (they
+        # are in its local WCRT), so its budget carries them too
+        scale = (flow.di - fixed) / (end_to_end - fixed) if end_to_end > fixed else 1.0
+        remote = [d for d in segments if d != self.domain]
+        pending = {"waiting": set(remote), "accepted": [], "event": threading.Event()}
+        if not remote:
+            pending["event"].set()
+        with self._acks:
+            self._pending[flow.ft_i] = pending
+        for domain, links in segments.items():
+            segment = {
+                "kind": "reserve", "to": domain, "from": self.domain,
+                "topic": flow.ft_i, "links": [l.key for l in links],
+                "ci": flow.ci, "pi": flow.pi, "ti": flow.ti, "bwi": flow.bwi,
+                "measured_jitter": flow.measured_jitter,
+                "processing_delay": flow.processing_delay,
+                "budget": bounds[domain] * scale + fixed,
+            }
+            if domain == self.domain:
+                if not self._reserve(segment):
+                    pending["event"].set()
+                    break
+                pending["accepted"].append(domain)
+            else:
+                self.msdp.send_segment(segment)
+
+        pending["event"].wait(timeout)
+        with self._acks:
+            del self._pending[flow.ft_i]
+            accepted = list(pending["accepted"])
+        if len(accepted) < len(segments):
+            for domain in accepted:
+                self._release(flow.ft_i, domain)
+            return None
+
+        log.info("Cross-domain flow %s admitted: bound %.3f ms over %d domains (D=%.3f)",
+                 flow.ft_i, end_to_end, len(segments), flow.di)
+        return end_to_end
+
+    def _release(self, topic, domain):
+        message = {"kind": "release", "to": domain, "from": self.domain, "topic": topic}
+        if domain == self.domain:
+            self._on_segment(message)
+        else:
+            self.msdp.send_segment(message)
+
+    # ---------------------------------------
+    # Segment Messages (reserve / ack / release)
+    # ---------------------------------------
+    def _on_segment(self, message):
+        if message["to"] != self.domain:
+            return
+        kind = message["kind"]
+        if kind == "reserve":
+            ok = self._reserve(message)
+            self.msdp.send_segment({"kind": "ack", "to": message["from"], "from": self.domain,
+                                    "topic": message["topic"], "ok": ok})
+        elif kind == "ack":
+            with self._acks:
+                pending = self._pending.get(message["topic"])
+                if pending is not None and message["from"] in pending["waiting"]:
+                    pending["waiting"].discard(message["from"])
+                    if message["ok"]:
+                        pending["accepted"].append(message["from"])
+                    if not message["ok"] or not pending["waiting"]:
+                        pending["event"].set()
+                    return
+            # Too late: the ingress already gave up on this flow
+            if message["ok"]:
+                self._release(message["topic"], message["from"])
+        elif kind == "release":
+            with self._lock:
+                flow = self.of_db.remove_flow(message["topic"])
+                if flow is not None:
+                    self.rta.remove_flow(flow)
+            self.publish()
+
+    def _reserve(self, segment) -> bool:
+        """Install a segment as a local flow with its budget, if it fits."""
+        links = [self.of_db.links.get(k) for k in segment["links"]]
+        if None in links:
+            log.warning("Segment of %s uses unknown links", segment["topic"])
+            return False
+        flow = RTAttributes(
+            ft_i=segment["topic"], qi=1, ci=segment["ci"], pi=segment["pi"],
+            ti=segment["ti"], di=segment["budget"], bwi=segment["bwi"],
+            route_links=links, measured_jitter=segment["measured_jitter"],
+            processing_delay=segment["processing_delay"]
+        )
+        with self._lock:
+            ok = self._admit(flow)
+        if ok:
+            self.publish()
+        return ok
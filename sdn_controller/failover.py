@@ -0,0 +1,136 @@
+# sdn_controller/failover.py
+
+from common.log import get_logger
+from common.metrics import metrics
+
+log = get_logger("failover")
+
+
+class FailoverManager:
+    """
+    Fast failover for admitted flows.
+
+    - protect(): pre-computes a schedulable detour for every link of a
+      flow's tree and installs it as fast-failover group buckets, so the
+      switch next to a failure repairs locally.
+    - handle_link_failure(): re-routes only the flows on the failed
+      links, swapping in their detours instead of recomputing the tree
+      and re-running admission; flows without a usable detour fall back
+      to a new tree that must pass admission again (residual bandwidth
+      and TA). Flows for which none passes, or whose repair the switches
+      reject, keep what is left of their tree and are recorded in
+      `failed` until a later re-route works.
+    """
+
+    def __init__(self, of_db, routing, programmer):
+        self.of_db = of_db
+        self.routing = routing
+        self.programmer = programmer
+        self.failed = {}  # topic -> keys of the links it lost
+
+    # ---------------------------------------
+    # Protection (after admission)
+    # ---------------------------------------
+    def protect(self, flow, datapaths):
+        flow.backup_routes = self.routing.compute_backup_routes(
+            flow, list(self.of_db.get_all_flows().values())
+        )
+        return self.programmer.program(flow, datapaths)
+
+    # ---------------------------------------
+    # Link Failure
+    # ---------------------------------------
+    def handle_link_failure(self, failed_links, datapaths):
+        """
+        Returns (swapped, recomputed, failed, completed_at): the flows
+        repaired from their backups, the flows re-admitted on a new
+        tree, the flows left without one, and the monotonic time of the
+        last confirming barrier reply.
+        """
+        affected = {}
+        for link in failed_links:
+            for flow in self.of_db.flows_on_link(link.key):
+                affected.setdefault(flow.ft_i, (flow, []))[1].append(link)
+
+        swapped, recomputed, failed = [], [], []
+        previous = {}  # topic -> (route, backups) the switches still hold
+
+        for flow, links in affected.values():
+            before = (flow.route_links, flow.backup_routes)
+            route = flow.route_links
+            for link in links:
+                route = self.routing.apply_backup(flow, link, route)
+                if route is None:
+                    break
+
+            # Detour links may have been reserved since the backup was
+            # computed: the swap only happens if they still have room
+            if route is not None and self.of_db.set_route(flow, route, checked=True):
+                swapped.append(flow)
+            elif self.routing.readmit(flow, [f for t, f in self.of_db.get_all_flows().items()
+                                             if t != flow.ft_i]):
+                recomputed.append(flow)
+                route = flow.route_links
+            else:
+                failed.append(flow)
+                self._unrecovered(flow, links, "no admissible tree is left")
+                continue
+
+            previous[flow.ft_i] = before
+            self.failed.pop(flow.ft_i, None)
+            # Keep the detours that still protect a live link of the new
+            # route; reprotect() fills in the rest
+            keys = {l.key for l in route}
+            flow.backup_routes = {
+                k: d for k, d in flow.backup_routes.items()
+                if k in keys and all(l.key in self.of_db.links for l in d)
+            }
+
+        # All repaired flows go out in one batch per switch
+        repaired = swapped + recomputed
+        result = self.programmer.program_many(repaired, datapaths)
+        completed = [result.completed_at]
+        if not result.ok:
+            # Rolled back as a whole: isolate the flows the switches
+            # reject, and point those back at the entries still installed
+            for flow in repaired:
+                retry = self.programmer.program(flow, datapaths)
+                if retry.ok:
+                    completed.append(retry.completed_at)
+                    continue
+                route, backups = previous[flow.ft_i]
+                self.of_db.set_route(flow, route)
+                flow.backup_routes = backups
+                swapped = [f for f in swapped if f is not flow]
+                recomputed = [f for f in recomputed if f is not flow]
+                failed.append(flow)
+                self._unrecovered(flow, affected[flow.ft_i][1],
+                                  "programming the repair was rolled back")
+
+        completed_at = max((t for t in completed if t is not None), default=None)
+        return swapped, recomputed, failed, completed_at
+
+    def _unrecovered(self, flow, links, reason):
+        """The flow keeps its partial tree until a later re-route works."""
+        self.failed[flow.ft_i] = [l.key for l in links]
+        metrics.count("failover_unrecovered")
+        log.error("Flow %s lost %s and is not repaired: %s",
+                  flow.ft_i, tuple(self.failed[flow.ft_i]), reason)
+
+    # ---------------------------------------
+    def reprotect(self, flows, datapaths):
+        """
+        Refresh detours after admission or a failure (off the critical
+        path), installed as one batch per switch. If the switches reject
+        it, flows are retried one by one to isolate the failing ones.
+        """
+        all_flows = list(self.of_db.get_all_flows().values())
+        for flow in flows:
+            flow.backup_routes = self.routing.compute_backup_routes(flow, all_flows)
+        if not flows or self.programmer.program_many(flows, datapaths).ok:
+            return
+        for flow in flows:
+            result = self.programmer.program(flow, datapaths)
+            if not result.ok:
+                log.error("Installing backups for %s failed on %s",
+                          flow.ft_i, tuple(result.failed))
@@ -0,0 +1,640 @@
+# sdn_controller/flow_programmer.py
+
+import contextlib
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from common.metrics import metrics
+
+ETH_TYPE_IP = 0x0800
+
+
+# ---------------------------------------
+# Installed / Desired Switch State
+# ---------------------------------------
+@dataclass(frozen=True)
+class MeterEntry:
+    meter_id: int
+    rate_kbps: int
+
+
+@dataclass(frozen=True)
+class GroupEntry:
+    group_id: int
+    # (out_port, queue_id, ff_group_id); a non-zero ff_group_id sends
+    # the bucket through that fast-failover group instead of out_port
+    buckets: Tuple[Tuple[int, int, int], ...]
+
+
+@dataclass(frozen=True)
+class FailoverGroupEntry:
+    group_id: int
+    buckets: Tuple[Tuple[int, int], ...]  # (watch/out port, queue_id), in preference order
+
+
+@dataclass(frozen=True)
+class FlowEntry:
+    ipv4_dst: str
+    group_id: int
+    meter_id: int = 0  # 0: not metered
+
+
+# ---------------------------------------
+# Completion Tracking
+# ---------------------------------------
+class PendingBatch:
+    """One switch's barrier-fenced batch awaiting its barrier reply."""
+
+    def __init__(self, dpid, event):
+        self.dpid = dpid
+        self.event = event
+        self.xids: List[int] = []
+        self.barrier_xid: Optional[int] = None
+        # xid -> (type, code) meaning "already applied" (retried batches)
+        self.benign: Dict[int, tuple] = {}
+        self.done_at: Optional[float] = None  # time.monotonic() of barrier reply
+        self.error: Optional[tuple] = None    # (type, code) of OFPErrorMsg
+
+
+@dataclass
+class ProgramResult:
+    ok: bool
+    completed_at: Optional[float] = None  # last barrier reply (time.monotonic)
+    retries: int = 0
+    failed: List[int] = field(default_factory=list)
+
+
+class FlowProgrammer:
+    """
+    Turns an admitted flow's multicast tree into per-switch
+    Meter / Group (type ALL) / Flow entries (ARCHITECTURE.md, Data Plane).
+
+    Keeps the state already installed on each switch, so re-routing a
+    flow only sends the entries that changed. Each switch's changes go
+    out as one barrier-fenced batch (OpenFlow 1.3 has no bundles), and
+    all switches of a tree are programmed concurrently.
+
+    Callers may program concurrently (admission, failover, reconnects):
+    each call holds the locks of the switches it touches from diff to
+    commit, taken in dpid order.
+
+    event_factory and lock_factory must match the caller's threading
+    model (ryu.lib.hub.Event / hub.Semaphore inside ryu-manager,
+    threading.Event / threading.Lock otherwise).
+    """
+
+    FLOW_PRIORITY = 100
+    MAX_QUEUE = 7
+    # Fast-failover groups live above the per-topic multicast group IDs
+    FF_GROUP_BASE = 0xF0000000
+
+    def __init__(self, of_db, event_factory=threading.Event, lock_factory=threading.Lock,
+                 barrier_timeout=2.0, max_retries=1):
+        self.of_db = of_db
+        self.event_factory = event_factory
+        self.lock_factory = lock_factory
+        self.barrier_timeout = barrier_timeout  # seconds
+        self.max_retries = max_retries
+        self._pending: Dict[tuple, PendingBatch] = {}  # (dpid, xid) -> batch
+        self.installed: Dict[int, Dict[tuple, object]] = {}   # dpid -> key -> entry
+        self.flow_keys: Dict[str, Dict[int, set]] = {}        # topic -> dpid -> keys
+        self._ff_ids: Dict[tuple, int] = {}  # (topic, dpid, port) -> FF group ID
+        self._next_ff_id = self.FF_GROUP_BASE
+        self._locks: Dict[int, object] = {}  # dpid -> lock
+
+    # ---------------------------------------
+    # Addressing
+    # ---------------------------------------
+    @staticmethod
+    def multicast_address(group_id: int) -> str:
+        """
+        Per-topic IPv4 multicast address (239.0.0.0/8) from the group ID;
+        OF-DB keeps IDs unique within 24 bits, so addresses are too.
+        """
+        return "239.%d.%d.%d" % (
+            (group_id >> 16) & 0xFF, (group_id >> 8) & 0xFF, group_id & 0xFF
+        )
+
+    def _switch_dpid(self, node):
+        try:
+            dpid = int(node)
+        except (TypeError, ValueError):
+            return None  # host IP
+        return dpid if dpid in self.of_db.switches else None
+
+    # ---------------------------------------
+    # Desired State (Tree -> Entries)
+    # ---------------------------------------
+    def build_state(self, flow) -> Dict[int, Dict[tuple, object]]:
+        group_id = flow.multicast_group_id
+        queue_id = min(max(flow.pi, 0), self.MAX_QUEUE)
+
+        ports: Dict[int, list] = {}
+        downstream = set()
+        for link in flow.route_links:
+            dpid = self._switch_dpid(link.src)
+            if dpid is None:
+                continue
+            ports.setdefault(dpid, []).append(link.port_out)
+            dst = self._switch_dpid(link.dst)
+            if dst is not None:
+                downstream.add(dst)
+
+        failover, detour_ports = self._failover_ports(flow, ports)
+
+        # Police the reserved bandwidth where the flow enters the tree
+        try:
+            rate_kbps = int(flow.bandwidth_mbps * 1000)
+        except ValueError:
+            rate_kbps = 0
+        # The group ID doubles as the meter ID (both unique per topic)
+        meter_id = group_id if rate_kbps > 0 else 0
+
+        address = self.multicast_address(group_id)
+        state = {}
+        for dpid in set(ports) | set(detour_ports):
+            entries = {}
+            buckets = []
+            for port in sorted(set(ports.get(dpid, []) + detour_ports.get(dpid, []))):
+                backup = failover.get((dpid, port))
+                if backup is None:
+                    buckets.append((port, queue_id, 0))
+                    continue
+                ff_id = self._ff_group_id(flow.ft_i, dpid, port)
+                entries[("ffgroup", ff_id)] = FailoverGroupEntry(
+                    ff_id, ((port, queue_id), (backup, queue_id))
+                )
+                buckets.append((port, queue_id, ff_id))
+            entries[("group", group_id)] = GroupEntry(group_id, tuple(buckets))
+
+            metered = meter_id if dpid in ports and dpid not in downstream else 0
+            if metered:
+                entries[("meter", meter_id)] = MeterEntry(meter_id, rate_kbps)
+
+            entries[("flow", address)] = FlowEntry(address, group_id, metered)
+            state[dpid] = entries
+
+        return state
+
+    def _failover_ports(self, flow, ports):
+        """
+        From flow.backup_routes:
+        - (dpid, primary port) -> first-hop port of the detour, for the
+          switch that repairs locally with a fast-failover group;
+        - dpid -> ports for detour hops on switches off the primary tree,
+          pre-installed so repaired traffic is forwarded before the
+          controller reacts (they receive nothing until a failover).
+        """
+        failover, detour_ports = {}, {}
+        for key, detour in flow.backup_routes.items():
+            primary = next((l for l in flow.route_links if l.key == key), None)
+            if primary is None or not detour or detour[0].src != primary.src:
+                continue
+            dpid = self._switch_dpid(primary.src)
+            if dpid is None:
+                continue
+            failover[(dpid, primary.port_out)] = detour[0].port_out
+
+            for hop in detour[1:]:
+                hop_dpid = self._switch_dpid(hop.src)
+                if hop_dpid is not None and hop_dpid not in ports:
+                    detour_ports.setdefault(hop_dpid, []).append(hop.port_out)
+
+        return failover, detour_ports
+
+    def _ff_group_id(self, topic, dpid, port):
+        key = (topic, dpid, port)
+        if key not in self._ff_ids:
+            self._ff_ids[key] = self._next_ff_id
+            self._next_ff_id += 1
+        return self._ff_ids[key]
+
+    # ---------------------------------------
+    # Diff Against Installed State
+    # ---------------------------------------
+    def diff(self, topic, desired):
+        """
+        Returns dpid -> (adds, mods, deletes), each a list of (key, entry).
+        Switches with nothing to change are left out.
+        """
+        owned = self.flow_keys.get(topic, {})
+        changes = {}
+
+        for dpid in set(owned) | set(desired):
+            installed = self.installed.get(dpid, {})
+            old = {k: installed[k] for k in owned.get(dpid, ()) if k in installed}
+            new = desired.get(dpid, {})
+
+            adds = [(k, e) for k, e in new.items() if k not in old]
+            mods = [(k, e) for k, e in new.items() if k in old and old[k] != e]
+            deletes = [(k, e) for k, e in old.items() if k not in new]
+
+            if adds or mods or deletes:
+                changes[dpid] = (adds, mods, deletes)
+
+        return changes
+
+    def _commit(self, topic, dpid, change):
+        adds, mods, deletes = change
+        installed = self.installed.setdefault(dpid, {})
+        owned = self.flow_keys.setdefault(topic, {}).setdefault(dpid, set())
+
+        for key, entry in adds + mods:
+            installed[key] = entry
+            owned.add(key)
+        for key, entry in deletes:
+            installed.pop(key, None)
+            owned.discard(key)
+            if isinstance(entry, FailoverGroupEntry):
+                self._ff_ids.pop((topic, dpid, entry.buckets[0][0]), None)
+
+        if not owned:
+            del self.flow_keys[topic][dpid]
+        if not self.flow_keys[topic]:
+            del self.flow_keys[topic]
+
+    # ---------------------------------------
+    # OpenFlow Messages
+    # ---------------------------------------
+    def build_messages(self, datapath, change):
+        """
+        Order matters inside the batch: meters and groups must exist
+        before flows reference them, and flows go before the meters and
+        groups they reference are deleted.
+        """
+        return [msg for msg, _ in self._messages(datapath, change)]
+
+    def _messages(self, datapath, change):
+        """
+        (message, error) pairs in batch order. error is the (type, code)
+        the switch answers if the message was already applied (an ADD
+        of an existing group / meter, a DELETE of a deleted meter), None
+        when re-sending is harmless anyway.
+        """
+        ofproto = datapath.ofproto
+        exists = {
+            "meter": (ofproto.OFPET_METER_MOD_FAILED, ofproto.OFPMMFC_METER_EXISTS),
+            "ffgroup": (ofproto.OFPET_GROUP_MOD_FAILED, ofproto.OFPGMFC_GROUP_EXISTS),
+            "group": (ofproto.OFPET_GROUP_MOD_FAILED, ofproto.OFPGMFC_GROUP_EXISTS),
+        }
+        unknown_meter = (ofproto.OFPET_METER_MOD_FAILED, ofproto.OFPMMFC_UNKNOWN_METER)
+        adds, mods, deletes = change
+
+        msgs = []
+        for kind in ("meter", "ffgroup", "group", "flow"):
+            msgs += [(self._add_msg(datapath, e, modify=False), exists.get(kind))
+                     for key, e in adds if key[0] == kind]
+            msgs += [(self._add_msg(datapath, e, modify=True), None)
+                     for key, e in mods if key[0] == kind]
+        for kind in ("flow", "group", "ffgroup", "meter"):
+            msgs += [(self._delete_msg(datapath, e), unknown_meter if kind == "meter" else None)
+                     for key, e in deletes if key[0] == kind]
+        return msgs
+
+    def _add_msg(self, datapath, entry, modify):
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+
+        if isinstance(entry, MeterEntry):
+            bands = [parser.OFPMeterBandDrop(rate=entry.rate_kbps, burst_size=0)]
+            return parser.OFPMeterMod(
+                datapath,
+                command=ofproto.OFPMC_MODIFY if modify else ofproto.OFPMC_ADD,
+                flags=ofproto.OFPMF_KBPS,
+                meter_id=entry.meter_id,
+                bands=bands
+            )
+
+        if isinstance(entry, GroupEntry):
+            buckets = [
+                parser.OFPBucket(
+                    weight=0,
+                    watch_port=ofproto.OFPP_ANY,
+                    watch_group=ofproto.OFPG_ANY,
+                    actions=(
+                        [parser.OFPActionGroup(ff_id)] if ff_id else
+                        [parser.OFPActionSetQueue(queue), parser.OFPActionOutput(port)]
+                    )
+                )
+                for port, queue, ff_id in entry.buckets
+            ]
+            return parser.OFPGroupMod(
+                datapath,
+                command=ofproto.OFPGC_MODIFY if modify else ofproto.OFPGC_ADD,
+                type_=ofproto.OFPGT_ALL,
+                group_id=entry.group_id,
+                buckets=buckets
+            )
+
+        if isinstance(entry, FailoverGroupEntry):
+            # First bucket whose watched port is live forwards the packet
+            buckets = [
+                parser.OFPBucket(
+                    weight=0,
+                    watch_port=port,
+                    watch_group=ofproto.OFPG_ANY,
+                    actions=[parser.OFPActionSetQueue(queue),
+                             parser.OFPActionOutput(port)]
+                )
+                for port, queue in entry.buckets
+            ]
+            return parser.OFPGroupMod(
+                datapath,
+                command=ofproto.OFPGC_MODIFY if modify else ofproto.OFPGC_ADD,
+                type_=ofproto.OFPGT_FF,
+                group_id=entry.group_id,
+                buckets=buckets
+            )
+
+        inst = []
+        if entry.meter_id:
+            inst.append(parser.OFPInstructionMeter(entry.meter_id, ofproto.OFPIT_METER))
+        inst.append(parser.OFPInstructionActions(
+            ofproto.OFPIT_APPLY_ACTIONS,
+            [parser.OFPActionGroup(entry.group_id)]
+        ))
+        return parser.OFPFlowMod(
+            datapath=datapath,
+            command=ofproto.OFPFC_MODIFY_STRICT if modify else ofproto.OFPFC_ADD,
+            priority=self.FLOW_PRIORITY,
+            match=self._match(parser, entry),
+            instructions=inst
+        )
+
+    def _delete_msg(self, datapath, entry):
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+
+        if isinstance(entry, MeterEntry):
+            return parser.OFPMeterMod(
+                datapath, command=ofproto.OFPMC_DELETE, meter_id=entry.meter_id
+            )
+
+        if isinstance(entry, (GroupEntry, FailoverGroupEntry)):
+            return parser.OFPGroupMod(
+                datapath, command=ofproto.OFPGC_DELETE, group_id=entry.group_id
+            )
+
+        return parser.OFPFlowMod(
+            datapath=datapath,
+            command=ofproto.OFPFC_DELETE_STRICT,
+            priority=self.FLOW_PRIORITY,
+            out_port=ofproto.OFPP_ANY,
+            out_group=ofproto.OFPG_ANY,
+            match=self._match(parser, entry)
+        )
+
+    @staticmethod
+    def _match(parser, entry):
+        return parser.OFPMatch(eth_type=ETH_TYPE_IP, ipv4_dst=entry.ipv4_dst)
+
+    # ---------------------------------------
+    # Programming (parallel fan-out)
+    # ---------------------------------------
+    def send_batch(self, datapath, change, retry=False):
+        """
+        Send one switch's changes followed by a barrier.
+        Returns a PendingBatch completed by the barrier reply,
+        or failed by an error reply to any message in the batch.
+
+        A retry re-sends a batch the switch may already have applied,
+        so "already exists" / "already deleted" replies do not fail it.
+        """
+        batch = PendingBatch(datapath.id, self.event_factory())
+
+        msgs = self._messages(datapath, change)
+        msgs.append((datapath.ofproto_parser.OFPBarrierRequest(datapath), None))
+        for msg, benign in msgs:
+            xid = datapath.set_xid(msg)
+            self._pending[(datapath.id, xid)] = batch
+            batch.xids.append(xid)
+            if retry and benign is not None:
+                batch.benign[xid] = benign
+        batch.barrier_xid = batch.xids[-1]
+
+        for msg, _ in msgs:
+            datapath.send_msg(msg)
+        return batch
+
+    def handle_barrier_reply(self, dpid, xid):
+        batch = self._pending.get((dpid, xid))
+        if batch is not None and xid == batch.barrier_xid:
+            batch.done_at = time.monotonic()
+            batch.event.set()
+
+    def handle_error(self, dpid, xid, err_type, err_code):
+        batch = self._pending.get((dpid, xid))
+        if batch is not None:
+            if batch.benign.get(xid) == (err_type, err_code):
+                metrics.count("programming_already_applied")
+                return
+            batch.error = (err_type, err_code)
+            batch.event.set()
+
+    def _release(self, batch):
+        for xid in batch.xids:
+            self._pending.pop((batch.dpid, xid), None)
+
+    def _wait_all(self, batches, timeout):
+        """All batches are already on the wire, so waiting in turn
+        costs the slowest switch, not the sum."""
+        deadline = time.monotonic() + timeout
+        for batch in batches:
+            batch.event.wait(max(deadline - time.monotonic(), 0.0))
+
+    def _inverse(self, dpid, change):
+        adds, mods, deletes = change
+        installed = self.installed.get(dpid, {})
+        return (list(deletes), [(k, installed[k]) for k, _ in mods], list(adds))
+
+    def program(self, flow, datapaths):
+        """
+        Install / update a flow's tree on all its switches at once and
+        wait for every barrier. Only changed entries are sent.
+
+        A switch that times out is retried; an error reply (or a switch
+        that never answers) rolls every switch back to its previous
+        entries. Switches that are not connected are skipped and picked
+        up when they reconnect.
+        """
+        return self.program_many([flow], datapaths)
+
+    def program_many(self, flows, datapaths):
+        """
+        program() for several flows at once: their changes are merged
+        into one batch per switch, so N flows cost one round trip.
+        Succeeds or rolls back as a whole.
+        """
+        return self._apply({flow.ft_i: self.build_state(flow) for flow in flows}, datapaths)
+
+    def uninstall(self, topics, datapaths):
+        """
+        Remove every entry (meter, groups, flow) of the given topics, as
+        one batch per switch. Entries on switches that are not connected
+        are forgotten; those switches come back with empty tables.
+        """
+        desired = {topic: {} for topic in topics}
+        with self._serialized(desired, datapaths):
+            result = self._apply_locked(desired, datapaths)
+            if result.ok:
+                for topic in topics:
+                    for dpid, keys in self.flow_keys.pop(topic, {}).items():
+                        installed = self.installed.get(dpid, {})
+                        for key in keys:
+                            installed.pop(key, None)
+                    for key in [k for k in self._ff_ids if k[0] == topic]:
+                        del self._ff_ids[key]
+        return result
+
+    # ---------------------------------------
+    # Serialization (per-switch locks)
+    # ---------------------------------------
+    def _lock(self, dpid):
+        lock = self._locks.get(dpid)
+        if lock is None:
+            lock = self._locks.setdefault(dpid, self.lock_factory())
+        return lock
+
+    def _touched(self, desired, datapaths):
+        """Connected switches the topics have entries on or will have."""
+        dpids = set()
+        for topic, state in desired.items():
+            dpids.update(list(self.flow_keys.get(topic, {})))
+            dpids.update(state)
+        return {dpid for dpid in dpids if dpid in datapaths}
+
+    @contextlib.contextmanager
+    def _serialized(self, desired, datapaths):
+        """
+        Hold the locks of every switch the topics touch. A topic can
+        spread to more switches while we wait (a concurrent caller
+        programmed it), so the set is re-checked once the locks are held.
+        """
+        dpids = self._touched(desired, datapaths)
+        while True:
+            locks = [self._lock(dpid) for dpid in sorted(dpids)]
+            for lock in locks:
+                lock.acquire()
+            touched = self._touched(desired, datapaths)
+            if touched <= dpids:
+                break
+            for lock in reversed(locks):
+                lock.release()
+            dpids |= touched
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def _apply(self, desired, datapaths):
+        with self._serialized(desired, datapaths):
+            return self._apply_locked(desired, datapaths)
+
+    @metrics.timed("programming")
+    def _apply_locked(self, desired, datapaths):
+        """desired: topic -> dpid -> key -> entry. Caller holds the switches' locks."""
+        per_flow = {}
+        changes = {}
+        for topic, state in desired.items():
+            diff = {
+                dpid: change
+                for dpid, change in self.diff(topic, state).items()
+                if dpid in datapaths
+            }
+            per_flow[topic] = diff
+            for dpid, (adds, mods, deletes) in diff.items():
+                merged = changes.setdefault(dpid, ([], [], []))
+                merged[0].extend(adds)
+                merged[1].extend(mods)
+                merged[2].extend(deletes)
+
+        confirmed, failed = {}, {}
+        todo, retries = dict(changes), 0
+        while todo:
+            batches = {
+                dpid: self.send_batch(datapaths[dpid], change, retry=retries > 0)
+                for dpid, change in todo.items()
+            }
+            self._wait_all(batches.values(), self.barrier_timeout)
+
+            timed_out = {}
+            for dpid, batch in batches.items():
+                self._release(batch)
+                if batch.error is not None:
+                    failed[dpid] = batch
+                elif batch.done_at is None:
+                    timed_out[dpid] = batch
+                else:
+                    confirmed[dpid] = batch
+
+            if failed or retries >= self.max_retries:
+                failed.update(timed_out)
+                break
+            todo = {dpid: changes[dpid] for dpid in timed_out}
+            retries += bool(todo)
+
+        metrics.count("programming_retries", retries)
+        if failed:
+            metrics.count("programming_rollbacks")
+            self._rollback(changes, confirmed, failed, datapaths)
+            return ProgramResult(False, retries=retries, failed=sorted(failed))
+
+        for topic, diff in per_flow.items():
+            for dpid, change in diff.items():
+                self._commit(topic, dpid, change)
+
+        completed_at = max((b.done_at for b in confirmed.values()), default=None)
+        return ProgramResult(True, completed_at=completed_at, retries=retries)
+
+    def _rollback(self, changes, confirmed, failed, datapaths):
+        """
+        Restore the previous entries. Confirmed switches are waited on;
+        failed switches get a best-effort undo of whatever they applied.
+        """
+        undo = {
+            dpid: self.send_batch(datapaths[dpid], self._inverse(dpid, changes[dpid]))
+            for dpid in list(confirmed) + list(failed)
+        }
+        self._wait_all([undo[dpid] for dpid in confirmed], self.barrier_timeout)
+        for batch in undo.values():
+            self._release(batch)
+
+    def reset_datapath(self, datapath):
+        """
+        Empty a (re)connecting switch's tables. Switches keep flows,
+        groups and meters across a controller disconnect, and an ADD of
+        an existing group / meter fails the reinstall batch (whose
+        rollback would then delete the entries still forwarding). The
+        deletes are fenced by a barrier, so everything sent afterwards
+        finds empty tables; nothing is waited for (safe in the event
+        loop).
+        """
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        self.forget_datapath(datapath.id)
+        for msg in (
+            parser.OFPFlowMod(
+                datapath=datapath,
+                command=ofproto.OFPFC_DELETE,
+                table_id=ofproto.OFPTT_ALL,
+                out_port=ofproto.OFPP_ANY,
+                out_group=ofproto.OFPG_ANY,
+                match=parser.OFPMatch()
+            ),
+            parser.OFPGroupMod(datapath, command=ofproto.OFPGC_DELETE, group_id=ofproto.OFPG_ALL),
+            parser.OFPMeterMod(datapath, command=ofproto.OFPMC_DELETE, meter_id=ofproto.OFPM_ALL),
+            parser.OFPBarrierRequest(datapath),
+        ):
+            datapath.send_msg(msg)
+
+    def forget_datapath(self, dpid):
+        """Nothing is known to be installed on the switch any more."""
+        with self._lock(dpid):
+            self.installed.pop(dpid, None)
+            for topic in list(self.flow_keys):
+                self.flow_keys[topic].pop(dpid, None)
+                if not self.flow_keys[topic]:
+                    del self.flow_keys[topic]
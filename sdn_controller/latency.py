@@ -0,0 +1,150 @@
+# sdn_controller/latency.py
+
+import math
+import time
+from typing import Dict, Optional
+
+from common.log import get_logger
+from common.metrics import metrics
+from schedulability.compiled import CompiledTrajectory, SnapshotCompiler
+
+log = get_logger("latency")
+
+OK, DRIFTING, EXCEEDED = "ok", "drifting", "exceeded"
+
+
+def _ms(value):
+    return round(value, 3) if value is not None and math.isfinite(value) else None
+
+
+class LatencyFeedback:
+    """
+    Subscriber-measured latencies fed back into the analysis.
+
+    Subscriber agents post one aggregate per topic and report interval
+    (received, misses, lost, min / p50 / p99 / max latency, jitter).
+    For every admitted flow:
+
+    - measured_jitter is the largest jitter any subscriber saw, held at
+      its peak and decayed towards lower readings (it feeds Eq. 9, so it
+      must not drop on one quiet interval)
+    - the observed latency (worst subscriber's max) is compared to the
+      WCRT admission granted the flow (TA): "drifting" once it reaches
+      drift_threshold of it, "exceeded" once it passes it (the
+      analysis is optimistic for this flow)
+
+    `state` returns a token that changes with the admitted set or the
+    topology. The granted WCRTs come from a compiled snapshot taken
+    once per token, so jitter written back here does not raise the
+    bound the observations are compared with.
+    """
+
+    def __init__(self, of_db, state=None, drift_threshold=0.8, decay=0.2):
+        self.of_db = of_db
+        self.state = state or (lambda: of_db.version)
+        self.drift_threshold = drift_threshold
+        self.decay = decay
+        self.updates = 0   # jitter writes, for caches over the flow set
+        self.topics: Dict[str, dict] = {}
+        self.compiler = SnapshotCompiler()
+        self._granted = (None, None, {})   # (state, snapshot, topic -> WCRT)
+
+    # ---------------------------------------
+    # Ingest (one POST per subscriber and interval)
+    # ---------------------------------------
+    @metrics.timed("latency_ingest")
+    def ingest(self, payload) -> int:
+        """Apply one subscriber's reports; returns how many matched a flow."""
+        subscriber = payload.get("subscriber_ip", "unknown")
+        now = time.time()
+        granted = self._granted_wcrt
+        matched = 0
+        for report in payload.get("reports", ()):
+            flow = self.of_db.get_flow(report["topic"])
+            if flow is None:
+                continue
+            matched += 1
+            entry = self.topics.setdefault(flow.ft_i, {
+                "topic": flow.ft_i, "subscribers": {}, "received": 0, "misses": 0,
+                "lost": 0, "state": OK,
+            })
+            entry["subscribers"][subscriber] = report
+            entry["received"] += report.get("n", 0)
+            entry["misses"] += report.get("misses", 0)
+            entry["lost"] += report.get("lost", 0)
+            entry["updated"] = now
+
+            wcrt = granted(flow.ft_i)
+            self._update_jitter(flow, entry)
+            if wcrt is not None:
+                self._check_drift(flow, entry, wcrt)
+
+        metrics.count("latency_reports", len(payload.get("reports", ())))
+        return matched
+
+    def _granted_wcrt(self, topic) -> Optional[float]:
+        """TA WCRT of the flow in the admitted set as of the last state change."""
+        state = self.state()
+        cached_state, snapshot, wcrts = self._granted
+        if cached_state != state:
+            snapshot = self.compiler.compile(list(self.of_db.get_all_flows().values()))
+            wcrts = {}
+            self._granted = (state, snapshot, wcrts)
+        if topic not in wcrts:
+            i = snapshot.index.get(topic)
+            if i is None:
+                return None
+            wcrts[topic] = CompiledTrajectory.calculate_wcrt(snapshot, i)
+        return wcrts[topic]
+
+    def _update_jitter(self, flow, entry):
+        observed = max(r.get("jitter", 0.0) for r in entry["subscribers"].values())
+        old = flow.measured_jitter
+        new = observed if observed >= old else old + self.decay * (observed - old)
+        if abs(new - old) < 1e-6:
+            return
+        self.of_db.set_measured_jitter(flow.ft_i, new)
+        self.updates += 1
+
+    def _check_drift(self, flow, entry, wcrt):
+        observed = max(r.get("max", 0.0) for r in entry["subscribers"].values())
+        ratio = observed / wcrt if wcrt > 0 else math.inf
+        state = EXCEEDED if ratio > 1.0 else DRIFTING if ratio >= self.drift_threshold else OK
+        if state != entry["state"] and state != OK:
+            metrics.count("latency_flags")
+            log.warning("Flow %s %s: observed %.3f ms vs WCRT %.3f ms (D=%.3f ms)",
+                        flow.ft_i, state, observed, wcrt, flow.di)
+        entry.update(state=state, observed=observed, wcrt=wcrt, ratio=ratio)
+
+    # ---------------------------------------
+    # Queries
+    # ---------------------------------------
+    def status(self, topic=None, flagged=False) -> Optional[dict]:
+        """One flow's record, or every (flagged) flow's. None if unknown."""
+        if topic is not None:
+            entry = self.topics.get(topic)
+            return self._view(entry) if entry is not None else None
+        return {
+            t: self._view(e) for t, e in self.topics.items()
+            if not flagged or e["state"] != OK
+        }
+
+    def _view(self, entry):
+        flow = self.of_db.get_flow(entry["topic"])
+        return {
+            "state": entry["state"],
+            "observed_ms": _ms(entry.get("observed")),
+            "wcrt_ms": _ms(entry.get("wcrt")),
+            "ratio": _ms(entry.get("ratio")),
+            "deadline_ms": flow.di if flow is not None else None,
+            "measured_jitter_ms": _ms(flow.measured_jitter) if flow is not None else None,
+            "received": entry["received"],
+            "misses": entry["misses"],
+            "miss_ratio": _ms(entry["misses"] / entry["received"]) if entry["received"] else None,
+            "lost": entry["lost"],
+            "subscribers": entry["subscribers"],
+            "updated": entry["updated"],
+        }
+
+    def forget(self, topic):
+        self.topics.pop(topic, None)
@@ -1,12 +1,104 @@
 # sdn_controller/msdp.py
 
+import asyncio
 import threading
 import json
-import socket
-import logging
+import struct
 import time
 
-logging.basicConfig(level=logging.INFO, format='[MSDP] %(message)s')
+from common.log import get_logger
+from sdn_controller.sa_cache import SACache
+
+log = get_logger("msdp")
+
+MSDP_PORT = 1791
+_HEADER = struct.Struct("!I")   # frame = 4-byte length + JSON body
+MAX_FRAME = 1 << 20
+
+
+async def _read_frame(reader):
+    header = await reader.readexactly(_HEADER.size)
+    (length,) = _HEADER.unpack(header)
+    if length > MAX_FRAME:
+        raise ValueError(f"frame too large ({length} bytes)")
+    return json.loads(await reader.readexactly(length))
+
+
+def _encode_frame(msg) -> bytes:
+    body = json.dumps(msg).encode()
+    return _HEADER.pack(len(body)) + body
+
+
+def _parse_peer(peer):
+    """"ip" or "ip:port"."""
+    host, _, port = str(peer).partition(":")
+    return host, int(port) if port else MSDP_PORT
+
+
+class _PeerSession:
+    """
+    Persistent outgoing connection to one peer, with its own send queue
+    and writer task, so a slow or dead peer never holds up the others.
+    (Re)connects lazily with exponential backoff; while a peer is down
+    only the newest max_queued frames are kept.
+    """
+
+    def __init__(self, peer, connect_timeout=2.0, max_backoff=30.0, max_queued=64):
+        self.peer = peer
+        self.host, self.port = _parse_peer(peer)
+        self.connect_timeout = connect_timeout
+        self.max_backoff = max_backoff
+        self.max_queued = max_queued
+        self.writer = None
+        self.backoff = 0.0
+        self.retry_at = 0.0
+        self.queue = None
+
+    def enqueue(self, frame: bytes):
+        if self.queue.qsize() >= self.max_queued:
+            self.queue.get_nowait()   # drop the oldest
+        self.queue.put_nowait(frame)
+
+    async def run(self):
+        self.queue = asyncio.Queue()
+        while True:
+            frame = await self.queue.get()
+            while not await self.send(frame):
+                await asyncio.sleep(max(self.retry_at - time.monotonic(), 0.0))
+
+    async def send(self, frame: bytes):
+        if self.writer is None:
+            if time.monotonic() < self.retry_at:
+                return False
+            try:
+                _, self.writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port),
+                    self.connect_timeout
+                )
+            except (OSError, asyncio.TimeoutError) as e:
+                self._failed(e)
+                return False
+
+        try:
+            self.writer.write(frame)
+            await asyncio.wait_for(self.writer.drain(), self.connect_timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            self._failed(e)
+            return False
+
+        self.backoff = 0.0
+        return True
+
+    def _failed(self, error):
+        log.error("Peer %s unreachable: %s", self.peer, error)
+        self.close()
+        self.backoff = min(max(self.backoff * 2, 0.5), self.max_backoff)
+        self.retry_at = time.monotonic() + self.backoff
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
 
 
 class MSDP_Signaling:
@@ -14,52 +106,116 @@ class MSDP_Signaling:
     MSDP-like Source Active (SA) signaling.
     Paper Section V-B (Inter-domain multicast).
     Control-plane abstraction only (paper assumption).
+
+    One asyncio event loop (own thread) drives the listener and the
+    persistent, length-framed peer sessions. SAs queued by send_sa()
+    are coalesced and sent to all peers concurrently once per
+    batch_interval as SA_BATCH messages, split so no frame exceeds
+    MAX_FRAME.
+
+    Learned sources live in an SACache (expiry, RPF loop suppression,
+    topic-filter lookup); learned SAs and their refreshes (at most once
+    per refresh_interval each) are forwarded to the other peers, and
+    locally originated ones are re-advertised every refresh_interval,
+    so they do not expire downstream however many hops away.
+
+    Domain mode (sdn_controller/domains.py) rides on the same batches:
+    each controller's interference summary (refreshed like a local SA,
+    dropped after sa_ttl) and cross-domain segment messages (reserve /
+    ack / release), handed to on_segment on the receiving side. Peers
+    form a full mesh here; neither is forwarded.
     """
 
-    def __init__(self, my_ip: str, peers: list):
+    def __init__(self, my_ip: str, peers: list, batch_interval: float = 0.05,
+                 refresh_interval: float = 60.0, sa_ttl: float = 90.0):
         self.my_ip = my_ip
         self.peers = peers
-        self.active_sources = {}   # topic -> src_ip
+        self.sa_cache = SACache(my_ip, sa_ttl=sa_ttl)
+        self.local_sources = set()   # (topic, src_ip) originated here
         self.running = False
-        self.sock = None
+        self.batch_interval = batch_interval
+        self.refresh_interval = refresh_interval
+
+        self.loop = None
+        self.server = None
+        self._thread = None
+        self._sessions = {}
+        self._outbox = {}          # (topic, src_ip, origin) -> SA entry
+        self._forwarded = {}       # (topic, src_ip, origin) -> last forward (monotonic)
+        self._outbox_lock = threading.Lock()
+
+        # Domain mode
+        self.summaries = {}        # domain -> (summary, received monotonic)
+        self.on_segment = None     # callback(segment dict)
+        self._summary = None       # our latest summary, re-sent on refresh
+        self._summary_due = False
+        self._segments = []
 
     # ---------------------------------------
-    # Listener (Receive SA messages)
+    # Event Loop
     # ---------------------------------------
-    def start_listener(self, port=1791):
+    def start(self):
+        if self.running:
+            return
         self.running = True
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.sock.bind(('0.0.0.0', port))
-        self.sock.listen(5)
+        self.loop = asyncio.new_event_loop()
+        self._sessions = {p: _PeerSession(p) for p in self.peers}
 
-        t = threading.Thread(target=self._listen_loop, daemon=True)
-        t.start()
-        logging.info(f"MSDP listener running on port {port}")
+        self._thread = threading.Thread(target=self._run_loop, daemon=True)
+        self._thread.start()
 
-    def _listen_loop(self):
-        while self.running:
-            try:
-                client, addr = self.sock.accept()
-                threading.Thread(
-                    target=self._handle_peer,
-                    args=(client, addr),
-                    daemon=True
-                ).start()
-            except Exception as e:
-                logging.error(f"Listener error: {e}")
-
-    def _handle_peer(self, client, addr):
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        for session in self._sessions.values():
+            self.loop.create_task(session.run())
+        self.loop.create_task(self._flush_loop())
+        self.loop.create_task(self._maintenance_loop())
+        self.loop.run_forever()
+
+    def _call(self, coro, timeout=5.0):
+        """Run a coroutine on the MSDP loop from another thread."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    # ---------------------------------------
+    # Listener (Receive SA messages)
+    # ---------------------------------------
+    def start_listener(self, port=MSDP_PORT):
+        self.start()
+
+        async def _serve():
+            return await asyncio.start_server(self._handle_peer, '0.0.0.0', port)
+
+        self.server = self._call(_serve())
+        log.info("MSDP listener running on port %d", port)
+
+    async def _handle_peer(self, reader, writer):
+        addr = writer.get_extra_info("peername")
+        peer_ip = addr[0] if addr else "?"
         try:
-            data = client.recv(2048).decode()
-            if not data:
-                return
-            msg = json.loads(data)
-            self._process_sa(msg, addr[0])
+            while True:
+                msg = await _read_frame(reader)
+                self._process_message(msg, peer_ip)
+        except (asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass  # peer closed the session / shutting down
         except Exception as e:
-            logging.error(f"Peer error {addr}: {e}")
+            log.error("Peer error %s: %s", peer_ip, e)
         finally:
-            client.close()
+            writer.close()
+
+    def _process_message(self, msg, peer_ip):
+        # Loopback peers share an IP, so prefer the sender's own id
+        peer = msg.get("sender", peer_ip)
+        if msg.get("type") == "SA_BATCH":
+            for entry in msg.get("entries", []):
+                self._process_sa(dict(entry, type="SA"), peer)
+            summary = msg.get("summary")
+            if summary is not None:
+                self.summaries[summary["domain"]] = (summary, time.monotonic())
+            for segment in msg.get("segments", []):
+                if self.on_segment is not None:
+                    self.on_segment(segment)
+        else:
+            self._process_sa(msg, peer)
 
     # ---------------------------------------
     # SA Processing (Paper-defined behavior)
@@ -74,40 +230,171 @@ class MSDP_Signaling:
         if not topic or not src_ip:
             return
 
-        if topic not in self.active_sources:
-            self.active_sources[topic] = src_ip
-            logging.info(
-                f"Discovered remote source for topic '{topic}' at {src_ip} via {peer_ip}"
-            )
+        origin = msg.get("origin", peer_ip)
+        new = self.sa_cache.update(topic, src_ip, origin, peer_ip)
+        if new is None:
+            return
+        if new:
+            log.info("Discovered remote source for topic '%s' at %s via %s",
+                     topic, src_ip, peer_ip)
+
+        # Flood to the other peers; their RPF check stops loops. Refreshes
+        # too, or peers further away expire the SA after sa_ttl; half an
+        # interval of slack keeps an early refresh from being skipped
+        key = (topic, src_ip, origin)
+        now = time.monotonic()
+        last = self._forwarded.get(key)
+        if new or last is None or now - last >= self.refresh_interval / 2:
+            self._forwarded[key] = now
+            self._queue(topic, src_ip, origin)
+
+    def remote_sources(self, topic_filter: str):
+        """[(topic, src_ip, origin)] of remote sources matching an MQTT filter."""
+        return [(e.topic, e.src_ip, e.origin) for e in self.sa_cache.sources(topic_filter)]
+
+    @property
+    def active_sources(self):
+        """topic -> [src_ip] of every cached remote source."""
+        sources = {}
+        for e in self.sa_cache.sources("#"):
+            sources.setdefault(e.topic, []).append(e.src_ip)
+        return sources
+
+    # ---------------------------------------
+    # Domain Mode: Interference Summaries / Segments
+    # ---------------------------------------
+    def send_summary(self, summary: dict):
+        """Advertise this domain's summary with the next batch (and on refresh)."""
+        if not self.running:
+            self.start()
+        with self._outbox_lock:
+            self._summary = summary
+            self._summary_due = True
+
+    def send_segment(self, segment: dict):
+        """A segment message for the domain in segment["to"]."""
+        if not self.running:
+            self.start()
+        with self._outbox_lock:
+            self._segments.append(segment)
+
+    def remote_summary(self, domain: str):
+        """Latest summary received from a domain, None if missing or stale."""
+        entry = self.summaries.get(domain)
+        if entry is None or time.monotonic() - entry[1] > self.sa_cache.sa_ttl:
+            return None
+        return entry[0]
 
     # ---------------------------------------
-    # SA Advertisement
+    # SA Advertisement (coalesced)
     # ---------------------------------------
     def send_sa(self, topic: str, src_ip: str):
-        msg = {
-            "type": "SA",
-            "topic": topic,
-            "src_ip": src_ip,
-            "origin": self.my_ip,
-            "timestamp": time.time()
-        }
-
-        for peer in self.peers:
-            self._send(peer, msg)
-
-    def _send(self, peer_ip, msg, port=1791):
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.settimeout(2)
-            s.connect((peer_ip, port))
-            s.send(json.dumps(msg).encode())
-            s.close()
-            logging.info(f"Sent SA({msg['topic']}) to {peer_ip}")
-        except Exception as e:
-            logging.error(f"Failed to send SA to {peer_ip}: {e}")
+        """Originate an SA; it goes out with the next batch and is refreshed."""
+        if not self.running:
+            self.start()
+        self.local_sources.add((topic, src_ip))
+        self._queue(topic, src_ip, self.my_ip)
+
+    def withdraw_sa(self, topic: str, src_ip: str):
+        """Stop refreshing a local source; peers expire it after sa_ttl."""
+        self.local_sources.discard((topic, src_ip))
+
+    def _queue(self, topic, src_ip, origin):
+        with self._outbox_lock:
+            self._outbox[(topic, src_ip, origin)] = {
+                "topic": topic,
+                "src_ip": src_ip,
+                "origin": origin,
+                "timestamp": time.time()
+            }
+
+    async def _maintenance_loop(self):
+        next_refresh = time.monotonic() + self.refresh_interval
+        while self.running:
+            await asyncio.sleep(self.sa_cache.tick)
+            for entry in self.sa_cache.advance():
+                self._forwarded.pop((entry.topic, entry.src_ip, entry.origin), None)
+                log.info("SA for '%s' at %s expired", entry.topic, entry.src_ip)
+
+            if time.monotonic() >= next_refresh:
+                next_refresh += self.refresh_interval
+                for topic, src_ip in list(self.local_sources):
+                    self._queue(topic, src_ip, self.my_ip)
+                with self._outbox_lock:
+                    self._summary_due = self._summary is not None
+
+    async def _flush_loop(self):
+        while self.running:
+            await asyncio.sleep(self.batch_interval)
+            await self._flush()
+
+    async def _flush(self):
+        """The interval's SA_BATCH frames, enqueued on every peer session."""
+        with self._outbox_lock:
+            entries, self._outbox = list(self._outbox.values()), {}
+            segments, self._segments = self._segments, []
+            summary = self._summary if self._summary_due else None
+            self._summary_due = False
+        if not entries and not segments and summary is None:
+            return
+
+        frames = self._frames(entries, segments, summary)
+        # Each peer's writer task sends them; all peers in parallel
+        for session in self._sessions.values():
+            for frame in frames:
+                session.enqueue(frame)
+        log.debug("Queued %d SA(s) in %d frame(s) for %d peers",
+                  len(entries), len(frames), len(self._sessions))
+
+    def _frames(self, entries, segments, summary):
+        """
+        SA_BATCH frames no larger than MAX_FRAME, which receivers
+        enforce: a refresh of every local source can exceed it on its
+        own. The summary rides in the first frame; entries and segments
+        fill as many frames as needed.
+        """
+        def batch():
+            msg = {"type": "SA_BATCH", "sender": self.my_ip, "entries": []}
+            # Room for an empty "segments" list as well
+            return msg, len(json.dumps(msg)) + len(', "segments": []')
+
+        msg, size = batch()
+        if summary is not None:
+            msg["summary"] = summary
+            size += len(json.dumps(summary)) + len(', "summary": ')
+        msgs = [msg]
+        for field, items in (("entries", entries), ("segments", segments)):
+            for item in items:
+                n = len(json.dumps(item)) + 2
+                if size + n > MAX_FRAME:
+                    if msg["entries"] or msg.get("segments"):
+                        msg, size = batch()
+                        msgs.append(msg)
+                    if size + n > MAX_FRAME:
+                        log.error("Dropped an SA_BATCH %s item of %d bytes", field, n)
+                        continue
+                msg.setdefault(field, []).append(item)
+                size += n
+        return [_encode_frame(m) for m in msgs]
 
     # ---------------------------------------
     def stop(self):
+        if not self.running:
+            return
         self.running = False
-        if self.sock:
-            self.sock.close()
+
+        async def _close():
+            if self.server is not None:
+                self.server.close()
+            for session in self._sessions.values():
+                session.close()
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            self._call(_close())
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5.0)
@@ -2,6 +2,13 @@
 
 import networkx as nx
 import math
+import time
+from dataclasses import replace
+from itertools import islice
+
+from common.metrics import metrics
+from schedulability.analysis import AdmissionControl
+from schedulability.compiled import SnapshotCompiler
 
 
 class RoutingEngine:
@@ -12,13 +19,19 @@ class RoutingEngine:
 
     def __init__(self, of_db):
         self.of_db = of_db
+        self._graph = None
+        self._graph_version = None
+        # Admission checks run on compiled snapshots of the flow set
+        self.compiler = SnapshotCompiler()
 
     # ---------------------------------------
     # Cost Function (Paper Eq. 1)
     # ---------------------------------------
     @staticmethod
     def link_cost(link):
-        utilization = min(link.utilization, 0.99)
+        # Measured load, or the admitted reservations if they are higher
+        reserved = link.bw_reserved / link.bw_capacity if link.bw_capacity > 0 else 1.0
+        utilization = min(max(link.utilization, reserved), 0.99)
         base_delay = (
             link.propagation_delay +
             link.switching_delay +
@@ -30,21 +43,52 @@ class RoutingEngine:
     # Graph Construction
     # ---------------------------------------
     def _build_graph(self):
-        G = nx.DiGraph()
-        for link in self.of_db.links.values():
-            cost = self.link_cost(link)
-            G.add_edge(link.src, link.dst, weight=cost, link=link)
+        """
+        Rebuilt only when OF-DB's version changed (topology or link load),
+        so a burst of changes costs one rebuild.
+        """
+        version = self.of_db.version
+        if self._graph is not None and self._graph_version == version:
+            return self._graph
+
+        with metrics.span("graph_build"):
+            G = nx.DiGraph()
+            for link in list(self.of_db.links.values()):
+                cost = self.link_cost(link)
+                G.add_edge(link.src, link.dst, weight=cost, link=link)
+
+        self._graph, self._graph_version = G, version
         return G
 
+    def _usable_graph(self, bandwidth, held=()):
+        """
+        View of the graph without the links whose residual capacity is
+        below bandwidth (Mbps), except the held ones (links whose
+        capacity the flow already reserves). Residuals are read live, so
+        the cached graph stays valid as reservations change.
+        """
+        G = self._build_graph()
+        if bandwidth <= 0:
+            return G
+        held = set(held)
+        return nx.subgraph_view(
+            G, filter_edge=lambda u, v: (G[u][v]["link"].residual_bw >= bandwidth or
+                                         G[u][v]["link"] in held)
+        )
+
     # ---------------------------------------
     # RP Selection (Paper-defined)
     # ---------------------------------------
-    def select_rp(self, dsts):
+    @metrics.timed("rp_selection")
+    def select_rp(self, dsts, G=None):
         """
         Select RP that minimizes maximum distance to all subscribers.
         """
-        G = self._build_graph()
-        candidates = list(self.of_db.switches.keys())
+        if not dsts:
+            return None
+        G = self._build_graph() if G is None else G
+        # Links are keyed by DPID strings, switches by integer DPID
+        candidates = [str(dpid) for dpid in self.of_db.switches.keys()]
 
         best_rp = None
         best_cost = math.inf
@@ -59,7 +103,7 @@ class RoutingEngine:
                 if cost < best_cost:
                     best_cost = cost
                     best_rp = rp
-            except nx.NetworkXNoPath:
+            except (nx.NetworkXNoPath, nx.NodeNotFound):
                 continue
 
         return best_rp
@@ -67,12 +111,14 @@ class RoutingEngine:
     # ---------------------------------------
     # Multicast Path Calculation
     # ---------------------------------------
-    def compute_multicast_tree(self, src, dsts):
+    @metrics.timed("tree_build")
+    def compute_multicast_tree(self, src, dsts, bandwidth=0.0):
         """
         Implements src → RP → subscribers (no Steiner shortcut).
+        Links that cannot carry bandwidth (Mbps) more are pruned.
         """
-        G = self._build_graph()
-        rp = self.select_rp(dsts)
+        G = self._usable_graph(bandwidth)
+        rp = self.select_rp(dsts, G)
 
         if rp is None:
             return []
@@ -80,7 +126,10 @@ class RoutingEngine:
         links = []
 
         # Source → RP
-        path = nx.shortest_path(G, src, rp, weight="weight")
+        try:
+            path = nx.shortest_path(G, src, rp, weight="weight")
+        except (nx.NetworkXNoPath, nx.NodeNotFound):
+            return []
         links.extend(self._path_to_links(G, path))
 
         # RP → Subscribers
@@ -88,10 +137,167 @@ class RoutingEngine:
             path = nx.shortest_path(G, rp, d, weight="weight")
             links.extend(self._path_to_links(G, path))
 
-        return list(set(links))
+        # De-duplicate shared hops, keeping path order
+        return list(dict.fromkeys(links))
+
+    # ---------------------------------------
+    # Constrained Search (admission over alternative trees)
+    # ---------------------------------------
+    def candidate_trees(self, src, dsts, bandwidth=0.0, k=4, penalty=4.0):
+        """
+        Up to k distinct src → RP → subscribers trees over links with
+        bandwidth (Mbps) to spare, cheapest first. After each candidate
+        the weights of its links are scaled by penalty, so the next
+        search steers around them (link-penalty k-shortest search).
+        """
+        G = self._usable_graph(bandwidth)
+        if not dsts:
+            yield []
+            return
+
+        scale = {}
+
+        def weight(u, v, data):
+            return data["weight"] * scale.get(data["link"].key, 1.0)
+
+        seen = set()
+        for _ in range(2 * k):
+            tree = self._penalized_tree(G, src, dsts, weight)
+            if tree is None:
+                return
+
+            signature = frozenset(l.key for l in tree)
+            if signature not in seen:
+                seen.add(signature)
+                yield tree
+                if len(seen) >= k:
+                    return
+            for link in tree:
+                scale[link.key] = scale.get(link.key, 1.0) * penalty
+
+    def _penalized_tree(self, G, src, dsts, weight):
+        """
+        select_rp + compute_multicast_tree under a weight function, with
+        one Dijkstra per subscriber (on the reversed graph) instead of
+        one per (RP, subscriber).
+        """
+        try:
+            src_dist, src_paths = nx.single_source_dijkstra(G, src, weight=weight)
+            R = G.reverse(copy=False)
+            to_dst = [nx.single_source_dijkstra(R, d, weight=weight) for d in dsts]
+        except nx.NodeNotFound:
+            return None
+
+        best_rp, best_cost = None, math.inf
+        for dpid in list(self.of_db.switches):
+            rp = str(dpid)
+            if rp not in src_dist or any(rp not in dist for dist, _ in to_dst):
+                continue
+            cost = max(dist[rp] for dist, _ in to_dst)
+            if cost < best_cost:
+                best_rp, best_cost = rp, cost
+        if best_rp is None:
+            return None
+
+        links = self._path_to_links(G, src_paths[best_rp])
+        for _, paths in to_dst:
+            links.extend(self._path_to_links(G, paths[best_rp][::-1]))
+        return list(dict.fromkeys(links))
+
+    @metrics.timed("tree_search")
+    def find_schedulable_tree(self, flow, existing_flows, bandwidth=0.0,
+                              k=4, budget=0.05):
+        """
+        Admission and routing in one: candidate trees are checked in
+        cost order until one keeps the flow set schedulable. The search
+        stops after k candidates or budget seconds (the first candidate
+        is always checked). Returns the tree, or None.
+        """
+        started = time.monotonic()
+        for tree in self.candidate_trees(flow.src_ip, flow.dst_ips, bandwidth, k):
+            metrics.count("tree_candidates")
+            if AdmissionControl.check_admissibility(
+                    replace(flow, route_links=tree), existing_flows, self.compiler):
+                return tree
+            if time.monotonic() - started > budget:
+                break
+        return None
+
+    def readmit(self, flow, existing_flows):
+        """
+        Move an admitted flow to the first schedulable tree for its
+        current destinations, as find_schedulable_tree admits a new one.
+        The flow's own reservations are released for the search and
+        stay on its old route if no tree passes. Returns whether the
+        flow moved.
+        """
+        try:
+            bw = flow.bandwidth_mbps
+        except ValueError:
+            bw = 0.0
+        previous = flow.route_links
+        self.of_db.set_route(flow, [])
+        tree = self.find_schedulable_tree(flow, existing_flows, bw)
+        self.of_db.set_route(flow, previous if tree is None else tree)
+        return tree is not None
 
     def _path_to_links(self, G, path):
         links = []
         for i in range(len(path) - 1):
             links.append(G[path[i]][path[i+1]]["link"])
         return links
+
+    # ---------------------------------------
+    # Fast Failover (Backup Branches)
+    # ---------------------------------------
+    @metrics.timed("backup_routes")
+    def compute_backup_routes(self, flow, all_flows, k=3):
+        """
+        For every link of the flow's tree, find a detour from link.src to
+        link.dst that avoids the link (both directions), over links with
+        the flow's BWi to spare. Among the k cheapest detours, keep the
+        first one with which the flow set is still schedulable. Returns
+        {link key: detour links}; capacity is re-checked at swap time.
+        """
+        try:
+            bw = flow.bandwidth_mbps
+        except ValueError:
+            bw = 0.0
+        G = self._usable_graph(bw, held=flow.route_links)
+        others = [f for f in all_flows if f != flow]
+        backups = {}
+
+        for link in flow.route_links:
+            H = nx.restricted_view(
+                G, [], [(link.src, link.dst), (link.dst, link.src)]
+            )
+            try:
+                paths = nx.shortest_simple_paths(H, link.src, link.dst, weight="weight")
+                for path in islice(paths, k):
+                    detour = self._path_to_links(H, path)
+                    candidate = replace(
+                        flow, route_links=self._swap(flow.route_links, link, detour)
+                    )
+                    if AdmissionControl.check_admissibility(candidate, others, self.compiler):
+                        backups[link.key] = detour
+                        break
+            except (nx.NetworkXNoPath, nx.NodeNotFound):
+                continue
+
+        return backups
+
+    def apply_backup(self, flow, failed_link, route=None):
+        """
+        Route (default: the flow's current one) with the failed link
+        replaced by its pre-computed detour, or None if there is no
+        backup or the detour is itself broken.
+        """
+        detour = flow.backup_routes.get(failed_link.key)
+        if not detour or any(l.key not in self.of_db.links for l in detour):
+            return None
+        route = flow.route_links if route is None else route
+        return self._swap(route, failed_link, detour)
+
+    @staticmethod
+    def _swap(route, link, detour):
+        return list(dict.fromkeys([l for l in route if l != link] + detour))
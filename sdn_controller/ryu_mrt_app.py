@@ -2,17 +2,34 @@
 
 from ryu.base import app_manager
 from ryu.controller import ofp_event
-from ryu.controller.handler import MAIN_DISPATCHER, CONFIG_DISPATCHER, set_ev_cls
+from ryu.controller.handler import MAIN_DISPATCHER, CONFIG_DISPATCHER, DEAD_DISPATCHER, set_ev_cls
 from ryu.ofproto import ofproto_v1_3
+from ryu.lib import hub
+from eventlet import tpool
+from ryu.topology import event as topo_event
 from ryu.app.wsgi import ControllerBase, WSGIApplication, route
 from webob import Response
 
 from common.of_db import OFDB
-from common.rt_attributes import RTAttributes
-from schedulability.analysis import AdmissionControl
+from common.metrics import metrics
+from common.log import get_logger, setup_logging
+from common.rt_attributes import RTAttributes, parse_bandwidth
+from schedulability.compiled import CompiledTrajectory
+from schedulability.sensitivity import SensitivityAnalysis
 from sdn_controller.routing import RoutingEngine
+from sdn_controller.stats import StatsCollector
+from sdn_controller.flow_programmer import FlowProgrammer
+from sdn_controller.discovery import TopologyDiscovery
+from sdn_controller.failover import FailoverManager
+from sdn_controller.admission_queue import AdmissionQueue
+from sdn_controller.latency import LatencyFeedback
 
 import json
+import time
+from collections import deque
+from dataclasses import replace
+
+log = get_logger("controller")
 
 
 class MRTController(app_manager.RyuApp):
@@ -29,52 +46,397 @@ class MRTController(app_manager.RyuApp):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        setup_logging()
 
         self.of_db = OFDB()
         self.routing = RoutingEngine(self.of_db)
 
+        # Connected datapaths (DPID -> Datapath)
+        self.datapaths = {}
+
+        # Port / meter statistics -> link load in OF-DB
+        self.stats = StatsCollector(self.of_db)
+        self.stats_interval = 2.0  # seconds
+        self.stats_thread = hub.spawn(self._stats_loop)
+
+        # Meters / Groups / Flow entries per admitted flow
+        self.programmer = FlowProgrammer(self.of_db, event_factory=hub.Event,
+                                         lock_factory=hub.Semaphore)
+
+        # Flow setup latency (REST request -> last barrier reply), ms
+        self.setup_latencies = deque(maxlen=1000)
+
+        # Registrations are decided by one worker, in small batches
+        self.admission = AdmissionQueue(
+            self._admit_batch, queue_factory=hub.Queue, event_factory=hub.Event
+        )
+        self.admission_thread = hub.spawn(self.admission.run)
+        self.decisions = 0  # registrations / teardowns decided (not feedback)
+        self.unremoved = set()  # deregistered topics the switches still hold
+
+        # Subscriber-measured latency -> measured_jitter and drift flags
+        self.latency = LatencyFeedback(
+            self.of_db, state=lambda: (self.of_db.version, self.decisions)
+        )
+
+        # Capacity queries: (OF-DB version, decisions, jitter updates) -> (engine, answers)
+        self._sensitivity = (None, None, {})
+        self._sensitivity_lock = hub.Semaphore()
+
+        # Exposed on /mrt/metrics next to the spans and counters
+        metrics.gauge("flows", lambda: len(self.of_db.flows))
+        metrics.gauge("links", lambda: len(self.of_db.links))
+        metrics.gauge("datapaths", lambda: len(self.datapaths))
+        metrics.gauge("admission_queue_depth", lambda: self.admission.queue.qsize())
+        metrics.gauge("latency_flagged", lambda: len(self.latency.status(flagged=True)))
+
+        # Backup branches + local repair on link failure
+        self.failover = FailoverManager(self.of_db, self.routing, self.programmer)
+
+        # Topology auto-discovery (coalesced into OF-DB)
+        self.discovery = TopologyDiscovery(
+            self.of_db, on_change=self._on_topology_change
+        )
+        self.discovery_thread = hub.spawn(self._discovery_loop)
+
         wsgi = kwargs['wsgi']
         wsgi.register(MRTControllerREST, {'controller': self})
 
     # ---------------------------------------
     # Flow Registration (ORT-NM → Controller)
     # ---------------------------------------
-    def register_flow(self, payload):
-        rt = RTAttributes(**payload["rt_attributes"])
-        rt.src_ip = payload["src_ip"]
+    def register_flow(self, payload, started=None):
+        """
+        Queue a flow for admission and wait for the decision. Returns
+        only after the flow's entries are confirmed by every switch on
+        the tree (or rolled back).
+        """
+        return self.admission.submit("flow", payload, started).wait()
+
+    # ---------------------------------------
+    # Subscriber Registration
+    # ---------------------------------------
+    def register_subscriber(self, payload):
+        """The topic may be an MQTT filter; every matching flow is grafted."""
+        return self.admission.submit("subscriber", payload).wait()
+
+    # ---------------------------------------
+    # Teardown (ORT-NM → Controller)
+    # ---------------------------------------
+    def deregister_flow(self, payload):
+        """Remove a flow: its entries, link index, group ID and subscribers' branches."""
+        return self.admission.submit("deregister_flow", payload).wait()
 
-        existing = list(self.of_db.flows.values())
+    def deregister_subscriber(self, payload):
+        """Prune the subscriber from every flow its filter matched."""
+        return self.admission.submit("deregister_subscriber", payload).wait()
 
-        if not AdmissionControl.check_admissibility(rt, existing):
-            return False
+    # ---------------------------------------
+    # Capacity Queries (read-only, off the admission queue)
+    # ---------------------------------------
+    def sensitivity(self, topic=None, link=None):
+        """
+        Slack / critical scaling of one flow, slack / extra utilization of
+        one link, or the whole report. Answers are cached until the
+        admitted set or the topology changes. None if unknown.
 
-        self.of_db.add_flow(payload["topic"], rt)
+        The analysis is CPU-bound and runs in eventlet's native thread
+        pool (over copies of the flows), so the hub keeps serving while
+        it does. One runs at a time: the engine edits its snapshot
+        during a search. Cached answers are served without waiting.
+        """
+        state = (self.of_db.version, self.decisions, self.latency.updates)
+        query = ("flow", topic) if topic else ("link", link) if link else ("report", None)
+        cached_state, _, answers = self._sensitivity
+        if cached_state == state and query in answers:
+            return answers[query]
 
-        # Routing after admission
-        rt.route_links = self.routing.compute_multicast_tree(
-            rt.src_ip,
-            rt.dst_ips
-        )
+        with self._sensitivity_lock:
+            state = (self.of_db.version, self.decisions, self.latency.updates)
+            cached_state, engine, answers = self._sensitivity
+            if cached_state != state:
+                flows = [replace(f) for f in self.of_db.get_all_flows().values()]
+                engine = tpool.execute(SensitivityAnalysis, flows)
+                answers = {}
+                self._sensitivity = (state, engine, answers)
 
-        return True
+            if query not in answers:
+                if topic:
+                    answers[query] = tpool.execute(engine.flow_sensitivity, topic)
+                elif link:
+                    answers[query] = tpool.execute(engine.link_sensitivity, link)
+                else:
+                    answers[query] = tpool.execute(engine.report)
+            return answers[query]
 
     # ---------------------------------------
-    # Subscriber Registration
+    # Latency Feedback (Subscriber Agents → Controller)
     # ---------------------------------------
-    def register_subscriber(self, payload):
-        self.of_db.add_subscriber(
-            payload["topic"],
-            payload["subscriber_ip"]
-        )
+    def latency_feedback(self, payload):
+        """
+        Per-topic latency aggregates from one subscriber; flows matched.
+        Applied by the admission worker, as it writes measured_jitter.
+        """
+        return self.admission.submit("latency", payload).wait()
+
+    def latency_status(self, topic=None, flagged=False):
+        return self.latency.status(topic, flagged)
+
+    # ---------------------------------------
+    # Admission Worker (single writer)
+    # ---------------------------------------
+    def _admit_batch(self, requests):
+        """
+        Runs on the admission worker only. Requests are decided in
+        arrival order against one snapshot of the admitted set (kept in
+        step as flows come and go); the batch is then programmed with one
+        barrier round trip per switch.
+
+        Latency feedback (measured_jitter) and backup refreshes are queued
+        here too, so every OF-DB write outside topology discovery and its
+        local repair happens on this worker. Backups are installed last,
+        after every registration in the batch has been answered.
+        """
+        metrics.count("admission_batches")
+        metrics.count("admission_requests", len(requests))
+
+        admitted = {f.ft_i: f for f in self.of_db.get_all_flows().values()}
+        new_flows = {}   # topic -> (flow, [requests])
+        rerouted = {}    # topic -> flow whose subscribers changed
+        previous = {}    # topic -> (route, subscribers) before the change
+        removed = []     # topics to uninstall
+        grafted = []     # (subscriber request, topics it re-routed)
+        protect = []     # flows whose backups need refreshing
+
+        for request in requests:
+            try:
+                if request.kind == "latency":
+                    request.complete(self.latency.ingest(request.payload))
+                    continue
+                if request.kind == "protect":
+                    protect.extend(request.payload["flows"])
+                    request.complete(True)
+                    continue
+                self.decisions += 1
+                topic = request.payload["topic"]
+
+                if request.kind == "flow":
+                    rt = self._admit_flow(request.payload, admitted)
+                    if rt is None:
+                        metrics.count("flows_rejected")
+                        request.complete(False)
+                        continue
+                    admitted[rt.ft_i] = rt
+                    self.unremoved.discard(rt.ft_i)
+                    # A re-registration in the same batch supersedes the first
+                    waiting = new_flows.get(rt.ft_i, (None, []))[1]
+                    new_flows[rt.ft_i] = (rt, waiting + [request])
+
+                elif request.kind == "deregister_flow":
+                    # The group ID stays held until the entries are gone
+                    flow = self.of_db.remove_flow(topic, release_group=False)
+                    admitted.pop(topic, None)
+                    rerouted.pop(topic, None)
+                    for waiting in new_flows.pop(topic, (None, []))[1]:
+                        waiting.complete(True)
+                    if flow is not None:
+                        removed.append(topic)
+                        self.latency.forget(topic)
+                        log.info("Flow %s deregistered", topic)
+                    request.complete(flow is not None)
+
+                else:
+                    sub_ip = request.payload["subscriber_ip"]
+                    graft = request.kind == "subscriber"
+                    if graft:
+                        flows = self.of_db.add_subscriber(topic, sub_ip)
+                    else:
+                        flows = self.of_db.remove_subscriber(topic, sub_ip)
+                    moved, ok = self._reroute(flows, previous, admitted, sub_ip, graft)
+                    for flow in moved:
+                        rerouted[flow.ft_i] = flow
+                    if not ok:
+                        request.complete(False)
+                    else:
+                        grafted.append((request, [flow.ft_i for flow in moved]))
+            except Exception:
+                # A malformed request is rejected on its own; the rest of
+                # the batch is still decided and programmed
+                metrics.count("admission_errors")
+                log.exception("Bad %s request: %s", request.kind, repr(request.payload))
+                request.complete(False)
 
-        flow = self.of_db.flows.get(payload["topic"])
-        if not flow:
+        flows = [f for f, _ in new_flows.values()]
+        flows += [f for t, f in rerouted.items() if t not in new_flows]
+        # Removals that failed earlier are retried with every batch
+        removed += [t for t in self.unremoved if t not in removed and t not in admitted]
+        try:
+            if removed:
+                self._uninstall(removed)
+            results = self._program_batch(flows)
+        except Exception:
+            # The queue rejects every request still waiting: release the
+            # reservations and routes OF-DB would otherwise keep for them
+            self._undo(flows, new_flows, previous)
+            raise
+        failed = {topic for topic, result in results.items() if not result.ok}
+        self._undo([f for f in flows if f.ft_i in failed], new_flows, previous)
+
+        for topic, (rt, waiting) in new_flows.items():
+            completed_at = results[topic].completed_at
+            metrics.count("flows_rejected" if topic in failed else "flows_admitted")
+            for request in waiting:
+                if topic not in failed and completed_at is not None:
+                    setup_ms = (completed_at - request.started) * 1000.0
+                    self.setup_latencies.append(setup_ms)
+                    log.info("Flow %s programmed in %.2f ms (%d retries)",
+                             topic, setup_ms, results[topic].retries)
+                request.complete(topic not in failed)
+        # A subscriber change holds only if every tree it moved was programmed
+        for request, topics in grafted:
+            if not request.event.is_set():
+                request.complete(not any(topic in failed for topic in topics))
+
+        protect += [flow for flow in flows if flow.ft_i not in failed]
+        self._protect(protect)
+
+    def _protect(self, flows):
+        """Backups for the flows that are still admitted, once each."""
+        current = {}
+        for flow in flows:
+            if self.of_db.get_flow(flow.ft_i) is flow:
+                current[flow.ft_i] = flow
+        if current:
+            self.failover.reprotect(list(current.values()), self.datapaths)
+
+    def _uninstall(self, topics):
+        """
+        Remove the topics' entries from the switches. Group IDs are only
+        released once that is confirmed; until then the topics are kept
+        in `unremoved` so no new flow is handed an ID still in use.
+        """
+        result = self.programmer.uninstall(topics, self.datapaths)
+        if not result.ok:
+            self.unremoved.update(t for t in topics if self.of_db.get_flow(t) is None)
+            metrics.count("uninstall_failures")
+            log.error("Removing %s failed on %s, retried with the next batch",
+                      tuple(topics), tuple(result.failed))
             return
+        self.unremoved.difference_update(topics)
+        for topic in topics:
+            # Unless the topic was registered again (and holds it anew)
+            if self.of_db.get_flow(topic) is None:
+                self.of_db.release_multicast_group_id(topic)
 
-        flow.route_links = self.routing.compute_multicast_tree(
-            flow.src_ip,
-            flow.dst_ips
-        )
+    def _undo(self, flows, new_flows, previous):
+        """Drop the batch's new flows, restore the re-routed ones' trees and subscribers."""
+        for flow in flows:
+            if flow.ft_i in new_flows:
+                # A re-registration rolled back onto entries still installed
+                held = flow.ft_i in self.programmer.flow_keys
+                self.of_db.remove_flow(flow.ft_i, release_group=not held)
+                if held:
+                    self.unremoved.add(flow.ft_i)
+            else:
+                route, flow.dst_ips = previous[flow.ft_i]
+                self.of_db.set_route(flow, route)
+
+    def _parse_flow(self, payload):
+        """RTAttributes and BWi (Mbps) of a registration, or None if malformed."""
+        try:
+            rt = RTAttributes(ft_i=str(payload["topic"]), **payload["rt_attributes"])
+            rt.src_ip = str(payload["src_ip"])
+            rt.qi, rt.pi = int(rt.qi), int(rt.pi)
+            rt.ci, rt.ti, rt.di = float(rt.ci), float(rt.ti), float(rt.di)
+            rt.dst_ips = list(rt.dst_ips)
+            bw = parse_bandwidth(rt.bwi)
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            log.warning("Malformed flow registration %s: %s", repr(payload.get("topic")), str(e))
+            return None, None
+        if not (rt.ci >= 0 and rt.ti > 0 and rt.di > 0 and bw >= 0):
+            log.warning("Flow %s: invalid FiTS (C=%s, T=%s, D=%s, BW=%s)",
+                        rt.ft_i, rt.ci, rt.ti, rt.di, rt.bwi)
+            return None, None
+        return rt, bw
+
+    def _admit_flow(self, payload, admitted):
+        rt, bw = self._parse_flow(payload)
+        if rt is None:
+            return None
+        # Every subscriber whose filter (incl. '+' / '#') matches the topic
+        for sub_ip in self.of_db.subscribers_for(rt.ft_i):
+            if sub_ip not in rt.dst_ips:
+                rt.dst_ips.append(sub_ip)
+
+        existing = [f for t, f in admitted.items() if t != rt.ft_i]
+
+        # Routing and admission together: candidate trees only use links
+        # with bw to spare (no analysis runs if there is none), and the
+        # first one that keeps every deadline wins
+        tree = self.routing.find_schedulable_tree(rt, existing, bw)
+        if tree is None:
+            return None
+        rt.route_links = tree
+
+        # Reserves bw on the route atomically (re-checks the residuals)
+        if not self.of_db.add_flow(rt.ft_i, rt):
+            return None
+
+        try:
+            rt.multicast_group_id = self.of_db.get_multicast_group_id(rt.ft_i)
+        except RuntimeError as e:
+            self.of_db.remove_flow(rt.ft_i)
+            log.error("Flow %s: %s", rt.ft_i, str(e))
+            return None
+        return rt
+
+    def _reroute(self, flows, previous, admitted, sub_ip, graft):
+        """
+        New trees for flows whose subscriber set changed (graft / prune),
+        admitted like a new flow: residual bandwidth, then TA against the
+        batch's admitted set. A flow without a passing tree keeps its old
+        one, and a graft is withdrawn from it (the subscription stays
+        recorded for flows registered later). Returns (moved flows,
+        whether every graft was accepted).
+        """
+        moved, ok = [], True
+        for flow in flows:
+            route = flow.route_links
+            if graft:
+                dst_ips = [ip for ip in flow.dst_ips if ip != sub_ip]
+            else:
+                dst_ips = flow.dst_ips + [sub_ip]
+            existing = [f for t, f in admitted.items() if t != flow.ft_i]
+            if self.routing.readmit(flow, existing):
+                previous.setdefault(flow.ft_i, (route, dst_ips))
+                moved.append(flow)
+            elif graft:
+                flow.dst_ips.remove(sub_ip)
+                ok = False
+                log.warning("Flow %s: no schedulable tree with subscriber %s",
+                            flow.ft_i, sub_ip)
+        return moved, ok
+
+    def _program_batch(self, flows):
+        """
+        Program all flows at once; if the batch is rolled back, retry
+        flow by flow to isolate the failing ones.
+        Returns topic -> ProgramResult.
+        """
+        if not flows:
+            return {}
+
+        result = self.programmer.program_many(flows, self.datapaths)
+        if result.ok:
+            return {flow.ft_i: result for flow in flows}
+
+        results = {}
+        for flow in flows:
+            results[flow.ft_i] = self.programmer.program(flow, self.datapaths)
+            if not results[flow.ft_i].ok:
+                log.error("Programming %s failed on %s, rolled back",
+                          flow.ft_i, tuple(results[flow.ft_i].failed))
+        return results
 
     # ---------------------------------------
     # Switch Features
@@ -85,6 +447,9 @@ class MRTController(app_manager.RyuApp):
         ofproto = datapath.ofproto
         parser = datapath.ofproto_parser
 
+        # Entries left from before a reconnect; _reinstall rebuilds them
+        self.programmer.reset_datapath(datapath)
+
         match = parser.OFPMatch()
         actions = [
             parser.OFPActionOutput(ofproto.OFPP_CONTROLLER,
@@ -104,6 +469,130 @@ class MRTController(app_manager.RyuApp):
 
         datapath.send_msg(mod)
 
+    # ---------------------------------------
+    # Datapath Tracking
+    # ---------------------------------------
+    @set_ev_cls(ofp_event.EventOFPStateChange, [MAIN_DISPATCHER, DEAD_DISPATCHER])
+    def state_change_handler(self, ev):
+        datapath = ev.datapath
+        if ev.state == MAIN_DISPATCHER:
+            self.datapaths[datapath.id] = datapath
+            # Programming waits on barrier replies, which this event
+            # loop delivers, so it must run in its own thread
+            hub.spawn(self._reinstall, datapath)
+        elif ev.state == DEAD_DISPATCHER:
+            self.datapaths.pop(datapath.id, None)
+            self.stats.forget_datapath(datapath.id)
+            self.programmer.forget_datapath(datapath.id)
+
+    def _reinstall(self, datapath):
+        """(Re)install admitted flows that cross a (re)connected switch."""
+        for flow in self.of_db.get_all_flows().values():
+            result = self.programmer.program(flow, {datapath.id: datapath})
+            if not result.ok:
+                log.error("Reinstalling %s on switch %s failed", flow.ft_i, datapath.id)
+
+    # ---------------------------------------
+    # Topology Discovery (ryu-manager --observe-links)
+    # ---------------------------------------
+    @set_ev_cls(topo_event.EventSwitchEnter)
+    def switch_enter_handler(self, ev):
+        self.discovery.switch_enter(ev.switch.dp.id)
+
+    @set_ev_cls(topo_event.EventSwitchLeave)
+    def switch_leave_handler(self, ev):
+        self.discovery.switch_leave(ev.switch.dp.id)
+
+    @set_ev_cls(topo_event.EventLinkAdd)
+    def link_add_handler(self, ev):
+        src, dst = ev.link.src, ev.link.dst
+        self.discovery.link_add(src.dpid, src.port_no, dst.dpid, dst.port_no)
+
+    @set_ev_cls(topo_event.EventLinkDelete)
+    def link_delete_handler(self, ev):
+        src, dst = ev.link.src, ev.link.dst
+        self.discovery.link_delete(src.dpid, src.port_no, dst.dpid)
+
+    @set_ev_cls(topo_event.EventHostAdd)
+    def host_add_handler(self, ev):
+        host = ev.host
+        for ip in host.ipv4:
+            self.discovery.host_add(host.port.dpid, host.port.port_no, ip)
+
+    @set_ev_cls(ofp_event.EventOFPPortStatus, MAIN_DISPATCHER)
+    def port_status_handler(self, ev):
+        msg = ev.msg
+        ofproto = msg.datapath.ofproto
+        if (msg.reason == ofproto.OFPPR_DELETE or
+                msg.desc.state & ofproto.OFPPS_LINK_DOWN):
+            self.discovery.port_down(msg.datapath.id, msg.desc.port_no)
+
+    def _discovery_loop(self):
+        while True:
+            hub.sleep(self.discovery.quiet_period / 2)
+            self.discovery.maybe_flush()
+
+    def _on_topology_change(self, change):
+        """
+        One call per coalesced batch: repair only the flows that lost a
+        link (backup swap, else a re-admitted tree), re-check the
+        swapped flows' deadlines once for the whole flow set, then
+        queue their backup refresh.
+
+        The repair is the one OF-DB writer besides the admission worker:
+        it must not wait behind queued registrations, and its route
+        changes re-check capacity under OF-DB's lock (set_route(checked)).
+        """
+        if not change.removed_links:
+            return
+
+        swapped, recomputed, failed, _ = self.failover.handle_link_failure(
+            change.removed_links, self.datapaths
+        )
+        log.info("Link failure: %d flows swapped to backups, %d re-routed, %d unrecovered",
+                 len(swapped), len(recomputed), len(failed))
+
+        # Detours were checked when installed; the flow set has moved on
+        snapshot = self.routing.compiler.compile(list(self.of_db.get_all_flows().values()))
+        for flow in swapped:
+            i = snapshot.index.get(flow.ft_i)
+            if i is not None and CompiledTrajectory.calculate_wcrt(snapshot, i) > flow.di:
+                log.warning("Flow %s misses its deadline on its detour", flow.ft_i)
+
+        # New backups are computed by the admission worker (single writer)
+        if swapped or recomputed:
+            self.admission.submit("protect", {"flows": swapped + recomputed})
+
+    # ---------------------------------------
+    # Programming Completion
+    # ---------------------------------------
+    @set_ev_cls(ofp_event.EventOFPBarrierReply, MAIN_DISPATCHER)
+    def barrier_reply_handler(self, ev):
+        self.programmer.handle_barrier_reply(ev.msg.datapath.id, ev.msg.xid)
+
+    @set_ev_cls(ofp_event.EventOFPErrorMsg, MAIN_DISPATCHER)
+    def error_msg_handler(self, ev):
+        msg = ev.msg
+        self.programmer.handle_error(msg.datapath.id, msg.xid, msg.type, msg.code)
+
+    # ---------------------------------------
+    # Statistics Polling (Link Load)
+    # ---------------------------------------
+    def _stats_loop(self):
+        while True:
+            # Requests go out to all datapaths at once;
+            # replies are processed by the handlers below as they arrive
+            self.stats.poll(list(self.datapaths.values()))
+            hub.sleep(self.stats_interval)
+
+    @set_ev_cls(ofp_event.EventOFPPortStatsReply, MAIN_DISPATCHER)
+    def port_stats_reply_handler(self, ev):
+        self.stats.handle_port_stats(ev.msg.datapath.id, ev.msg.body)
+
+    @set_ev_cls(ofp_event.EventOFPMeterStatsReply, MAIN_DISPATCHER)
+    def meter_stats_reply_handler(self, ev):
+        self.stats.handle_meter_stats(ev.msg.datapath.id, ev.msg.body)
+
 
 # ---------------------------------------
 # REST API (Paper Control Plane)
@@ -115,20 +604,91 @@ class MRTControllerREST(ControllerBase):
         self.ctrl = data['controller']
 
     @route('mrt', '/mrt/register_flow', methods=['POST'])
+    @metrics.timed("rest_register_flow")
     def register_flow(self, req, **kwargs):
+        started = time.monotonic()
         payload = json.loads(req.body)
-        ok = self.ctrl.register_flow(payload)
+        ok = self.ctrl.register_flow(payload, started=started)
         return self._response(ok)
 
     @route('mrt', '/mrt/register_subscriber', methods=['POST'])
+    @metrics.timed("rest_register_subscriber")
     def register_subscriber(self, req, **kwargs):
         payload = json.loads(req.body)
-        self.ctrl.register_subscriber(payload)
+        return self._response(self.ctrl.register_subscriber(payload))
+
+    @route('mrt', '/mrt/deregister_flow', methods=['POST'])
+    @metrics.timed("rest_deregister_flow")
+    def deregister_flow(self, req, **kwargs):
+        payload = json.loads(req.body)
+        return self._response(self.ctrl.deregister_flow(payload))
+
+    @route('mrt', '/mrt/deregister_subscriber', methods=['POST'])
+    @metrics.timed("rest_deregister_subscriber")
+    def deregister_subscriber(self, req, **kwargs):
+        payload = json.loads(req.body)
+        return self._response(self.ctrl.deregister_subscriber(payload))
+
+    @route('mrt', '/mrt/sensitivity', methods=['GET'])
+    @metrics.timed("rest_sensitivity")
+    def get_sensitivity(self, req, **kwargs):
+        """?topic=<flow> or ?link=<src:port->dst>; neither: every flow and link."""
+        answer = self.ctrl.sensitivity(req.GET.get('topic'), req.GET.get('link'))
+        if answer is None:
+            return Response(status=404, content_type='text/plain', charset='utf-8',
+                            text="unknown flow or link")
+        return self._json(answer)
+
+    @route('mrt', '/mrt/latency_feedback', methods=['POST'])
+    @metrics.timed("rest_latency_feedback")
+    def latency_feedback(self, req, **kwargs):
+        payload = json.loads(req.body)
+        return self._response(self.ctrl.latency_feedback(payload) > 0)
+
+    @route('mrt', '/mrt/latency', methods=['GET'])
+    def get_latency(self, req, **kwargs):
+        """?topic=<flow>, or every flow with measurements (?flagged=1: drifting only)."""
+        answer = self.ctrl.latency_status(req.GET.get('topic'), req.GET.get('flagged') == '1')
+        if answer is None:
+            return Response(status=404, content_type='text/plain', charset='utf-8',
+                            text="no measurements for this flow")
+        return self._json(answer)
+
+    @route('mrt', '/mrt/metrics', methods=['GET'])
+    def get_metrics(self, req, **kwargs):
+        """Prometheus text exposition of spans, counters and gauges."""
+        return Response(
+            content_type='text/plain; version=0.0.4',
+            charset='utf-8',
+            text=metrics.render()
+        )
+
+    @route('mrt', '/mrt/metrics/mode', methods=['POST'])
+    def set_metrics_mode(self, req, **kwargs):
+        """{"mode": "off" | "spans" | "profile"}"""
+        try:
+            metrics.set_mode(json.loads(req.body)["mode"])
+        except (KeyError, ValueError) as e:
+            return Response(status=400, content_type='text/plain', charset='utf-8', text=str(e))
         return self._response(True)
 
+    @route('mrt', '/mrt/metrics/profile', methods=['GET'])
+    def get_profile(self, req, **kwargs):
+        """Collapsed stacks from the sampling profiler (flamegraph input)."""
+        return Response(
+            content_type='text/plain',
+            charset='utf-8',
+            text=metrics.profiler.collapsed()
+        )
+
     def _response(self, ok):
-        body = json.dumps({"status": "ACCEPT" if ok else "REJECT"})
+        return self._json({"status": "ACCEPT" if ok else "REJECT"})
+
+    @staticmethod
+    def _json(answer):
+        # webob needs the charset to encode a str body
         return Response(
             content_type='application/json',
-            body=body
+            charset='utf-8',
+            text=json.dumps(answer)
         )
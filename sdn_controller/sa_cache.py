@@ -0,0 +1,154 @@
+# sdn_controller/sa_cache.py
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from common.topics import TopicTree
+
+
+@dataclass
+class SAEntry:
+    topic: str
+    src_ip: str
+    origin: str      # controller that originated the SA
+    peer: str        # peer we learned it from (RPF peer of origin)
+    expires_at: float
+    slot: int = -1
+
+
+class SACache:
+    """
+    Source-Active cache for MSDP.
+
+    - Several sources per topic, keyed by (topic, src_ip).
+    - Entries expire sa_ttl seconds after their last SA; expiry runs on
+      a timer wheel, so advance() only touches the slots that came due.
+    - Origin tracking with RPF-style loop suppression: an origin's SAs
+      are only accepted from the peer that first delivered them, and
+      SAs of our own origin are ignored.
+    - A topic index answers MQTT-filter queries ("sensor/#").
+    - Bounded: at most max_entries (and max_per_origin per origin);
+      SAs beyond the limits are dropped and counted.
+    """
+
+    def __init__(self, my_ip: str, sa_ttl=90.0, tick=1.0,
+                 max_entries=100000, max_per_origin=10000):
+        self.my_ip = my_ip
+        self.sa_ttl = sa_ttl
+        self.tick = tick
+        self.max_entries = max_entries
+        self.max_per_origin = max_per_origin
+
+        self._lock = threading.Lock()
+        self.entries: Dict[Tuple[str, str], SAEntry] = {}
+        self.index = TopicTree()
+        self.rpf_peers: Dict[str, str] = {}      # origin -> peer
+        self.origin_counts: Dict[str, int] = {}  # origin -> entries
+
+        # Timer wheel: one slot per tick, wide enough to hold one TTL
+        self._slots = [set() for _ in range(int(sa_ttl / tick) + 2)]
+        self._cursor = None  # last processed tick
+
+        self.dropped_loops = 0
+        self.dropped_limit = 0
+
+    # ---------------------------------------
+    # Insert / Refresh
+    # ---------------------------------------
+    def update(self, topic, src_ip, origin, peer, now=None) -> Optional[bool]:
+        """
+        Returns True for a new entry, False for a refresh,
+        None if the SA was suppressed (loop, RPF or limits).
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if origin == self.my_ip:
+                self.dropped_loops += 1
+                return None
+            rpf = self.rpf_peers.get(origin)
+            if rpf is not None and rpf != peer:
+                self.dropped_loops += 1
+                return None
+
+            key = (topic, src_ip)
+            entry = self.entries.get(key)
+            if entry is not None and entry.origin != origin:
+                self.dropped_loops += 1
+                return None
+
+            if entry is None:
+                if (len(self.entries) >= self.max_entries or
+                        self.origin_counts.get(origin, 0) >= self.max_per_origin):
+                    self.dropped_limit += 1
+                    return None
+                self.rpf_peers[origin] = peer
+                entry = SAEntry(topic, src_ip, origin, peer, 0.0)
+                self.entries[key] = entry
+                self.index.add(topic, key)
+                self.origin_counts[origin] = self.origin_counts.get(origin, 0) + 1
+                new = True
+            else:
+                new = False
+
+            self._schedule(entry, now + self.sa_ttl)
+            return new
+
+    def _schedule(self, entry, expires_at):
+        if entry.slot >= 0:
+            self._slots[entry.slot].discard((entry.topic, entry.src_ip))
+        entry.expires_at = expires_at
+        entry.slot = int(expires_at / self.tick) % len(self._slots)
+        self._slots[entry.slot].add((entry.topic, entry.src_ip))
+
+    # ---------------------------------------
+    # Expiry (timer wheel)
+    # ---------------------------------------
+    def advance(self, now=None) -> List[SAEntry]:
+        """
+        Expire the entries of every tick that has fully elapsed (so an
+        entry lives at most one tick past its TTL). Returns them.
+        """
+        now = time.monotonic() if now is None else now
+        last = int(now / self.tick) - 1
+        expired = []
+
+        with self._lock:
+            if self._cursor is None:
+                self._cursor = last
+            # A gap longer than the wheel visits each slot once
+            first = max(self._cursor + 1, last - len(self._slots) + 1)
+
+            for t in range(first, last + 1):
+                slot = self._slots[t % len(self._slots)]
+                for key in [k for k in slot if self.entries[k].expires_at <= now]:
+                    expired.append(self._remove(key))
+            self._cursor = max(self._cursor, last)
+
+        return expired
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        self._slots[entry.slot].discard(key)
+        self.index.remove(entry.topic, key)
+
+        count = self.origin_counts[entry.origin] - 1
+        if count:
+            self.origin_counts[entry.origin] = count
+        else:
+            del self.origin_counts[entry.origin]
+            # RPF peer is re-learned once the origin comes back
+            self.rpf_peers.pop(entry.origin, None)
+        return entry
+
+    # ---------------------------------------
+    # Queries
+    # ---------------------------------------
+    def sources(self, topic_filter: str) -> List[SAEntry]:
+        """Remote sources whose topic matches an MQTT filter."""
+        with self._lock:
+            return [self.entries[k] for k in self.index.match(topic_filter)]
+
+    def __len__(self):
+        return len(self.entries)
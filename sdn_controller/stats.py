@@ -0,0 +1,156 @@
+# sdn_controller/stats.py
+
+import time
+
+
+class StatsCollector:
+    """
+    OpenFlow port / meter statistics collector.
+    Turns counter deltas into per-link utilization, drop rate and
+    queuing delay, and pushes them into the OF-DB links.
+
+    Only needs objects that look like Ryu datapaths
+    (id, ofproto, ofproto_parser, send_msg) and stats bodies with
+    the OpenFlow 1.3 counter attributes, so it can be driven by a
+    stub datapath.
+    """
+
+    MAX_UTILIZATION = 0.99
+
+    def __init__(self, of_db, change_threshold=0.05):
+        self.of_db = of_db
+        # Minimum absolute change (utilization / drop rate) before
+        # a link is rewritten in the OF-DB
+        self.change_threshold = change_threshold
+
+        self._ports = {}    # (dpid, port_no) -> (t, tx_bytes, tx_packets, tx_dropped)
+        self._meters = {}   # (dpid, meter_id) -> (t, byte_in, band_bytes)
+        self.meter_drop_rates = {}  # (dpid, meter_id) -> dropped / offered bytes
+
+    # ---------------------------------------
+    # Polling (requests to all datapaths)
+    # ---------------------------------------
+    def poll(self, datapaths):
+        """
+        Send port and meter stats requests to every datapath without
+        waiting for replies; replies are handled as they arrive.
+        """
+        for datapath in datapaths:
+            self.request_stats(datapath)
+
+    @staticmethod
+    def request_stats(datapath):
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+
+        datapath.send_msg(
+            parser.OFPPortStatsRequest(datapath, 0, ofproto.OFPP_ANY)
+        )
+        datapath.send_msg(
+            parser.OFPMeterStatsRequest(datapath, 0, ofproto.OFPM_ALL)
+        )
+
+    # ---------------------------------------
+    # Port Statistics -> Link Load
+    # ---------------------------------------
+    def handle_port_stats(self, dpid, body, now=None):
+        """
+        Process one OFPPortStatsReply body.
+        Returns the keys of the links that were updated.
+        """
+        now = time.monotonic() if now is None else now
+        updated = []
+
+        for stat in body:
+            sample = (now, stat.tx_bytes, stat.tx_packets, stat.tx_dropped)
+            prev = self._ports.get((dpid, stat.port_no))
+            self._ports[(dpid, stat.port_no)] = sample
+
+            if prev is None:
+                continue
+
+            dt = now - prev[0]
+            d_bytes = stat.tx_bytes - prev[1]
+            d_packets = stat.tx_packets - prev[2]
+            d_dropped = stat.tx_dropped - prev[3]
+
+            # Counter reset (switch reconnect): keep the new baseline
+            if dt <= 0 or d_bytes < 0 or d_packets < 0 or d_dropped < 0:
+                continue
+
+            link = self.of_db.get_link_from_port(str(dpid), stat.port_no)
+            if link is None:
+                continue
+
+            if self._apply_load(link, d_bytes, d_packets, d_dropped, dt):
+                updated.append(link.key)
+
+        return updated
+
+    def _apply_load(self, link, d_bytes, d_packets, d_dropped, dt):
+        bw_used = (d_bytes * 8) / dt / 1e6   # Mbps
+
+        if link.bw_capacity > 0:
+            utilization = min(bw_used / link.bw_capacity, 1.0)
+        else:
+            utilization = 0.0
+
+        attempts = d_packets + d_dropped
+        drop_rate = d_dropped / attempts if attempts else 0.0
+
+        if (abs(utilization - link.utilization) < self.change_threshold and
+                abs(drop_rate - link.drop_rate) < self.change_threshold):
+            return False
+
+        self.of_db.update_link_load(
+            link,
+            bw_used=bw_used,
+            utilization=utilization,
+            drop_rate=drop_rate,
+            queuing_delay=self.queuing_delay(link, utilization)
+        )
+        return True
+
+    @classmethod
+    def queuing_delay(cls, link, utilization):
+        """
+        M/M/1 style estimate: service time * u / (1 - u).
+        """
+        u = min(utilization, cls.MAX_UTILIZATION)
+        service = link.switch_delay + link.proc_delay
+        return service * u / (1.0 - u)
+
+    # ---------------------------------------
+    # Meter Statistics -> Policing Drops
+    # ---------------------------------------
+    def handle_meter_stats(self, dpid, body, now=None):
+        """
+        Process one OFPMeterStatsReply body.
+        Bytes counted by the meter bands are the bytes the meter dropped.
+        """
+        now = time.monotonic() if now is None else now
+
+        for stat in body:
+            band_bytes = sum(b.byte_band_count for b in stat.band_stats)
+            sample = (now, stat.byte_in_count, band_bytes)
+            prev = self._meters.get((dpid, stat.meter_id))
+            self._meters[(dpid, stat.meter_id)] = sample
+
+            if prev is None:
+                continue
+
+            d_in = stat.byte_in_count - prev[1]
+            d_band = band_bytes - prev[2]
+            if d_in < 0 or d_band < 0:
+                continue
+
+            self.meter_drop_rates[(dpid, stat.meter_id)] = (
+                d_band / d_in if d_in else 0.0
+            )
+
+    # ---------------------------------------
+    def forget_datapath(self, dpid):
+        """Drop counter baselines of a disconnected datapath."""
+        for table in (self._ports, self._meters, self.meter_drop_rates):
+            for key in [k for k in table if k[0] == dpid]:
+                del table[key]
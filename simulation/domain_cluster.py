@@ -0,0 +1,128 @@
+# simulation/domain_cluster.py
+
+import argparse
+import multiprocessing
+import time
+
+from benchmarks.generators import build_topology, make_flowset
+from common.log import setup_logging
+from common.of_db import OFDB
+from schedulability.analysis import ExactResponseTime
+from sdn_controller.domains import DomainAdmission, DomainPartition
+from sdn_controller.msdp import MSDP_Signaling
+
+
+def _scenario(args):
+    """Same topology, partition and offered flows in every process."""
+    topo = build_topology(args.topology, args.size, args.seed)
+    partition = DomainPartition.contiguous([s.dpid for s in topo.switches], args.domains)
+    flows = make_flowset(topo, args.flows, total_utilization=args.utilization,
+                         fanout=(1, args.fanout), seed=args.seed)
+    return topo, partition, flows
+
+
+def run_domain(index, args, barrier, results):
+    """One controller process: admission for its domain's links."""
+    setup_logging(level="WARNING")
+    topo, partition, flows = _scenario(args)
+    domain = partition.domains[index]
+
+    db = OFDB()
+    db.apply_topology(
+        add_switches=[s for s in topo.switches if partition.domain_of[str(s.dpid)] == domain],
+        add_links=[l for l in topo.links if partition.owner(l) == domain],
+    )
+    peers = [f"127.0.0.1:{args.port + i}" for i in range(args.domains) if i != index]
+    msdp = MSDP_Signaling(domain, peers, batch_interval=0.02)
+    msdp.start_listener(args.port + index)
+    admission = DomainAdmission(domain, partition, msdp, db)
+
+    # Flows enter at the domain of their source switch
+    ingress = [f for f in flows if partition.domain_of[f.src_ip] == domain]
+    local = [f for f in ingress if admission.owns(f.route_links)]
+    cross = [f for f in ingress if not admission.owns(f.route_links)]
+
+    started = time.perf_counter()
+    local_ok = [f.ft_i for f in local if admission.admit_local(f)]
+    local_s = time.perf_counter() - started
+    admission.publish()
+
+    # Cross-domain admission needs every other domain's summary
+    others = [d for d in partition.domains if d != domain]
+    deadline = time.monotonic() + args.timeout
+    while any(msdp.remote_summary(d) is None for d in others):
+        if time.monotonic() > deadline:
+            break
+        time.sleep(0.01)
+
+    started = time.perf_counter()
+    cross_ok = {}
+    for flow in cross:
+        bound = admission.admit_cross_domain(flow)
+        if bound is not None:
+            cross_ok[flow.ft_i] = bound
+    cross_s = time.perf_counter() - started
+
+    # Let every domain finish and the last segments arrive
+    barrier.wait()
+    time.sleep(args.settle)
+
+    # Every local flow and installed segment against its own deadline / budget
+    installed = list(db.get_all_flows().values())
+    rta = ExactResponseTime(installed)
+    violations = sum(rta.calculate_wcrt(f) > f.di for f in installed)
+
+    results.put({
+        "domain": domain, "local": len(local), "local_ok": local_ok,
+        "cross": len(cross), "cross_ok": cross_ok, "installed": len(installed),
+        "violations": violations, "local_s": local_s, "cross_s": cross_s,
+    })
+    barrier.wait()
+    msdp.stop()
+
+
+def run_cluster():
+    parser = argparse.ArgumentParser(description="Partitioned admission over MSDP on loopback")
+    parser.add_argument("--domains", type=int, default=3)
+    parser.add_argument("--topology", choices=["fat-tree", "ring", "mesh"], default="ring")
+    parser.add_argument("--size", type=int, default=12, help="k for fat-tree, switches otherwise")
+    parser.add_argument("--flows", type=int, default=200)
+    parser.add_argument("--utilization", type=float, default=0.3)
+    parser.add_argument("--fanout", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--port", type=int, default=17900, help="MSDP port of the first domain")
+    parser.add_argument("--timeout", type=float, default=10.0, help="wait for peer summaries (s)")
+    parser.add_argument("--settle", type=float, default=0.5)
+    args = parser.parse_args()
+
+    barrier = multiprocessing.Barrier(args.domains)
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=run_domain, args=(i, args, barrier, results))
+             for i in range(args.domains)]
+    for p in procs:
+        p.start()
+    reports = sorted((results.get() for _ in procs), key=lambda r: r["domain"])
+    for p in procs:
+        p.join()
+
+    print(f"=== Domain Cluster: {args.domains} controllers, {args.topology}-{args.size} ===")
+    print(f"{'domain':>7} {'local':>11} {'cross':>11} {'installed':>9} "
+          f"{'violations':>10} {'local(s)':>9} {'cross(s)':>9}")
+    for r in reports:
+        print(f"{r['domain']:>7} {len(r['local_ok']):>5}/{r['local']:<5} "
+              f"{len(r['cross_ok']):>5}/{r['cross']:<5} {r['installed']:>9} "
+              f"{r['violations']:>10} {r['local_s']:>9.3f} {r['cross_s']:>9.3f}")
+
+    # The same admitted set analyzed by one monolithic controller
+    _, _, flows = _scenario(args)
+    admitted = {t for r in reports for t in r["local_ok"]}
+    admitted |= {t for r in reports for t in r["cross_ok"]}
+    chosen = [f for f in flows if f.ft_i in admitted]
+    rta = ExactResponseTime(chosen)
+    missed = sum(rta.calculate_wcrt(f) > f.di for f in chosen)
+    print(f"admitted {len(chosen)}/{len(flows)}; monolithic HA over the whole fabric "
+          f"flags {missed} (global blocking, no partition)")
+
+
+if __name__ == "__main__":
+    run_cluster()
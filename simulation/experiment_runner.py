@@ -9,6 +9,8 @@ from mininet.link import TCLink
 
 CONTROLLER_IP = "127.0.0.1"
 CONTROLLER_PORT = 6633
+MEASURE_S = 15
+SUMMARY = "/tmp/mrt_subscriber_summary.csv"
 
 
 def start_experiment():
@@ -62,8 +64,13 @@ def start_experiment():
     subprocess.Popen([sys.executable, "ort_nm/ort_nm.py"])
     time.sleep(5)
 
-    # Subscriber joins
-    h_sub.cmd('mosquitto_sub -h 10.0.0.2 -t "sensor/data" &')
+    # Subscriber joins; its agent measures latency against Di and
+    # reports to the controller every 2 s
+    h_sub.cmd(
+        f'{sys.executable} mqtt_clients/subscriber_agent.py '
+        '--host 10.0.0.2 --topics "sensor/data" --subscriber-ip 10.0.0.3 '
+        f'--duration {MEASURE_S} --summary {SUMMARY} &'
+    )
     time.sleep(2)
 
     # Publisher sends RT flow
@@ -76,22 +83,35 @@ def start_experiment():
         '--period 1000 '
         '--deadline 500 '
         '--min_bw 1Mbps '
-        '--qos 1'
+        '--qos 1 &'
     )
 
-    time.sleep(3)
+    time.sleep(MEASURE_S + 3)
 
-    # Store Results
+    # Store Results (measured at the subscriber)
+    try:
+        with open(SUMMARY) as f:
+            measured = {row["topic"]: row for row in csv.DictReader(f)}
+    except FileNotFoundError:
+        measured = {}
+    row = measured.get("sensor/data")
     with open("experiment_results.csv", "w") as f:
         writer = csv.writer(f)
-        writer.writerow(["Flow", "Status"])
-        writer.writerow(["sensor/data", "ADMITTED"])
+        writer.writerow(["Flow", "Status", "Received", "Deadline Misses", "Miss Ratio",
+                         "P99 (ms)", "Max (ms)"])
+        if row is None:
+            writer.writerow(["sensor/data", "NO DATA", 0, "", "", "", ""])
+        else:
+            status = "DEADLINE MET" if int(row["misses"]) == 0 else "DEADLINE MISSED"
+            writer.writerow(["sensor/data", status, row["received"], row["misses"],
+                             row["miss_ratio"], row["p99_ms"], row["max_ms"]])
 
     print("[Results] experiment_results.csv generated")
 
     net.stop()
     subprocess.call(["pkill", "-f", "mosquitto"])
     subprocess.call(["pkill", "-f", "ort_nm.py"])
+    subprocess.call(["pkill", "-f", "publisher.py"])
 
 
 if __name__ == "__main__":
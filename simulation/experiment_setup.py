@@ -1,10 +1,11 @@
 from common.rt_attributes import RTAttributes, Link, Switch
-from common.of_db import of_db
+from common.of_db import OFDB
 from schedulability.analysis import HolisticApproach, TrajectoryApproach
 from sdn_controller.routing import RoutingEngine
 
 def run_experiment():
     print("=== Schedulability Validation Experiment ===")
+    of_db = OFDB()
 
     # Switches
     s1 = Switch(1, "S1")
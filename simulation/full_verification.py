@@ -1,6 +1,5 @@
-import time
 from common.rt_attributes import RTAttributes, Link, Switch
-from common.of_db import of_db
+from common.of_db import OFDB
 from schedulability.analysis import HolisticApproach
 from sdn_controller.routing import RoutingEngine
 from simulation.monitor import NetworkMonitor
@@ -8,8 +7,8 @@ from simulation.monitor import NetworkMonitor
 def run_verification():
     print("=== Full MRT-MQTT Verification ===")
 
-    monitor = NetworkMonitor(simulation_mode=True)
-    monitor.start_monitoring()
+    of_db = OFDB()
+    monitor = NetworkMonitor(of_db, simulation_mode=True)
 
     s1 = Switch(1, "S1")
     s2 = Switch(2, "S2")
@@ -20,7 +19,8 @@ def run_verification():
     l = Link("1", "2", 1, bw_capacity=100)
     of_db.add_link("1", "2", 1, l)
 
-    time.sleep(6)
+    # One measurement round, in simulated time
+    monitor.advance(6)
 
     flow = RTAttributes(
         ft_i="topic/alert",
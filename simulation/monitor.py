@@ -2,17 +2,24 @@ import time
 import threading
 import random
 import statistics
-from common.of_db import of_db
 
 class NetworkMonitor:
     """
     Measures delay and jitter and updates OF-DB.
+
+    start_monitoring() samples every `interval` seconds of wall-clock
+    time; advance(seconds) runs the same samples in simulated time,
+    without sleeping (sweeps, verification scripts).
     """
 
-    def __init__(self, simulation_mode=True):
+    def __init__(self, db, simulation_mode=True, interval=5.0, rng=None):
         self.simulation_mode = simulation_mode
+        self.db = db  # the OF-DB the controller / scenario works on
+        self.interval = interval
+        self.rng = rng or random.Random()
         self.running = False
         self.history = {}
+        self.now = 0.0  # simulated seconds
 
     def start_monitoring(self):
         self.running = True
@@ -21,28 +28,42 @@ class NetworkMonitor:
 
     def _loop(self):
         while self.running:
-            for key, link in of_db.links.items():
-                delay = self._measure_delay(link)
+            self.sample()
+            time.sleep(self.interval)
 
-                if key not in self.history:
-                    self.history[key] = []
-                self.history[key].append(delay)
+    def advance(self, seconds):
+        """Simulated time: one sample per elapsed interval."""
+        end = self.now + seconds
+        while self.now + self.interval <= end:
+            self.now += self.interval
+            self.sample()
+        self.now = end
 
-                if len(self.history[key]) > 10:
-                    self.history[key].pop(0)
+    def sample(self):
+        """One measurement round over every link."""
+        for key, link in list(self.db.links.items()):
+            delay = self._measure_delay(link)
 
-                link.propagation_delay = delay
-                link.jitter = (
-                    statistics.stdev(self.history[key])
-                    if len(self.history[key]) > 1 else 0.0
-                )
+            if key not in self.history:
+                self.history[key] = []
+            self.history[key].append(delay)
 
-            time.sleep(5)
+            if len(self.history[key]) > 10:
+                self.history[key].pop(0)
+
+            if self.simulation_mode:
+                link.propagation_delay = delay
+            link.jitter = (
+                statistics.stdev(self.history[key])
+                if len(self.history[key]) > 1 else 0.0
+            )
 
     def _measure_delay(self, link):
         if self.simulation_mode:
             base = 5.0
-            noise = random.uniform(-0.5, 0.5)
+            noise = self.rng.uniform(-0.5, 0.5)
             load = (link.bw_used / link.bw_capacity) * 2 if link.bw_capacity else 0
             return base + noise + load
-        return 0.1
+        # Real mode: queuing delay comes from the controller's
+        # port statistics (StatsCollector), on top of the static delay
+        return link.prop_delay + link.queuing_delay
@@ -0,0 +1,68 @@
+import threading
+
+
+class StubMessage:
+    """Stand-in for a Ryu OpenFlow message: name + constructor arguments."""
+
+    def __init__(self, name, *args, **kwargs):
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+        self.xid = None
+
+    def __repr__(self):
+        return f"{self.name}(xid={self.xid})"
+
+
+class StubParser:
+    """Any parser.OFPxxx(...) call builds a StubMessage."""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: StubMessage(name, *args, **kwargs)
+
+
+class StubOfproto:
+    """Any ofproto.OFPxxx constant resolves to its own name."""
+
+    def __getattr__(self, name):
+        return name
+
+
+class StubDatapath:
+    """
+    Minimal datapath for driving controller logic without Mininet/OVS.
+    Records every message (in `sent`, unless record is off: long
+    load runs would otherwise grow it without bound) and answers barrier
+    requests by calling on_barrier(dpid, xid), after rtt seconds
+    (0: synchronously).
+    """
+
+    def __init__(self, dpid, on_barrier=None, rtt=0.0, record=True):
+        self.id = dpid
+        self.ofproto = StubOfproto()
+        self.ofproto_parser = StubParser()
+        self.on_barrier = on_barrier
+        self.rtt = rtt
+        self.record = record
+        self.sent = []
+        self.xid = 0
+        self._lock = threading.Lock()
+
+    def set_xid(self, msg):
+        with self._lock:
+            self.xid += 1
+            msg.xid = self.xid
+        return msg.xid
+
+    def send_msg(self, msg):
+        if msg.xid is None:
+            self.set_xid(msg)
+        if self.record:
+            self.sent.append(msg)
+
+        if msg.name == "OFPBarrierRequest" and self.on_barrier is not None:
+            if self.rtt > 0:
+                threading.Timer(self.rtt, self.on_barrier, (self.id, msg.xid)).start()
+            else:
+                self.on_barrier(self.id, msg.xid)
+        return True
@@ -0,0 +1,236 @@
+# simulation/sweep.py
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import time
+from multiprocessing import Pool
+
+from benchmarks.generators import build_topology, load_topology, make_flowset
+from benchmarks.schedulability_bench import percentile, _git_commit
+from common.of_db import OFDB
+from schedulability.analysis import HolisticApproach, TrajectoryApproach, ExactResponseTime
+from schedulability.compiled import CompiledHolistic, CompiledTrajectory, SnapshotCompiler
+from simulation.monitor import NetworkMonitor
+
+DEFAULT_OUT = os.path.join(os.path.dirname(__file__), "results", "sweep")
+
+
+# ---------------------------------------
+# Analyses
+# ---------------------------------------
+def _holistic(flows):
+    return [HolisticApproach.calculate_wcrt(f, flows) for f in flows]
+
+
+def _trajectory(flows):
+    return [TrajectoryApproach.calculate_wcrt(f, flows) for f in flows]
+
+
+def _exact(flows):
+    rta = ExactResponseTime(flows)
+    return [rta.calculate_wcrt(f) for f in flows]
+
+
+def _holistic_compiled(flows):
+    snapshot = SnapshotCompiler().compile(flows)
+    return [CompiledHolistic.calculate_wcrt(snapshot, i) for i in range(len(flows))]
+
+
+def _trajectory_compiled(flows):
+    snapshot = SnapshotCompiler().compile(flows)
+    return [CompiledTrajectory.calculate_wcrt(snapshot, i) for i in range(len(flows))]
+
+
+ANALYSES = {
+    "holistic": _holistic, "trajectory": _trajectory, "exact": _exact,
+    "holistic-compiled": _holistic_compiled, "trajectory-compiled": _trajectory_compiled,
+}
+
+
+# ---------------------------------------
+# One Scenario (worker process)
+# ---------------------------------------
+def run_scenario(scenario):
+    """
+    Build the topology and flow set, let the monitor measure link delays
+    for `monitor_s` simulated seconds, then analyze every flow.
+    """
+    started = time.perf_counter()
+
+    # A private OF-DB, in a fresh process (maxtasksperchild=1)
+    db = OFDB()
+    topo = build_topology(scenario["topology"], scenario["size"], scenario["seed"])
+    load_topology(db, topo)
+
+    flows = make_flowset(
+        topo, scenario["flows"], total_utilization=scenario["load"],
+        priorities=scenario["priorities"], fanout=(1, scenario["fanout"]),
+        seed=scenario["seed"]
+    )
+    admitted = [f for f in flows if db.add_flow(f.ft_i, f)]
+
+    monitor = NetworkMonitor(db, simulation_mode=True,
+                             rng=random.Random(scenario["seed"]))
+    monitor.advance(scenario["monitor_s"])
+
+    analyzed = time.perf_counter()
+    wcrts = ANALYSES[scenario["analysis"]](admitted)
+    analysis_s = time.perf_counter() - analyzed
+
+    finite = [w for w in wcrts if w != float("inf")]
+    ratios = [min(w / f.di, 10.0) for w, f in zip(wcrts, admitted)]
+    return dict(
+        scenario,
+        admitted=len(admitted),
+        schedulable=sum(w <= f.di for w, f in zip(wcrts, admitted)) / max(len(admitted), 1),
+        wcrt_mean_ms=statistics.fmean(finite) if finite else None,
+        wcrt_p99_ms=percentile(finite, 99) if finite else None,
+        wcrt_over_deadline=statistics.fmean(ratios) if ratios else None,
+        analysis_s=analysis_s,
+        scenario_s=time.perf_counter() - started,
+    )
+
+
+# ---------------------------------------
+# Grid
+# ---------------------------------------
+KEY = ("analysis", "load", "fanout", "priorities")
+METRICS = ("schedulable", "wcrt_mean_ms", "wcrt_p99_ms", "wcrt_over_deadline", "analysis_s")
+
+
+def scenarios(args):
+    grid = itertools.product(args.analyses, args.loads, args.fanouts,
+                             args.priorities, range(args.seeds))
+    return [
+        {
+            "analysis": analysis, "load": load, "fanout": fanout,
+            "priorities": priorities, "seed": args.seed + rep,
+            "topology": args.topology, "size": args.size,
+            "flows": args.flows, "monitor_s": args.monitor_s,
+        }
+        for analysis, load, fanout, priorities, rep in grid
+    ]
+
+
+def aggregate(results):
+    """Mean of each metric over the seeds of a grid point."""
+    groups = {}
+    for r in results:
+        groups.setdefault(tuple(r[k] for k in KEY), []).append(r)
+
+    rows = []
+    for key in sorted(groups):
+        runs = groups[key]
+        row = dict(zip(KEY, key), runs=len(runs))
+        for name in METRICS:
+            values = [r[name] for r in runs if r[name] is not None]
+            row[name] = round(statistics.fmean(values), 6) if values else None
+        rows.append(row)
+    return rows
+
+
+# ---------------------------------------
+# Results
+# ---------------------------------------
+def write_results(results, rows, meta, out):
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out + ".json", "w") as f:
+        json.dump({"meta": meta, "results": rows, "scenarios": results}, f, indent=2)
+    fields = list(KEY) + ["runs"] + list(METRICS)
+    with open(out + ".csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def plot_results(rows, out):
+    """WCRT/D and schedulable fraction vs. load, one line per analysis and fan-out."""
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("matplotlib not installed, skipping plot")
+        return None
+
+    mixes = sorted({r["priorities"] for r in rows})
+    fig, axes = plt.subplots(2, len(mixes), figsize=(5 * len(mixes), 7), squeeze=False)
+    for col, mix in enumerate(mixes):
+        ax_wcrt, ax_sched = axes[0][col], axes[1][col]
+        lines = sorted({(r["analysis"], r["fanout"]) for r in rows if r["priorities"] == mix})
+        for analysis, fanout in lines:
+            points = sorted((r for r in rows if r["priorities"] == mix and
+                             r["analysis"] == analysis and r["fanout"] == fanout),
+                            key=lambda r: r["load"])
+            label = f"{analysis}, fan-out ≤{fanout}"
+            loads = [r["load"] for r in points]
+            ax_wcrt.plot(loads, [r["wcrt_over_deadline"] for r in points], marker="o", label=label)
+            ax_sched.plot(loads, [r["schedulable"] for r in points], marker="o", label=label)
+        ax_wcrt.set(title=mix, xlabel="load (total utilization)", ylabel="mean WCRT / D")
+        ax_sched.set(xlabel="load (total utilization)", ylabel="schedulable fraction")
+        for ax in (ax_wcrt, ax_sched):
+            ax.grid(True)
+            ax.legend(fontsize="small")
+
+    fig.tight_layout()
+    fig.savefig(out + ".png")
+    plt.close(fig)
+    return out + ".png"
+
+
+def run_sweep():
+    parser = argparse.ArgumentParser(description="Parallel schedulability parameter sweep")
+    parser.add_argument("--analyses", nargs="+", choices=list(ANALYSES),
+                        default=["holistic", "trajectory"])
+    parser.add_argument("--loads", type=float, nargs="+", default=[0.1, 0.2, 0.4, 0.6, 0.8])
+    parser.add_argument("--fanouts", type=int, nargs="+", default=[1, 4],
+                        help="max subscribers per flow")
+    parser.add_argument("--priorities", nargs="+", default=["rate-monotonic", "two-level"],
+                        choices=["rate-monotonic", "uniform", "two-level"])
+    parser.add_argument("--flows", type=int, default=100)
+    parser.add_argument("--topology", choices=["fat-tree", "ring", "mesh"], default="fat-tree")
+    parser.add_argument("--size", type=int, default=4, help="k for fat-tree, switches otherwise")
+    parser.add_argument("--seeds", type=int, default=3, help="repetitions per grid point")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--monitor-s", type=float, default=60.0,
+                        help="simulated monitoring time before the analysis")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--out", default=DEFAULT_OUT, help="path prefix for .json / .csv / .png")
+    args = parser.parse_args()
+
+    todo = scenarios(args)
+    print(f"=== Sweep: {len(todo)} scenarios on {args.workers} workers ===")
+    started = time.perf_counter()
+
+    results = []
+    # One process per scenario: no state (OF-DB, caches) leaks between runs
+    with Pool(args.workers, maxtasksperchild=1) as pool:
+        for r in pool.imap_unordered(run_scenario, todo):
+            results.append(r)
+            print(f"[{len(results):>4}/{len(todo)}] {r['analysis']:>10} load={r['load']:<5} "
+                  f"fan-out≤{r['fanout']:<3} {r['priorities']:>14} seed={r['seed']}  "
+                  f"schedulable {r['schedulable']:.2f}  {r['scenario_s']:.2f}s")
+
+    rows = aggregate(results)
+    meta = {
+        "benchmark": "sweep",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "elapsed_s": round(time.perf_counter() - started, 2),
+        "args": vars(args),
+    }
+    write_results(results, rows, meta, args.out)
+    plot = plot_results(rows, args.out)
+    print(f"{len(todo)} scenarios in {meta['elapsed_s']} s")
+    print(f"Results: {args.out}.json / .csv" + (f" / {plot}" if plot else ""))
+
+
+if __name__ == "__main__":
+    run_sweep()
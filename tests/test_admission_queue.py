@@ -0,0 +1,76 @@
+import threading
+import time
+
+from sdn_controller.admission_queue import AdmissionQueue
+
+
+def _start(queue):
+    threading.Thread(target=queue.run, daemon=True).start()
+
+
+def test_requests_arriving_together_share_a_batch():
+    batches = []
+
+    def process(batch):
+        batches.append([r.payload for r in batch])
+        for r in batch:
+            r.complete(r.payload * 2)
+
+    q = AdmissionQueue(process, batch_window=0.05, max_batch=4)
+    requests = [q.submit("flow", i) for i in range(6)]
+    _start(q)
+    assert [r.wait(2.0) for r in requests] == [0, 2, 4, 6, 8, 10]
+    # Arrival order, split at max_batch
+    assert batches == [[0, 1, 2, 3], [4, 5]]
+    assert (q.batches, q.processed) == (2, 6)
+
+
+def test_window_closes_a_batch():
+    batches = []
+
+    def process(batch):
+        batches.append(len(batch))
+        for r in batch:
+            r.complete(True)
+
+    q = AdmissionQueue(process, batch_window=0.01)
+    _start(q)
+    assert q.submit("flow", 1).wait(2.0)
+    time.sleep(0.05)
+    assert q.submit("flow", 2).wait(2.0)
+    assert batches == [1, 1]
+
+
+def test_failed_batch_rejects_every_waiting_request():
+    def process(batch):
+        batch[0].complete(True)
+        raise RuntimeError("boom")
+
+    q = AdmissionQueue(process, batch_window=0.05)
+    first, second = q.submit("flow", 1), q.submit("subscriber", 2)
+    _start(q)
+    assert first.wait(2.0) is True
+    assert second.wait(2.0) is False
+
+    # The worker survives the failure
+    assert q.submit("flow", 3).wait(2.0) is True
+
+
+def test_batches_run_on_one_thread():
+    threads = set()
+
+    def process(batch):
+        threads.add(threading.get_ident())
+        for r in batch:
+            r.complete(True)
+
+    q = AdmissionQueue(process, batch_window=0.001)
+    _start(q)
+    submitters = [threading.Thread(target=lambda: q.submit("flow", 0).wait(2.0))
+                  for _ in range(20)]
+    for t in submitters:
+        t.start()
+    for t in submitters:
+        t.join()
+    assert len(threads) == 1
+    assert q.processed == 20
@@ -0,0 +1,69 @@
+import pytest
+
+from benchmarks.generators import build_topology, make_flowset
+from schedulability.analysis import HolisticApproach, TrajectoryApproach
+from schedulability.compiled import CompiledHolistic, CompiledTrajectory, SnapshotCompiler
+
+
+@pytest.fixture(params=[("ring", 8), ("mesh", 16), ("fat-tree", 4)])
+def flows(request):
+    kind, size = request.param
+    return make_flowset(build_topology(kind, size, seed=1), 40, total_utilization=0.4, seed=2)
+
+
+# ---------------------------------------
+# Compiled Kernels vs. Reference HA / TA
+# ---------------------------------------
+def test_compiled_matches_reference(flows):
+    snap = SnapshotCompiler().compile(flows)
+    for i, flow in enumerate(flows):
+        assert CompiledHolistic.calculate_wcrt(snap, i) == pytest.approx(
+            HolisticApproach.calculate_wcrt(flow, flows))
+        assert CompiledTrajectory.calculate_wcrt(snap, i) == pytest.approx(
+            TrajectoryApproach.calculate_wcrt(flow, flows))
+
+
+def test_recompile_picks_up_new_route_and_attributes(flows):
+    compiler = SnapshotCompiler()
+    compiler.compile(flows)
+
+    moved, other = flows[0], flows[1]
+    moved.route_links = list(other.route_links)
+    moved.src_ip, moved.dst_ips = other.src_ip, list(other.dst_ips)
+    flows[2].measured_jitter = 3.0
+    extracted = compiler.stats["extracted"]
+    snap = compiler.compile(flows)
+
+    assert compiler.stats["extracted"] == extracted + 1
+    for i in (0, 1, 2):
+        assert CompiledTrajectory.calculate_wcrt(snap, i) == pytest.approx(
+            TrajectoryApproach.calculate_wcrt(flows[i], flows))
+
+
+# ---------------------------------------
+# Link Table Follows the Flow Set
+# ---------------------------------------
+def test_link_table_shrinks_when_flows_leave(flows):
+    compiler = SnapshotCompiler()
+    compiler.compile(flows)
+
+    remaining = flows[::4]
+    extracted = compiler.stats["extracted"]
+    snap = compiler.compile(remaining)
+
+    live = {l.key for f in remaining for l in f.route_links}
+    assert set(compiler.link_index) == live
+    assert sorted(snap.link_keys) == sorted(live)
+    assert len(snap.static) == len(live)
+    # Kept rows are renumbered, not re-extracted
+    assert compiler.stats["extracted"] == extracted
+    for i, flow in enumerate(remaining):
+        assert CompiledTrajectory.calculate_wcrt(snap, i) == pytest.approx(
+            TrajectoryApproach.calculate_wcrt(flow, remaining))
+
+    # Links come back when flows do
+    snap = compiler.compile(flows)
+    assert set(compiler.link_index) == {l.key for f in flows for l in f.route_links}
+    for i, flow in enumerate(flows):
+        assert CompiledHolistic.calculate_wcrt(snap, i) == pytest.approx(
+            HolisticApproach.calculate_wcrt(flow, flows))
@@ -0,0 +1,93 @@
+import pytest
+
+from common.of_db import OFDB
+from sdn_controller.discovery import TopologyDiscovery
+
+
+@pytest.fixture
+def discovery():
+    changes = []
+    d = TopologyDiscovery(OFDB(), on_change=changes.append, quiet_period=0.2, max_delay=1.0)
+    d.changes = changes
+    return d
+
+
+def _line(d, n=3):
+    for dpid in range(1, n + 1):
+        d.switch_enter(dpid)
+    for dpid in range(1, n):
+        d.link_add(dpid, 2, dpid + 1, 1)
+        d.link_add(dpid + 1, 1, dpid, 2)
+
+
+def test_burst_is_applied_in_one_update(discovery):
+    _line(discovery)
+    version = discovery.of_db.version
+
+    change = discovery.flush()
+
+    assert discovery.of_db.version == version + 1
+    assert discovery.changes == [change]
+    assert sorted(change.added_switches) == [1, 2, 3]
+    assert len(change.added_links) == 4
+    assert set(discovery.of_db.links) == {l.key for l in change.added_links}
+
+
+def test_flap_cancels_out(discovery):
+    _line(discovery)
+    discovery.flush()
+    links = dict(discovery.of_db.links)
+
+    discovery.link_delete(1, 2, 2)
+    discovery.link_add(1, 2, 2, 1)
+    change = discovery.flush()
+
+    assert not change
+    assert len(discovery.changes) == 1   # on_change not called again
+    assert discovery.of_db.links == links
+    # Rediscovery keeps the existing object (and its measured load)
+    assert discovery.of_db.links["1:2->2"] is links["1:2->2"]
+
+
+def test_port_down_removes_both_directions(discovery):
+    _line(discovery)
+    discovery.flush()
+
+    discovery.port_down(2, 1)
+    change = discovery.flush()
+
+    assert sorted(l.key for l in change.removed_links) == ["1:2->2", "2:1->1"]
+    assert discovery.of_db.get_link_from_port("2", 1) is None
+
+
+def test_switch_leave_removes_its_links(discovery):
+    _line(discovery)
+    discovery.flush()
+
+    discovery.switch_leave(3)
+    change = discovery.flush()
+
+    assert change.removed_switches == [3]
+    assert sorted(l.key for l in change.removed_links) == ["2:2->3", "3:1->2"]
+
+
+def test_hosts_become_link_pairs(discovery):
+    discovery.switch_enter(1)
+    discovery.host_add(1, 5, "10.0.0.1")
+    discovery.flush()
+    assert set(discovery.of_db.links) == {"1:5->10.0.0.1", "10.0.0.1:0->1"}
+
+
+def test_due_after_quiet_period_or_max_delay(discovery):
+    assert not discovery.due()
+    discovery.switch_enter(1)
+    first = discovery._first
+    assert not discovery.due(first + 0.1)
+    assert discovery.due(first + 0.21)
+
+    # Events keep arriving: still flushed once max_delay has passed
+    discovery._last = first + 0.95
+    assert not discovery.due(first + 0.99)
+    assert discovery.due(first + 1.01)
+    assert discovery.maybe_flush(first + 1.01).added_switches == [1]
+    assert discovery.maybe_flush(first + 2.0) is None
@@ -0,0 +1,156 @@
+import math
+
+import pytest
+
+from benchmarks.generators import build_topology, make_flowset
+from common.of_db import OFDB
+from common.rt_attributes import RTAttributes
+from schedulability.analysis import ExactResponseTime
+from sdn_controller.domains import DomainAdmission, DomainPartition, segment_bound, segment_fits
+
+
+class _Bus:
+    """In-process MSDP: summaries in a dict, segments delivered synchronously."""
+
+    def __init__(self):
+        self.summaries = {}
+        self.peers = {}
+        self.segments = []
+
+    def join(self, domain):
+        peer = _Peer(self, domain)
+        self.peers[domain] = peer
+        return peer
+
+
+class _Peer:
+    def __init__(self, bus, domain):
+        self.bus = bus
+        self.domain = domain
+        self.on_segment = None
+
+    def send_summary(self, summary):
+        self.bus.summaries[self.domain] = summary
+
+    def remote_summary(self, domain):
+        return self.bus.summaries.get(domain)
+
+    def send_segment(self, segment):
+        self.bus.segments.append(segment)
+        self.bus.peers[segment["to"]].on_segment(segment)
+
+
+def _domains(topo, partition):
+    bus = _Bus()
+    admissions = {}
+    for domain in partition.domains:
+        db = OFDB()
+        db.apply_topology(
+            add_switches=[s for s in topo.switches if partition.domain_of[str(s.dpid)] == domain],
+            add_links=[l for l in topo.links if partition.owner(l) == domain],
+        )
+        admissions[domain] = DomainAdmission(domain, partition, bus.join(domain), db)
+    return bus, admissions
+
+
+@pytest.fixture
+def single():
+    """One domain over the whole fabric, partly loaded."""
+    topo = build_topology("ring", 8, seed=1)
+    partition = DomainPartition({s.dpid: "d0" for s in topo.switches})
+    _, admissions = _domains(topo, partition)
+    admission = admissions["d0"]
+    offered = make_flowset(topo, 60, total_utilization=0.6, fanout=(1, 2), seed=3)
+    admitted = [f for f in offered[:30] if admission.admit_local(f)]
+    assert len(admitted) > 10
+    return admission, admitted, offered[30:]
+
+
+# ---------------------------------------
+# Summaries
+# ---------------------------------------
+def test_segment_bound_is_an_upper_bound(single):
+    admission, admitted, candidates = single
+    summary = admission.summary()
+    checked = 0
+    for flow in candidates:
+        bound = segment_bound(flow, [l.key for l in flow.route_links], summary)
+        if not math.isfinite(bound):
+            continue
+        wcrt = ExactResponseTime(admitted + [flow]).calculate_wcrt(flow, warm=False)
+        assert wcrt <= bound + 1e-6
+        checked += 1
+    assert checked > 10
+
+
+def test_segment_fits_keeps_the_domain_schedulable(single):
+    admission, admitted, candidates = single
+    summary = admission.summary()
+    fits = [f for f in candidates if segment_fits(f, [l.key for l in f.route_links], summary)]
+    assert fits and len(fits) < len(candidates)
+    for flow in fits:
+        rta = ExactResponseTime(admitted + [flow])
+        assert all(rta.calculate_wcrt(f) <= f.di for f in admitted)
+
+
+def test_unknown_links_have_no_bound(single):
+    admission, _, candidates = single
+    assert segment_bound(candidates[0], ["9:9->9"], admission.summary()) == math.inf
+
+
+# ---------------------------------------
+# Cross-Domain Admission
+# ---------------------------------------
+@pytest.fixture
+def pair():
+    topo = build_topology("ring", 6, seed=1)
+    partition = DomainPartition.contiguous([s.dpid for s in topo.switches], 2)
+    bus, admissions = _domains(topo, partition)
+    for admission in admissions.values():
+        admission.publish()
+    return topo, bus, admissions
+
+
+def _crossing(topo, keys, **attrs):
+    links = {l.key: l for l in topo.links}
+    flow = RTAttributes(ft_i="x", qi=1, ci=0.5, pi=2, ti=20.0, di=20.0, **attrs)
+    flow.src_ip, flow.dst_ips = "2", ["5"]
+    flow.route_links = [links[k] for k in keys]
+    return flow
+
+
+ROUTE = ["2:2->3", "3:2->4", "4:2->5"]   # d0 owns 2->3 and 3->4, d1 owns 4->5
+
+
+def test_segments_carry_the_flow_attributes(pair):
+    topo, bus, admissions = pair
+    flow = _crossing(topo, ROUTE, bwi="5Mbps", measured_jitter=0.3, processing_delay=0.2)
+
+    bound = admissions["d0"].admit_cross_domain(flow)
+    assert bound is not None and bound <= flow.di
+
+    budgets = 0.0
+    for domain, keys in (("d0", ROUTE[:2]), ("d1", ROUTE[2:])):
+        segment = admissions[domain].of_db.get_flow("x")
+        assert (segment.bwi, segment.measured_jitter, segment.processing_delay) == ("5Mbps", 0.3, 0.2)
+        assert [l.key for l in segment.route_links] == keys
+        assert all(l.bw_reserved == 5.0 for l in segment.route_links)
+        budgets += segment.di - 0.5
+    # Each budget carries jitter + processing once; the rest splits Di
+    assert budgets == pytest.approx(flow.di - 0.5)
+
+
+def test_refused_segment_releases_the_others(pair):
+    topo, bus, admissions = pair
+    # d1 cannot carry the bandwidth on 4->5
+    admissions["d1"].of_db.links["4:2->5"].bw_capacity = 1.0
+    flow = _crossing(topo, ROUTE, bwi="5Mbps")
+
+    assert admissions["d0"].admit_cross_domain(flow, timeout=0.5) is None
+    # d0's own segment was reserved locally and is released locally
+    assert [(s["kind"], s["to"]) for s in bus.segments] == [("reserve", "d1"), ("ack", "d0")]
+    assert bus.segments[1]["ok"] is False
+    assert admissions["d0"].of_db.get_flow("x") is None
+    assert admissions["d1"].of_db.get_flow("x") is None
+    assert all(l.bw_reserved == 0.0 for l in admissions["d0"].of_db.links.values())
+    assert not admissions["d0"]._pending
@@ -0,0 +1,79 @@
+import pytest
+
+from benchmarks.generators import build_topology, make_flowset
+from schedulability.analysis import ExactResponseTime, HolisticApproach
+
+
+@pytest.fixture(params=[("ring", 8), ("mesh", 16), ("fat-tree", 4)])
+def flows(request):
+    kind, size = request.param
+    return make_flowset(build_topology(kind, size, seed=1), 40, total_utilization=0.4, seed=2)
+
+
+def _assert_same(rta, flows):
+    fresh = ExactResponseTime(flows)
+    for flow in flows:
+        expected = fresh.calculate_wcrt(flow)
+        got = rta.calculate_wcrt(flow)
+        if expected > flow.di:
+            # Only "unschedulable" is promised past the deadline
+            assert got > flow.di
+        else:
+            assert got == pytest.approx(expected, abs=1e-5)
+
+
+# ---------------------------------------
+# Incremental vs. Fresh
+# ---------------------------------------
+def test_incremental_matches_fresh(flows):
+    rta = ExactResponseTime()
+    admitted = []
+    for flow in flows:
+        rta.add_flow(flow)
+        admitted.append(flow)
+        rta.calculate_wcrt(flow)
+    _assert_same(rta, admitted)
+
+    for flow in admitted[::3]:
+        rta.remove_flow(flow)
+    admitted = [f for f in admitted if f.ft_i in rta.flows]
+    _assert_same(rta, admitted)
+
+    for flow in admitted[::4]:
+        flow.measured_jitter += 1.5
+        rta.update_flow(flow, grown=True)
+    _assert_same(rta, admitted)
+
+    for flow in admitted[1::4]:
+        flow.measured_jitter = 0.0
+        rta.update_flow(flow)
+    _assert_same(rta, admitted)
+
+
+def test_lower_link_delays_are_not_warm_started(flows):
+    links = {l.key: l for f in flows for l in f.route_links}
+    for link in links.values():
+        link.queuing_delay = 2.0
+    rta = ExactResponseTime(flows)
+    for flow in flows:
+        rta.calculate_wcrt(flow)
+    assert rta.stats["warm_starts"] == 0
+
+    # Measured queuing drops: every cached WCRT is now too high a start
+    for link in links.values():
+        link.queuing_delay = 0.0
+    _assert_same(rta, flows)
+    assert rta.stats["warm_starts"] == 0
+
+    # Delays back up: the cached (lower) WCRTs are valid starting points
+    for link in links.values():
+        link.queuing_delay = 0.5
+    _assert_same(rta, flows)
+
+
+def test_holistic_agrees_with_exact_below_deadline(flows):
+    rta = ExactResponseTime(flows)
+    for flow in flows:
+        expected = HolisticApproach.calculate_wcrt(flow, flows)
+        if expected <= flow.di:
+            assert rta.calculate_wcrt(flow) == pytest.approx(expected, abs=1e-5)
@@ -0,0 +1,131 @@
+import pytest
+
+from benchmarks.generators import build_topology, load_topology
+from common.of_db import OFDB
+from common.rt_attributes import RTAttributes
+from sdn_controller.failover import FailoverManager
+from sdn_controller.flow_programmer import FlowProgrammer
+from sdn_controller.routing import RoutingEngine
+from simulation.stub_datapath import StubDatapath
+
+
+class FailingDatapath(StubDatapath):
+    """Answers every batch with an error while `fail` is set."""
+
+    def __init__(self, dpid, programmer):
+        super().__init__(dpid, programmer.handle_barrier_reply)
+        self.programmer = programmer
+        self.fail = False
+        self.first = None
+
+    def send_msg(self, msg):
+        if msg.xid is None:
+            self.set_xid(msg)
+        if msg.name != "OFPBarrierRequest":
+            self.first = self.first or msg.xid
+        elif self.fail:
+            self.programmer.handle_error(self.id, self.first, "OFPET_BAD_REQUEST", "OFPBRC_EPERM")
+        if msg.name == "OFPBarrierRequest":
+            self.first = None
+        return super().send_msg(msg)
+
+
+def _flow(i, src, dst, bw="10Mbps"):
+    flow = RTAttributes(ft_i=f"ff/{i}", qi=1, ci=0.1, pi=1 + i % 7, ti=50.0, di=50.0, bwi=bw)
+    flow.src_ip, flow.dst_ips = src, [dst]
+    return flow
+
+
+@pytest.fixture
+def net():
+    of_db = OFDB()
+    load_topology(of_db, build_topology("ring", 6))
+    routing = RoutingEngine(of_db)
+    programmer = FlowProgrammer(of_db, barrier_timeout=0.2)
+    failover = FailoverManager(of_db, routing, programmer)
+    datapaths = {dpid: FailingDatapath(dpid, programmer) for dpid in of_db.switches}
+
+    flows = [_flow(0, "1", "2"), _flow(1, "1", "3"), _flow(2, "3", "4")]
+    for flow in flows:
+        flow.multicast_group_id = of_db.get_multicast_group_id(flow.ft_i)
+        assert of_db.add_flow(flow.ft_i, flow)
+        of_db.set_route(flow, routing.compute_multicast_tree(flow.src_ip, flow.dst_ips, 10.0))
+    assert programmer.program_many(flows, datapaths).ok
+    for flow in flows:
+        assert failover.protect(flow, datapaths).ok
+    return of_db, routing, programmer, failover, datapaths, flows
+
+
+def _fail(of_db, key):
+    link = of_db.links[key]
+    of_db.apply_topology(remove_links=[key])
+    return link
+
+
+def _no_overbooking(of_db):
+    return all(l.bw_reserved <= l.bw_capacity + 1e-9 for l in of_db.links.values())
+
+
+def test_failure_swaps_in_the_detour(net):
+    of_db, _, programmer, failover, datapaths, flows = net
+    link = _fail(of_db, "1:1->2")
+    on_link = {f.ft_i for f in of_db.flows_on_link(link.key)}
+    assert on_link == {"ff/0", "ff/1"}
+
+    swapped, recomputed, failed, completed_at = failover.handle_link_failure([link], datapaths)
+
+    assert {f.ft_i for f in swapped} == on_link
+    assert not recomputed and not failed and completed_at is not None
+    for flow in swapped:
+        assert link not in flow.route_links
+        assert all(l.key in of_db.links for l in flow.route_links)
+        assert link.key not in flow.backup_routes
+        state = programmer.build_state(flow)
+        assert all(programmer.installed[d][k] == e for d, es in state.items() for k, e in es.items())
+    assert _no_overbooking(of_db)
+
+
+def test_detours_need_residual_capacity(net):
+    of_db, routing, _, _, _, flows = net
+    # The only detour around 1->2 on a ring runs 1->6->...->3->2
+    of_db.links["4:1->3"].bw_reserved = of_db.links["4:1->3"].bw_capacity - 5.0
+    backups = routing.compute_backup_routes(flows[0], list(of_db.flows.values()))
+    assert "1:1->2" not in backups
+
+
+def test_swap_rechecks_capacity(net):
+    of_db, _, _, failover, datapaths, flows = net
+    flow = flows[0]
+    assert "1:1->2" in flow.backup_routes
+    before = list(flow.route_links)
+    # Reserved by others after the backup was computed
+    of_db.links["4:1->3"].bw_reserved = of_db.links["4:1->3"].bw_capacity - 5.0
+
+    link = _fail(of_db, "1:1->2")
+    swapped, recomputed, failed, _ = failover.handle_link_failure([link], datapaths)
+
+    assert {f.ft_i for f in failed} == {"ff/0", "ff/1"}
+    assert not swapped and not recomputed
+    assert flow.route_links == before
+    assert failover.failed[flow.ft_i] == [link.key]
+    assert _no_overbooking(of_db)
+
+
+def test_rejected_repair_restores_the_installed_route(net):
+    of_db, _, programmer, failover, datapaths, flows = net
+    installed = {d: dict(e) for d, e in programmer.installed.items()}
+    routes = {f.ft_i: list(f.route_links) for f in flows}
+    reserved = {k: l.bw_reserved for k, l in of_db.links.items()}
+    for dp in datapaths.values():
+        dp.fail = True
+
+    link = _fail(of_db, "1:1->2")
+    swapped, recomputed, failed, _ = failover.handle_link_failure([link], datapaths)
+
+    assert not swapped and not recomputed
+    assert {f.ft_i for f in failed} == {"ff/0", "ff/1"}
+    assert set(failover.failed) == {"ff/0", "ff/1"}
+    # OF-DB describes what the switches still hold
+    assert all(f.route_links == routes[f.ft_i] for f in flows)
+    assert programmer.installed == installed
+    assert all(l.bw_reserved == reserved[k] for k, l in of_db.links.items())
@@ -0,0 +1,323 @@
+import threading
+
+import pytest
+
+from benchmarks.generators import build_topology, load_topology, make_flowset
+from common.of_db import OFDB
+from sdn_controller.flow_programmer import FlowEntry, FlowProgrammer, GroupEntry, MeterEntry
+from simulation.stub_datapath import StubDatapath
+
+ADDS = {"OFPMC_ADD", "OFPGC_ADD", "OFPFC_ADD"}
+DELETES = {"OFPMC_DELETE", "OFPGC_DELETE", "OFPFC_DELETE_STRICT"}
+
+
+class Switch(StubDatapath):
+    """
+    StubDatapath that keeps its groups and meters, answers an ADD of
+    an existing one with the switch's "exists" error, and can fail a
+    batch (error reply to its first message) or lose a barrier reply.
+    Flags batches that overlap.
+    """
+
+    def __init__(self, dpid, programmer, rtt=0.0):
+        super().__init__(dpid, self._barrier, rtt)
+        self.programmer = programmer
+        self.fail = 0          # batches to fail
+        self.drop = 0          # barrier replies to lose
+        self.applied = set()   # (message name, id) the switch holds
+        self.errors = []
+        self.batch = []
+        self.inflight = 0
+        self.overlapped = False
+
+    def send_msg(self, msg):
+        if msg.name != "OFPBarrierRequest":
+            if self.inflight:
+                self.overlapped = True
+            self.batch.append(msg)
+            return super().send_msg(msg)
+
+        batch, self.batch = self.batch, []
+        with self._lock:
+            self.inflight += 1
+        if self.fail:
+            self.fail -= 1
+            self._error(batch[0].xid, ("OFPET_BAD_REQUEST", "OFPBRC_EPERM"))
+        else:
+            for m in batch:
+                self._apply(m)
+        if self.drop:
+            self.drop -= 1
+            self.sent.append(msg)
+            with self._lock:
+                self.inflight -= 1
+            return True
+        return super().send_msg(msg)
+
+    def _error(self, xid, error):
+        self.errors.append(error)
+        self.programmer.handle_error(self.id, xid, *error)
+
+    def _apply(self, msg):
+        if msg.name == "OFPFlowMod":
+            return
+        command = msg.kwargs.get("command")
+        key = (msg.name, msg.kwargs.get("meter_id", msg.kwargs.get("group_id")))
+        if command in ADDS:
+            if key in self.applied:
+                self._error(msg.xid, ("OFPET_METER_MOD_FAILED", "OFPMMFC_METER_EXISTS")
+                            if msg.name == "OFPMeterMod" else
+                            ("OFPET_GROUP_MOD_FAILED", "OFPGMFC_GROUP_EXISTS"))
+            self.applied.add(key)
+        elif command in DELETES:
+            if key[1] in ("OFPG_ALL", "OFPM_ALL"):
+                self.applied = {k for k in self.applied if k[0] != msg.name}
+            self.applied.discard(key)
+
+    def _barrier(self, dpid, xid):
+        with self._lock:
+            self.inflight -= 1
+        self.programmer.handle_barrier_reply(dpid, xid)
+
+    def commands(self, since=0):
+        return [m.kwargs.get("command") for m in self.sent[since:] if m.name != "OFPBarrierRequest"]
+
+
+@pytest.fixture
+def setup():
+    of_db = OFDB()
+    topo = build_topology("ring", 6)
+    load_topology(of_db, topo)
+    programmer = FlowProgrammer(of_db, barrier_timeout=0.2)
+    datapaths = {dpid: StubDatapath(dpid, programmer.handle_barrier_reply)
+                 for dpid in of_db.switches}
+    flows = make_flowset(topo, 6, fanout=(2, 3), seed=3)
+    for flow in flows:
+        flow.multicast_group_id = of_db.get_multicast_group_id(flow.ft_i)
+        assert of_db.add_flow(flow.ft_i, flow)
+    return programmer, datapaths, flows
+
+
+def _installed(programmer, flows):
+    expected = {}
+    for flow in flows:
+        for dpid, entries in programmer.build_state(flow).items():
+            expected.setdefault(dpid, {}).update(entries)
+    return expected
+
+
+# ---------------------------------------
+# Desired State
+# ---------------------------------------
+def test_state_meters_at_ingress_and_queues_by_priority(setup):
+    programmer, _, flows = setup
+    flow = flows[0]
+    state = programmer.build_state(flow)
+    gid = flow.multicast_group_id
+    address = FlowProgrammer.multicast_address(gid)
+
+    ingress = int(flow.src_ip)
+    assert state[ingress][("meter", gid)] == MeterEntry(gid, 1000)
+    for dpid, entries in state.items():
+        group = entries[("group", gid)]
+        assert isinstance(group, GroupEntry)
+        assert {q for _, q, _ in group.buckets} == {min(flow.pi, FlowProgrammer.MAX_QUEUE)}
+        assert entries[("flow", address)] == FlowEntry(address, gid, gid if dpid == ingress else 0)
+        if dpid != ingress:
+            assert ("meter", gid) not in entries
+
+
+def test_groups_and_meters_precede_the_flows_using_them(setup):
+    programmer, datapaths, flows = setup
+    flow = flows[0]
+    for dpid, change in programmer.diff(flow.ft_i, programmer.build_state(flow)).items():
+        names = [m.name for m in programmer.build_messages(datapaths[dpid], change)]
+        assert names.index("OFPFlowMod") > max(
+            i for i, n in enumerate(names) if n in ("OFPMeterMod", "OFPGroupMod"))
+
+    # Teardown: flows go first
+    assert programmer.program(flow, datapaths).ok
+    for dpid, change in programmer.diff(flow.ft_i, {}).items():
+        names = [m.name for m in programmer.build_messages(datapaths[dpid], change)]
+        assert names[0] == "OFPFlowMod"
+
+
+def test_group_ids_and_addresses_are_unique(setup):
+    programmer, _, flows = setup
+    of_db = programmer.of_db
+    gids = {f.multicast_group_id for f in flows}
+    assert len(gids) == len(flows)
+    assert len({FlowProgrammer.multicast_address(g) for g in gids}) == len(flows)
+    assert all(0 < g <= of_db.GROUP_ID_SPACE for g in gids)
+
+    # Stable per topic, and freed IDs are not shared while held
+    assert of_db.get_multicast_group_id(flows[0].ft_i) == flows[0].multicast_group_id
+    of_db.remove_flow(flows[0].ft_i)
+    assert flows[0].ft_i not in of_db.multicast_groups
+
+
+# ---------------------------------------
+# Diff
+# ---------------------------------------
+def test_program_installs_desired_state(setup):
+    programmer, datapaths, flows = setup
+    assert programmer.program_many(flows, datapaths).ok
+    assert programmer.installed == _installed(programmer, flows)
+
+
+def test_unchanged_flow_sends_nothing(setup):
+    programmer, datapaths, flows = setup
+    programmer.program(flows[0], datapaths)
+    sent = {dpid: len(dp.sent) for dpid, dp in datapaths.items()}
+
+    assert programmer.program(flows[0], datapaths).ok
+    assert {dpid: len(dp.sent) for dpid, dp in datapaths.items()} == sent
+
+
+def test_reroute_sends_only_changed_entries(setup):
+    programmer, datapaths, flows = setup
+    flow = flows[0]
+    programmer.program(flow, datapaths)
+    before = programmer.build_state(flow)
+    sent = {dpid: len(dp.sent) for dpid, dp in datapaths.items()}
+
+    flow.route_links = flows[1].route_links
+    flow.src_ip, flow.dst_ips = flows[1].src_ip, list(flows[1].dst_ips)
+    after = programmer.build_state(flow)
+    assert programmer.program(flow, datapaths).ok
+
+    for dpid, dp in datapaths.items():
+        if before.get(dpid) == after.get(dpid):
+            assert len(dp.sent) == sent[dpid]
+    assert all(programmer.installed.get(d, {}) == after.get(d, {}) for d in datapaths)
+
+
+# ---------------------------------------
+# Rollback, Retry, Reconnect (stateful switches)
+# ---------------------------------------
+@pytest.fixture
+def switches(setup):
+    programmer, datapaths, flows = setup
+    return programmer, {dpid: Switch(dpid, programmer) for dpid in datapaths}, flows
+
+
+def test_error_rolls_back_new_flow(switches):
+    programmer, datapaths, flows = switches
+    flow = flows[0]
+    dpids = sorted(programmer.build_state(flow))
+    assert len(dpids) > 1
+    datapaths[dpids[0]].fail = 1
+
+    result = programmer.program(flow, datapaths)
+
+    assert not result.ok
+    assert result.failed == [dpids[0]]
+    assert programmer.installed == {}
+    assert flow.ft_i not in programmer.flow_keys
+    undo = {"OFPMC_ADD": "OFPMC_DELETE", "OFPGC_ADD": "OFPGC_DELETE",
+            "OFPFC_ADD": "OFPFC_DELETE_STRICT"}
+    for dpid in dpids[1:]:
+        # Confirmed switches delete what they just added
+        commands = datapaths[dpid].commands()
+        added = [c for c in commands if c in ADDS]
+        assert sorted(commands[len(added):]) == sorted(undo[c] for c in added)
+        assert not datapaths[dpid].applied
+
+
+def test_error_restores_modified_entries(switches):
+    programmer, datapaths, flows = switches
+    flow = flows[0]
+    assert programmer.program(flow, datapaths).ok
+    installed = {d: dict(e) for d, e in programmer.installed.items()}
+    dpids = sorted(installed)
+    sent = {dpid: len(datapaths[dpid].sent) for dpid in dpids}
+
+    flow.pi = 1 if flow.pi > 1 else 2   # new queue in every group bucket
+    datapaths[dpids[-1]].fail = 1
+    assert not programmer.program(flow, datapaths).ok
+
+    assert programmer.installed == installed
+    for dpid in dpids[:-1]:
+        msgs = [m for m in datapaths[dpid].sent[sent[dpid]:] if m.name == "OFPGroupMod"]
+        # Modified, then modified back to the installed buckets
+        assert [m.kwargs["command"] for m in msgs] == ["OFPGC_MODIFY", "OFPGC_MODIFY"]
+
+
+def test_timed_out_batch_is_retried(switches):
+    programmer, datapaths, flows = switches
+    flow = flows[0]
+    dpid = min(programmer.build_state(flow))
+    datapaths[dpid].drop = 1   # applied, but the barrier reply is lost
+
+    result = programmer.program(flow, datapaths)
+
+    assert result.ok
+    assert result.retries == 1
+    # The re-sent adds hit entries the switch already has; that is success
+    assert datapaths[dpid].errors
+    assert {e[1] for e in datapaths[dpid].errors} <= {"OFPMMFC_METER_EXISTS", "OFPGMFC_GROUP_EXISTS"}
+    assert programmer.installed == _installed(programmer, [flow])
+
+
+def test_reconnected_switch_is_reset_before_reinstall(switches):
+    programmer, datapaths, flows = switches
+    assert programmer.program_many(flows, datapaths).ok
+    dpid = int(flows[0].src_ip)
+    kept = set(datapaths[dpid].applied)   # the switch keeps its tables
+    assert kept
+
+    programmer.forget_datapath(dpid)
+    switch = datapaths[dpid] = Switch(dpid, programmer)
+    switch.applied = kept
+    programmer.reset_datapath(switch)
+    assert not switch.applied
+
+    for flow in flows:
+        assert programmer.program(flow, {dpid: switch}).ok
+    assert not switch.errors
+    assert switch.applied == kept
+    assert programmer.installed == _installed(programmer, flows)
+
+
+def test_concurrent_programs_are_serialized_per_switch(switches):
+    programmer, datapaths, flows = switches
+    for dp in datapaths.values():
+        dp.rtt = 0.005
+    results = []
+
+    def run(flow):
+        results.append(programmer.program(flow, datapaths))
+
+    threads = [threading.Thread(target=run, args=(flow,)) for flow in flows]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert all(r.ok for r in results)
+    assert not any(dp.overlapped for dp in datapaths.values())
+    assert programmer.installed == _installed(programmer, flows)
+
+    programmer.uninstall([f.ft_i for f in flows], datapaths)
+    assert programmer.installed == {d: {} for d in programmer.installed}
+    assert not any(dp.applied for dp in datapaths.values())
+
+
+def test_failed_uninstall_keeps_the_entries_known(switches):
+    programmer, datapaths, flows = switches
+    assert programmer.program_many(flows, datapaths).ok
+    flow = flows[0]
+    dpid = min(programmer.flow_keys[flow.ft_i])
+    datapaths[dpid].fail = 1
+
+    result = programmer.uninstall([flow.ft_i], datapaths)
+    assert not result.ok
+    # Still installed as far as the programmer knows, so it can be retried
+    assert programmer.installed == _installed(programmer, flows)
+    assert flow.ft_i in programmer.flow_keys
+
+    assert programmer.uninstall([flow.ft_i], datapaths).ok
+    assert flow.ft_i not in programmer.flow_keys
+    assert programmer.installed == _installed(programmer, flows[1:])
+    gid = flow.multicast_group_id
+    assert not any(("OFPGroupMod", gid) in dp.applied for dp in datapaths.values())
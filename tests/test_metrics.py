@@ -0,0 +1,30 @@
+import subprocess
+import sys
+import time
+
+from common.metrics import Metrics
+
+
+def test_analysis_import_does_not_need_eventlet():
+    code = ("import sys, schedulability.analysis, schedulability.compiled; "
+            "sys.exit('eventlet' in sys.modules)")
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
+
+
+def test_spans_counters_and_profiler():
+    m = Metrics()
+    with m.span("work"):
+        pass
+    m.count("events", 2)
+    m.set_mode("profile")
+    time.sleep(0.05)
+    m.set_mode("spans")
+
+    text = m.render()
+    assert 'mrt_span_seconds_count{span="work"} 1' in text
+    assert "mrt_events_total 2" in text
+    assert m.profiler.samples > 0
+
+    m.set_mode("off")
+    m.count("events")
+    assert m.counters["events"] == 2
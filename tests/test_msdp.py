@@ -0,0 +1,104 @@
+import asyncio
+import json
+import socket
+import time
+
+import pytest
+
+from sdn_controller.msdp import MAX_FRAME, MSDP_Signaling, _HEADER, _read_frame
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _read_all(frames):
+    async def read():
+        reader = asyncio.StreamReader()
+        for frame in frames:
+            reader.feed_data(frame)
+        reader.feed_eof()
+        return [await _read_frame(reader) for _ in frames]
+    return asyncio.run(read())
+
+
+def _wait(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def pair():
+    ports = _free_port(), _free_port()
+    # a flushes only when told to
+    a = MSDP_Signaling(f"127.0.0.1:{ports[0]}", [f"127.0.0.1:{ports[1]}"], batch_interval=60.0)
+    b = MSDP_Signaling(f"127.0.0.1:{ports[1]}", [f"127.0.0.1:{ports[0]}"], batch_interval=0.02)
+    a.start_listener(ports[0])
+    b.start_listener(ports[1])
+    yield a, b
+    a.stop()
+    b.stop()
+
+
+# ---------------------------------------
+# Framing
+# ---------------------------------------
+def test_large_refresh_is_split_below_max_frame():
+    msdp = MSDP_Signaling("10.0.0.1", [])
+    entries = [{"topic": f"plant/{i}/temp", "src_ip": f"10.1.{i // 250}.{i % 250}",
+                "origin": "10.0.0.1", "timestamp": 1.7e9 + i} for i in range(20000)]
+    summary = {"domain": "a", "links": {}}
+
+    frames = msdp._frames(entries, [{"to": "b"}], summary)
+
+    assert len(frames) > 1
+    assert all(len(f) - _HEADER.size <= MAX_FRAME for f in frames)
+    msgs = _read_all(frames)
+    assert [e for m in msgs for e in m["entries"]] == entries
+    assert msgs[0]["summary"] == summary and all("summary" not in m for m in msgs[1:])
+    assert [s for m in msgs for s in m.get("segments", [])] == [{"to": "b"}]
+
+
+def test_oversized_frame_is_rejected():
+    body = json.dumps({"type": "SA_BATCH", "entries": ["x" * MAX_FRAME]}).encode()
+    with pytest.raises(ValueError):
+        _read_all([_HEADER.pack(len(body)) + body])
+
+
+# ---------------------------------------
+# Sessions and Batches
+# ---------------------------------------
+def test_sas_are_coalesced_and_delivered(pair):
+    a, b = pair
+    a.send_sa("sensor/temp", "10.0.0.1")
+    a.send_sa("sensor/temp", "10.0.0.1")
+    a.send_sa("sensor/hum", "10.0.0.2")
+    assert len(a._outbox) == 2
+    a._call(a._flush())
+
+    assert _wait(lambda: len(b.sa_cache) == 2)
+    assert sorted(b.remote_sources("sensor/+")) == [
+        ("sensor/hum", "10.0.0.2", a.my_ip), ("sensor/temp", "10.0.0.1", a.my_ip)]
+    # b floods them back; a drops its own origin
+    assert _wait(lambda: a.sa_cache.dropped_loops == 2)
+    assert len(a.sa_cache) == 0
+
+
+def test_session_survives_a_late_peer():
+    ports = _free_port(), _free_port()
+    a = MSDP_Signaling(f"127.0.0.1:{ports[0]}", [f"127.0.0.1:{ports[1]}"], batch_interval=0.02)
+    b = MSDP_Signaling(f"127.0.0.1:{ports[1]}", [], batch_interval=0.02)
+    try:
+        a.send_sa("late/topic", "10.0.0.3")
+        time.sleep(0.1)           # b not listening yet: a backs off and keeps the frame
+        b.start_listener(ports[1])
+        assert _wait(lambda: b.active_sources == {"late/topic": ["10.0.0.3"]})
+    finally:
+        a.stop()
+        b.stop()
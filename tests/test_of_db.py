@@ -0,0 +1,142 @@
+import random
+
+import common.of_db
+from benchmarks.generators import build_topology, load_topology, make_flowset
+from common.of_db import OFDB
+from common.rt_attributes import RTAttributes
+from simulation.monitor import NetworkMonitor
+
+
+# ---------------------------------------
+# Independent Stores
+# ---------------------------------------
+def test_instances_do_not_share_state():
+    a, b = OFDB(), OFDB()
+    topo = build_topology("ring", 4)
+    load_topology(a, topo)
+    flow = make_flowset(topo, 1)[0]
+    assert a.add_flow(flow.ft_i, flow)
+    a.add_subscriber("bench/#", "10.0.0.9")
+
+    assert a.get_flow(flow.ft_i) is flow
+    assert b.get_flow(flow.ft_i) is None
+    assert not b.links and not b.switches
+    assert b.subscribers_for(flow.ft_i) == set()
+    # Group IDs are allocated per store, from the topic alone
+    assert a.get_multicast_group_id(flow.ft_i) == b.get_multicast_group_id(flow.ft_i)
+    assert a.version != b.version
+
+
+def test_no_module_level_store():
+    assert not any(isinstance(v, OFDB) for v in vars(common.of_db).values())
+
+
+def test_monitor_measures_the_store_it_is_given():
+    db = OFDB()
+    load_topology(db, build_topology("ring", 4))
+    monitor = NetworkMonitor(db, simulation_mode=True, interval=1.0, rng=random.Random(1))
+    monitor.advance(3)
+    assert set(monitor.history) == set(db.links)
+    assert all(len(h) == 3 for h in monitor.history.values())
+    assert all(4.5 <= l.propagation_delay <= 5.5 for l in db.links.values())
+
+
+# ---------------------------------------
+# Bandwidth Reservations
+# ---------------------------------------
+def _ring(capacity=10.0):
+    db = OFDB()
+    load_topology(db, build_topology("ring", 6))
+    for link in db.links.values():
+        link.bw_capacity = capacity
+    return db
+
+
+def _flow(db, topic, keys, bw):
+    flow = RTAttributes(ft_i=topic, qi=1, ci=0.1, pi=1, ti=10.0, di=10.0, bwi=f"{bw}Mbps")
+    flow.route_links = [db.links[k] for k in keys]
+    return flow
+
+
+def test_add_flow_reserves_only_while_capacity_lasts():
+    db = _ring()
+    a = _flow(db, "a", ["1:1->2", "2:2->3"], 6)
+    b = _flow(db, "b", ["2:2->3"], 6)
+    assert db.add_flow("a", a)
+    assert not db.add_flow("b", b)          # 6 + 6 > 10 on 2->3
+    assert db.get_flow("b") is None
+    assert db.links["2:2->3"].bw_reserved == 6.0
+
+    # A re-registration may reuse what it already holds
+    bigger = _flow(db, "a", ["1:1->2", "2:2->3"], 9)
+    assert db.add_flow("a", bigger)
+    assert db.links["1:1->2"].bw_reserved == 9.0
+
+
+def test_set_route_moves_the_reservation():
+    db = _ring()
+    a = _flow(db, "a", ["1:1->2", "2:2->3"], 6)
+    assert db.add_flow("a", a)
+    assert db.add_flow("b", _flow(db, "b", ["1:2->6"], 6))
+
+    detour = [db.links[k] for k in ("1:2->6", "6:1->5", "5:1->4", "4:1->3")]
+    assert not db.set_route(a, detour, checked=True)   # 1->6 is full
+    assert a.route_links[0].key == "1:1->2"
+    assert db.links["1:2->6"].bw_reserved == 6.0
+
+    shorter = [db.links["1:1->2"]]
+    assert db.set_route(a, shorter, checked=True)
+    assert db.links["2:2->3"].bw_reserved == 0.0
+    assert db.links["1:1->2"].bw_reserved == 6.0
+    assert [f.ft_i for f in db.flows_on_link("1:1->2")] == ["a"]
+    assert db.flows_on_link("2:2->3") == []
+
+    # Unchecked moves (restoring a route the switches hold) always apply
+    assert db.set_route(a, detour)
+    assert db.links["1:2->6"].bw_reserved == 12.0
+    assert db.links["1:1->2"].bw_reserved == 0.0
+
+
+def test_unregistered_flow_reserves_nothing():
+    db = _ring()
+    c = _flow(db, "c", [], 6)
+    assert db.set_route(c, [db.links["1:1->2"]], checked=True)
+    assert db.links["1:1->2"].bw_reserved == 0.0
+
+
+# ---------------------------------------
+# Teardown
+# ---------------------------------------
+def test_remove_flow_releases_its_resources():
+    db = OFDB()
+    topo = build_topology("ring", 6)
+    load_topology(db, topo)
+    flows = make_flowset(topo, 4, fanout=(2, 3), seed=5)
+    for flow in flows:
+        assert db.add_flow(flow.ft_i, flow)
+    flow = flows[0]
+    gid = db.get_multicast_group_id(flow.ft_i)
+    reserved = {l.key: l.bw_reserved for l in flow.route_links}
+
+    assert db.remove_flow(flow.ft_i) is flow
+    assert db.get_flow(flow.ft_i) is None
+    assert all(abs(l.bw_reserved - (reserved[l.key] - 1.0)) < 1e-9 for l in flow.route_links)
+    assert not any(flow.ft_i in {f.ft_i for f in db.flows_on_link(k)} for k in db.links)
+    assert gid not in db._group_topics
+    assert db.remove_flow(flow.ft_i) is None
+
+
+def test_group_id_can_stay_held_until_released():
+    db = OFDB()
+    topo = build_topology("ring", 4)
+    load_topology(db, topo)
+    flow = make_flowset(topo, 1)[0]
+    assert db.add_flow(flow.ft_i, flow)
+    gid = db.get_multicast_group_id(flow.ft_i)
+
+    db.remove_flow(flow.ft_i, release_group=False)
+    assert db._group_topics[gid] == flow.ft_i
+    # A re-registration gets the same ID back
+    assert db.get_multicast_group_id(flow.ft_i) == gid
+    db.release_multicast_group_id(flow.ft_i)
+    assert gid not in db._group_topics
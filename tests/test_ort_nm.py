@@ -0,0 +1,59 @@
+import pytest
+
+pytest.importorskip("scapy")   # ort_nm imports the sniffer
+
+import ort_nm.ort_nm as ort_nm_module
+from ort_nm.ort_nm import ORTNM
+
+
+class _Response:
+    status_code = 200
+
+    def json(self):
+        return {"status": "ACCEPT"}
+
+
+@pytest.fixture
+def posts(monkeypatch):
+    sent = []
+
+    def post(url, json):
+        sent.append((url.rsplit("/", 1)[1], json))
+        return _Response()
+
+    monkeypatch.setattr(ort_nm_module.requests, "post", post)
+    return sent
+
+
+PROPS = {"qi": "1", "pi": "1", "ci": "0.1", "ti": "1000", "di": "1000", "bwi": "1Mbps"}
+
+
+def test_publish_registers_once_then_only_proves_liveness(posts):
+    nm = ORTNM("10.0.0.2")
+    assert nm.handle_publish("t", PROPS, "10.0.0.1")
+    assert nm.handle_publish("t", PROPS, "10.0.0.1")
+    assert [p[0] for p in posts] == ["register_flow"]
+
+
+def test_silent_publisher_is_deregistered(posts):
+    nm = ORTNM("10.0.0.2")
+    nm.handle_publish("slow", dict(PROPS, ti="4000"), "10.0.0.1")   # 3 periods: 12 s
+    nm.handle_publish("fast", PROPS, "10.0.0.1")                     # MIN_IDLE: 5 s
+    seen = nm.last_seen["fast"]
+    nm.last_seen["slow"] = seen
+
+    assert nm.expire_idle(now=seen + 4.0) == []
+    assert nm.expire_idle(now=seen + 6.0) == ["fast"]
+    assert nm.expire_idle(now=seen + 13.0) == ["slow"]
+    assert [p for p in posts if p[0] == "deregister_flow"] == [
+        ("deregister_flow", {"topic": "fast"}), ("deregister_flow", {"topic": "slow"})]
+    assert not nm.admitted_flows and not nm.last_seen
+
+    # Publishing again registers it anew
+    nm.handle_publish("fast", PROPS, "10.0.0.1")
+    assert posts[-1][0] == "register_flow"
+
+
+def test_unsubscribe_is_forwarded(posts):
+    ORTNM("10.0.0.2").handle_unsubscribe("a/#", "10.0.0.5")
+    assert posts == [("deregister_subscriber", {"topic": "a/#", "subscriber_ip": "10.0.0.5"})]
@@ -0,0 +1,105 @@
+import pytest
+
+from benchmarks.generators import build_topology, load_topology
+from common.of_db import OFDB
+from common.rt_attributes import RTAttributes
+from sdn_controller.routing import RoutingEngine
+
+SHORT = ["1:1->2", "2:2->3"]
+DETOUR = ["1:2->6", "6:1->5", "5:1->4", "4:1->3"]
+
+
+def _flow(topic, src, dsts, ci=0.1, ti=10.0, di=10.0, pi=1, bw="1Mbps"):
+    flow = RTAttributes(ft_i=topic, qi=1, ci=ci, pi=pi, ti=ti, di=di, bwi=bw)
+    flow.src_ip, flow.dst_ips = src, list(dsts)
+    return flow
+
+
+def _keys(tree):
+    return [l.key for l in tree]
+
+
+@pytest.fixture
+def ring():
+    of_db = OFDB()
+    load_topology(of_db, build_topology("ring", 6))
+    return of_db, RoutingEngine(of_db)
+
+
+@pytest.fixture
+def busy(ring):
+    """An admitted flow on 2->3 that leaves no room for a second one there."""
+    of_db, routing = ring
+    heavy = _flow("heavy", "2", ["3"], ci=3.0, ti=5.0, di=5.0)
+    heavy.route_links = [of_db.links["2:2->3"]]
+    assert of_db.add_flow(heavy.ft_i, heavy)
+    return of_db, routing, heavy
+
+
+# ---------------------------------------
+# Candidate Trees
+# ---------------------------------------
+def test_candidates_are_distinct_and_cheapest_first(ring):
+    of_db, routing = ring
+    trees = list(routing.candidate_trees("1", ["3"], 1.0, k=4))
+    assert [_keys(t) for t in trees] == [SHORT, DETOUR]
+
+    trees = list(routing.candidate_trees("1", ["3", "5"], 1.0, k=4))
+    assert len({frozenset(_keys(t)) for t in trees}) == len(trees) > 1
+    for tree in trees:
+        reached = {l.dst for l in tree}
+        assert {3, 5} <= {int(d) for d in reached}
+
+
+def test_candidates_skip_links_without_bandwidth(ring):
+    of_db, routing = ring
+    of_db.links["2:2->3"].bw_reserved = of_db.links["2:2->3"].bw_capacity - 0.5
+    assert [_keys(t) for t in routing.candidate_trees("1", ["3"], 1.0)] == [DETOUR]
+    # Enough for a smaller flow, though the load makes it the costlier tree
+    assert [_keys(t) for t in routing.candidate_trees("1", ["3"], 0.5)] == [DETOUR, SHORT]
+
+    of_db.links["4:1->3"].bw_reserved = of_db.links["4:1->3"].bw_capacity
+    assert list(routing.candidate_trees("1", ["3"], 1.0)) == []
+
+
+# ---------------------------------------
+# Schedulable Tree Search
+# ---------------------------------------
+def test_first_schedulable_candidate_wins(busy):
+    of_db, routing, heavy = busy
+    assert _keys(routing.find_schedulable_tree(_flow("n", "1", ["3"]), [heavy], 1.0)) == SHORT
+
+    # Sharing 2->3 with the heavy flow misses the deadline; the detour does not
+    tight = _flow("n", "1", ["3"], ci=2.0, pi=2, di=6.0)
+    assert _keys(routing.find_schedulable_tree(tight, [heavy], 1.0)) == DETOUR
+    assert routing.find_schedulable_tree(tight, [heavy], 1.0, k=1) is None
+
+
+def test_no_schedulable_tree(busy):
+    of_db, routing, heavy = busy
+    impossible = _flow("n", "1", ["3"], ci=2.0, di=1.0)
+    assert routing.find_schedulable_tree(impossible, [heavy], 1.0) is None
+
+
+def test_readmit_moves_the_reservation(busy):
+    of_db, routing, heavy = busy
+    flow = _flow("n", "1", ["3"], ci=2.0, pi=2, di=6.0)
+    flow.route_links = [of_db.links[k] for k in DETOUR]
+    assert of_db.add_flow(flow.ft_i, flow)
+
+    # Still the only schedulable tree: stays put, reservations unchanged
+    assert routing.readmit(flow, [heavy])
+    assert _keys(flow.route_links) == DETOUR
+    assert of_db.links["1:2->6"].bw_reserved == 1.0
+
+    # Without the heavy flow the short tree wins
+    assert routing.readmit(flow, [])
+    assert _keys(flow.route_links) == SHORT
+    assert of_db.links["1:2->6"].bw_reserved == 0.0
+    assert of_db.links["1:1->2"].bw_reserved == 1.0
+
+    # No tree passes: the old route and its reservation are kept
+    flow.di = 0.01
+    assert not routing.readmit(flow, [heavy])
+    assert _keys(flow.route_links) == SHORT
+    assert of_db.links["1:1->2"].bw_reserved == 1.0
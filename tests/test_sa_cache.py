@@ -0,0 +1,74 @@
+from sdn_controller.msdp import MSDP_Signaling
+from sdn_controller.sa_cache import SACache
+
+
+def test_entries_expire_after_ttl_unless_refreshed():
+    cache = SACache("me", sa_ttl=10.0, tick=1.0)
+    cache.advance(now=0.0)
+    assert cache.update("a/1", "10.0.0.1", "o1", "p1", now=0.0) is True
+    assert cache.update("a/2", "10.0.0.2", "o1", "p1", now=0.0) is True
+
+    assert cache.update("a/1", "10.0.0.1", "o1", "p1", now=8.0) is False   # refresh
+    assert cache.advance(now=9.0) == []
+    expired = cache.advance(now=11.5)
+    assert [(e.topic, e.src_ip) for e in expired] == [("a/2", "10.0.0.2")]
+    assert len(cache) == 1
+    assert [(e.topic, e.src_ip) for e in cache.advance(now=19.5)] == [("a/1", "10.0.0.1")]
+    assert len(cache) == 0
+
+
+def test_long_gap_expires_everything_once():
+    cache = SACache("me", sa_ttl=5.0, tick=1.0)
+    cache.advance(now=0.0)
+    for i in range(20):
+        cache.update(f"t/{i}", "10.0.0.1", "o1", "p1", now=float(i % 5))
+    assert len(cache.advance(now=1000.0)) == 20
+    assert len(cache) == 0
+
+
+def test_rpf_and_own_origin_suppression():
+    cache = SACache("me", sa_ttl=10.0)
+    assert cache.update("t", "10.0.0.1", "me", "p1", now=0.0) is None     # our own SA
+    assert cache.update("t", "10.0.0.1", "o1", "p1", now=0.0) is True
+    assert cache.update("u", "10.0.0.2", "o1", "p2", now=0.0) is None     # not the RPF peer
+    assert cache.update("t", "10.0.0.1", "o2", "p2", now=0.0) is None     # other origin, same source
+    assert cache.dropped_loops == 3
+
+    # The RPF peer is re-learned once the origin has no entries left
+    cache.advance(now=0.0)
+    cache.advance(now=20.0)
+    assert cache.update("u", "10.0.0.2", "o1", "p2", now=20.0) is True
+
+
+def test_limits():
+    cache = SACache("me", max_entries=3, max_per_origin=2)
+    assert cache.update("t/1", "s", "o1", "p", now=0.0)
+    assert cache.update("t/2", "s", "o1", "p", now=0.0)
+    assert cache.update("t/3", "s", "o1", "p", now=0.0) is None
+    assert cache.update("t/3", "s", "o2", "q", now=0.0)
+    assert cache.update("t/4", "s", "o3", "r", now=0.0) is None
+    assert cache.dropped_limit == 2
+
+
+def test_filter_lookup():
+    cache = SACache("me")
+    for topic in ("plant/1/temp", "plant/2/temp", "plant/1/hum", "office/temp"):
+        cache.update(topic, "10.0.0.1", "o1", "p1", now=0.0)
+    assert sorted(e.topic for e in cache.sources("plant/+/temp")) == ["plant/1/temp", "plant/2/temp"]
+    assert sorted(e.topic for e in cache.sources("plant/#")) == [
+        "plant/1/hum", "plant/1/temp", "plant/2/temp"]
+    assert len(cache.sources("#")) == 4
+
+
+def test_refreshes_are_forwarded_at_most_twice_per_interval():
+    msdp = MSDP_Signaling("me", [], refresh_interval=60.0)
+    msdp._process_sa({"type": "SA", "topic": "t", "src_ip": "s", "origin": "o1"}, "p1")
+    assert list(msdp._outbox) == [("t", "s", "o1")]
+    msdp._outbox.clear()
+
+    # An immediate refresh keeps the entry but is not flooded again
+    msdp._process_sa({"type": "SA", "topic": "t", "src_ip": "s", "origin": "o1"}, "p1")
+    assert not msdp._outbox
+    msdp._forwarded[("t", "s", "o1")] -= 30.0
+    msdp._process_sa({"type": "SA", "topic": "t", "src_ip": "s", "origin": "o1"}, "p1")
+    assert list(msdp._outbox) == [("t", "s", "o1")]
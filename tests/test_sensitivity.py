@@ -0,0 +1,69 @@
+from dataclasses import replace
+
+import pytest
+
+from benchmarks.generators import build_topology, make_flowset
+from common.rt_attributes import RTAttributes
+from schedulability.analysis import TrajectoryApproach
+from schedulability.sensitivity import SensitivityAnalysis
+
+
+@pytest.fixture(params=[("ring", 8), ("fat-tree", 4)])
+def flows(request):
+    kind, size = request.param
+    return make_flowset(build_topology(kind, size, seed=1), 20, total_utilization=0.3, seed=4)
+
+
+def _schedulable(flows, checked=None):
+    return all(TrajectoryApproach.calculate_wcrt(f, flows) <= f.di for f in checked or flows)
+
+
+def test_slack_is_deadline_minus_ta_wcrt(flows):
+    engine = SensitivityAnalysis(flows)
+    for flow in flows:
+        answer = engine.flow_sensitivity(flow.ft_i)
+        wcrt = TrajectoryApproach.calculate_wcrt(flow, flows)
+        assert answer["wcrt"] == pytest.approx(wcrt, abs=1e-3)
+        assert answer["slack"] == pytest.approx(flow.di - wcrt, abs=1e-3)
+    assert engine.flow_sensitivity("unknown") is None
+    assert engine.link_sensitivity("0:0->0") is None
+
+
+def test_critical_scaling_is_the_admission_limit(flows):
+    engine = SensitivityAnalysis(flows, tolerance=0.001)
+    for flow in flows[:5]:
+        scale = engine.critical_scaling(flow)
+        below = [replace(f, ci=f.ci * scale * 0.99) if f is flow else f for f in flows]
+        assert _schedulable(below)
+        if scale < engine.max_scale:
+            above = [replace(f, ci=f.ci * scale * 1.05) if f is flow else f for f in flows]
+            assert not _schedulable(above)
+
+
+def test_extra_utilization_is_the_admission_limit(flows):
+    engine = SensitivityAnalysis(flows, tolerance=0.001)
+    top = max(f.pi for f in flows)
+    for key in sorted(engine.links)[:5]:
+        link, crossing = engine.links[key]
+        utilization = engine.max_extra_utilization(key)
+        period = min(f.ti for f in crossing)
+
+        def with_probe(u):
+            probe = RTAttributes(ft_i="probe", qi=0, ci=u * period, pi=top, ti=period,
+                                 di=period, route_links=[link])
+            return flows + [probe]
+
+        # The flows already on the link keep their deadlines (the probe's
+        # own is not part of the promise)
+        assert _schedulable(with_probe(utilization * 0.99), crossing)
+        if utilization < 1.0:
+            assert not _schedulable(with_probe(utilization * 1.05), crossing)
+
+
+def test_queries_leave_the_snapshot_unchanged(flows):
+    engine = SensitivityAnalysis(flows)
+    before = [engine.flow_sensitivity(f.ft_i)["wcrt"] for f in flows]
+    report = engine.report()
+    assert [f["topic"] for f in report["flows"]] == sorted(f.ft_i for f in flows)
+    assert [l["link"] for l in report["links"]] == sorted(engine.links)
+    assert [engine.flow_sensitivity(f.ft_i)["wcrt"] for f in flows] == before
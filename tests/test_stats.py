@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks.generators import build_topology, load_topology
+from common.of_db import OFDB
+from sdn_controller.stats import StatsCollector
+from simulation.stub_datapath import StubDatapath
+
+
+def port(port_no, tx_bytes, tx_packets=0, tx_dropped=0):
+    return SimpleNamespace(port_no=port_no, tx_bytes=tx_bytes,
+                           tx_packets=tx_packets, tx_dropped=tx_dropped)
+
+
+@pytest.fixture
+def db():
+    of_db = OFDB()
+    load_topology(of_db, build_topology("ring", 4))
+    return of_db
+
+
+def test_poll_requests_port_and_meter_stats():
+    datapaths = [StubDatapath(1), StubDatapath(2)]
+    StatsCollector(None).poll(datapaths)
+    for dp in datapaths:
+        assert [m.name for m in dp.sent] == ["OFPPortStatsRequest", "OFPMeterStatsRequest"]
+
+
+def test_port_deltas_set_link_load(db):
+    collector = StatsCollector(db)
+    link = db.get_link_from_port("1", 1)
+    assert collector.handle_port_stats(1, [port(1, 0)], now=0.0) == []
+
+    # 250 Mbit in 1 s on a 1000 Mbps link, 1 of 100 packets dropped
+    version = db.version
+    updated = collector.handle_port_stats(1, [port(1, 250e6 / 8, 99, 1)], now=1.0)
+
+    assert updated == [link.key]
+    assert link.bw_used == pytest.approx(250.0)
+    assert link.utilization == pytest.approx(0.25)
+    assert link.drop_rate == pytest.approx(0.01)
+    assert link.queuing_delay == pytest.approx(StatsCollector.queuing_delay(link, 0.25))
+    assert db.version > version
+
+
+def test_small_changes_and_counter_resets_are_ignored(db):
+    collector = StatsCollector(db, change_threshold=0.05)
+    link = db.get_link_from_port("1", 1)
+    collector.handle_port_stats(1, [port(1, 0)], now=0.0)
+    collector.handle_port_stats(1, [port(1, 250e6 / 8)], now=1.0)
+
+    # 0.25 -> 0.27: under the threshold
+    assert collector.handle_port_stats(1, [port(1, 520e6 / 8)], now=2.0) == []
+    assert link.utilization == pytest.approx(0.25)
+    # Switch reconnected: counters restart, new baseline only
+    assert collector.handle_port_stats(1, [port(1, 0)], now=3.0) == []
+    assert collector.handle_port_stats(1, [port(1, 900e6 / 8)], now=4.0) == [link.key]
+    assert link.utilization == pytest.approx(0.9)
+
+
+def test_meter_drop_rate():
+    collector = StatsCollector(None)
+
+    def meter(byte_in, band):
+        return SimpleNamespace(meter_id=7, byte_in_count=byte_in,
+                               band_stats=[SimpleNamespace(byte_band_count=band)])
+
+    collector.handle_meter_stats(1, [meter(0, 0)], now=0.0)
+    collector.handle_meter_stats(1, [meter(1000, 100)], now=1.0)
+    assert collector.meter_drop_rates[(1, 7)] == pytest.approx(0.1)
+
+    collector.forget_datapath(1)
+    assert not collector.meter_drop_rates
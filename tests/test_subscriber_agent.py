@@ -0,0 +1,96 @@
+import random
+import time
+
+import pytest
+
+import mqtt_clients.subscriber_agent as subscriber_agent
+from mqtt_clients.load_publisher import encode_payload
+from mqtt_clients.subscriber_agent import LatencyHistogram, SubscriberAgent, TopicStats
+
+
+# ---------------------------
+# Per-Topic Statistics
+# ---------------------------
+def test_losses_duplicates_and_misses():
+    stats = TopicStats(deadline=10.0)
+    for seq, latency in [(1, 2.0), (2, 4.0), (2, 4.0), (5, 12.0), (4, 1.0), (6, 3.0)]:
+        stats.add(seq, latency)
+    assert stats.received == 4
+    assert stats.duplicates == 2      # 2 again, and 4 after 5
+    assert stats.lost == 2            # 3 and 4 never arrived in order
+    assert stats.misses == 1
+    assert stats.max == 12.0
+
+
+def test_report_covers_one_window():
+    stats = TopicStats(deadline=10.0)
+    assert stats.report("t") is None
+    for seq, latency in enumerate([5.0, 1.0, 3.0, 11.0], start=1):
+        stats.add(seq, latency)
+    report = stats.report("t")
+    assert report == {"topic": "t", "n": 4, "misses": 1, "lost": 0, "min": 1.0,
+                      "p50": 5.0, "p99": 11.0, "max": 11.0, "jitter": 10.0}
+
+    # The window restarts; run totals carry on
+    assert stats.report("t") is None
+    stats.add(7, 2.0)
+    report = stats.report("t")
+    assert (report["n"], report["lost"], report["misses"]) == (1, 2, 0)
+    assert (stats.received, stats.lost, stats.misses) == (5, 2, 1)
+
+
+def test_histogram_percentiles_within_bucket_width():
+    rng = random.Random(1)
+    latencies = sorted(rng.lognormvariate(0.0, 1.0) for _ in range(5000))
+    histogram = LatencyHistogram()
+    for latency in latencies:
+        histogram.add(latency)
+    for q in (0.5, 0.9, 0.99):
+        exact = latencies[int(q * len(latencies)) - 1]
+        assert histogram.percentile(q) == pytest.approx(exact, rel=0.03)
+    assert LatencyHistogram().percentile(0.5) is None
+
+
+# ---------------------------
+# Subscriber Agent
+# ---------------------------
+class _Message:
+    def __init__(self, topic, payload, props=None):
+        self.topic = topic
+        self.payload = payload
+        self.properties = type("Properties", (), {"UserProperty": props})() if props else None
+
+
+@pytest.fixture
+def agent():
+    return SubscriberAgent("127.0.0.1", subscriber_ip="10.0.0.5", deadline=50.0)
+
+
+def test_receptions_are_timed_and_grouped(agent):
+    now = time.time_ns()
+    agent._on_message(None, None, _Message("a", encode_payload(1, now, now - 5_000_000, 64)))
+    agent._on_message(None, None, _Message("b", b"", [("seq", "1"), ("sent_ns", str(now)),
+                                                      ("di", "2")]))
+    agent._on_message(None, None, _Message("c", b"not ours"))
+
+    assert agent.foreign == 1
+    assert agent.topics["a"].deadline == 50.0
+    assert 5.0 <= agent.topics["a"].max < 1000.0
+    assert agent.topics["b"].deadline == 2.0
+
+
+def test_feedback_posts_one_report_per_topic(agent, monkeypatch):
+    posts = []
+    monkeypatch.setattr(subscriber_agent.requests, "post",
+                        lambda url, json, timeout: posts.append((url, json)))
+    assert agent.send_feedback(2.0) == 0
+    now = time.time_ns()
+    for topic in ("a", "b"):
+        agent._on_message(None, None, _Message(topic, encode_payload(1, now, now, 64)))
+
+    assert agent.send_feedback(2.0) == 2
+    url, payload = posts[0]
+    assert url.endswith("/latency_feedback")
+    assert payload["subscriber_ip"] == "10.0.0.5"
+    assert sorted(r["topic"] for r in payload["reports"]) == ["a", "b"]
+    assert agent.send_feedback(2.0) == 0   # windows were reset
@@ -0,0 +1,87 @@
+import itertools
+import random
+
+from common.topics import SubscriptionTrie, TopicTree
+
+
+def _matches(topic_filter, topic):
+    """Reference MQTT filter matching, level by level."""
+    if topic.startswith("$") and topic_filter[:1] in ("+", "#"):
+        return False
+    f, t = topic_filter.split("/"), topic.split("/")
+    for i, level in enumerate(f):
+        if level == "#":
+            return True
+        if i >= len(t) or (level != "+" and level != t[i]):
+            return False
+    return len(f) == len(t)
+
+
+TOPICS = ["a", "a/b", "a/b/c", "a/c", "a/c/c", "b/b", "b/b/c", "$SYS/x", "a//c", "a/"]
+FILTERS = ["a", "a/#", "a/+", "a/+/c", "+/b", "+/+/c", "#", "+", "b/#", "$SYS/#",
+           "a/b/c", "a/+/#", "+/b/#", "a//c", "a/"]
+
+
+def test_subscription_trie_matches_reference():
+    trie = SubscriptionTrie()
+    for f in FILTERS:
+        trie.add(f, f)
+    for topic in TOPICS:
+        assert trie.match(topic) == {f for f in FILTERS if _matches(f, topic)}, topic
+
+
+def test_topic_tree_matches_reference():
+    tree = TopicTree()
+    topics = [t for t in TOPICS if not t.startswith("$")]
+    for t in topics:
+        tree.add(t, t)
+    for f in FILTERS:
+        assert set(tree.match(f)) == {t for t in topics if _matches(f, t)}, f
+
+
+def test_remove_prunes_and_counts():
+    trie = SubscriptionTrie()
+    trie.add("a/+/c", "s1")
+    trie.add("a/+/c", "s1")
+    trie.add("a/+/c", "s2")
+    trie.add("a/#", "s1")
+    assert len(trie) == 3
+    trie.remove("a/+/c", "s1")
+    trie.remove("a/+/c", "s3")          # unknown subscriber
+    trie.remove("x/y", "s1")            # unknown filter
+    assert len(trie) == 2
+    assert trie.match("a/b/c") == {"s1", "s2"}
+    trie.remove("a/+/c", "s2")
+    trie.remove("a/#", "s1")
+    assert len(trie) == 0
+    assert not trie.root.children
+
+    tree = TopicTree()
+    tree.add("a/b/c", 1)
+    tree.add("a/b", 2)
+    tree.remove("a/b/c", 1)
+    assert list(tree.match("#")) == [2]
+    tree.remove("a/b", 2)
+    assert not tree.root.children
+
+
+def test_random_against_reference():
+    rng = random.Random(7)
+    levels = ["x", "y", "z"]
+    topics = ["/".join(p) for n in (1, 2, 3) for p in itertools.product(levels, repeat=n)]
+    filters = set()
+    for _ in range(200):
+        parts = [rng.choice(levels + ["+"]) for _ in range(rng.randint(1, 3))]
+        if rng.random() < 0.3:
+            parts.append("#")
+        filters.add("/".join(parts))
+
+    trie, tree = SubscriptionTrie(), TopicTree()
+    for f in filters:
+        trie.add(f, f)
+    for t in topics:
+        tree.add(t, t)
+    for t in topics:
+        assert trie.match(t) == {f for f in filters if _matches(f, t)}
+    for f in filters:
+        assert set(tree.match(f)) == {t for t in topics if _matches(f, t)}